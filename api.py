@@ -0,0 +1,248 @@
+# api.py
+# API JSON versionada (/api/v1) para integrações, ao lado do tasks_bp.
+# Autenticação pela mesma sessão do Flask-Login; escritas exigem Content-Type application/json,
+# o que impede formulários de outros sites de dispararem requisições (CSRF).
+from datetime import datetime
+from flask import Blueprint, jsonify, request, abort, url_for, current_app
+from flask_login import login_required, current_user
+from sqlalchemy import insert
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import generate_etag
+from extensions import db
+from models import Task, completed_at_for
+from forms import TaskForm
+from pagination import keyset_paginate, InvalidCursor
+from stats import add_to_stats, status_deltas
+from versioning import bump_data_version
+from reminders import delete_reminders
+from replicas import replica_reads
+from tasks import build_task_list_query, get_user_task_or_404, get_per_page
+
+api_bp = Blueprint('api', __name__)
+
+TASK_FIELDS = ('title', 'description', 'due_date', 'status')
+
+
+class ValidationFailed(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+@api_bp.errorhandler(HTTPException)
+def handle_http_error(error):
+    return jsonify(error=error.name, message=error.description), error.code
+
+
+@api_bp.errorhandler(ValidationFailed)
+def handle_validation_error(error):
+    return jsonify(error='Unprocessable Entity', errors=error.errors), 422
+
+
+def json_body():
+    if not request.is_json:
+        abort(415, 'Envie o corpo como application/json.')
+    data = request.get_json(silent=True)
+    if data is None:
+        abort(400, 'JSON inválido.')
+    return data
+
+
+def validate_task_data(data, task=None):
+    """
+    Valida os campos de uma tarefa com as mesmas regras do TaskForm.
+    Em atualizações parciais, os campos ausentes vêm da tarefa existente.
+    Retorna (valores, erros).
+    """
+    if not isinstance(data, dict):
+        return None, {'_schema': ['Cada tarefa deve ser um objeto JSON.']}
+    unknown = set(data) - set(TASK_FIELDS) - {'id'}
+    if unknown:
+        return None, {name: ['Campo desconhecido.'] for name in sorted(unknown)}
+    # Todos os campos são texto (o prazo no formato YYYY-MM-DD): {"title": 12345} não vira "12345"
+    wrong_type = [name for name in TASK_FIELDS if data.get(name) is not None and not isinstance(data[name], str)]
+    if wrong_type:
+        return None, {name: ['Tipo inválido: esperado um texto.'] for name in wrong_type}
+
+    current = task.to_dict() if task is not None else {'status': 'pendente'}
+    merged = {name: data.get(name, current.get(name)) for name in TASK_FIELDS}
+    formdata = MultiDict({name: '' if value is None else str(value) for name, value in merged.items()})
+    form = TaskForm(formdata=formdata, meta={'csrf': False})
+    if not form.validate():
+        return None, {name: errors for name, errors in form.errors.items()}
+    return {
+        'title': form.title.data,
+        'description': form.description.data or None,
+        'due_date': form.due_date.data,
+        'status': form.status.data,
+    }, None
+
+
+def task_etag(task):
+    return generate_etag(jsonify(task.to_dict()).get_data())
+
+
+def conditional_json(payload):
+    """Resposta JSON com ETag forte; If-None-Match coincidente vira 304 sem corpo."""
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def check_if_match(task):
+    """If-Match: evita sobrescrever uma versão da tarefa que o cliente não viu (412)."""
+    # contains_weak: uma resposta comprimida devolve o mesmo ETag como W/, e o JSON é o mesmo
+    if request.if_match and not request.if_match.contains_weak(task_etag(task)):
+        abort(412, 'A tarefa foi alterada desde a última leitura.')
+
+
+def batch_items():
+    """Lê e limita a lista 'tasks' do corpo de uma operação em lote."""
+    data = json_body()
+    items = data.get('tasks') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        abort(400, "Envie uma lista não vazia em 'tasks'.")
+    if len(items) > current_app.config['BULK_MAX_TASKS']:
+        abort(413, f"No máximo {current_app.config['BULK_MAX_TASKS']} tarefas por lote.")
+    return items
+
+
+@api_bp.route('/tasks', methods=['GET'])
+@replica_reads # Só leitura: pode ler de uma réplica
+@login_required
+def list_tasks():
+    query = build_task_list_query(current_user.id, request.args.get('status'))
+    try:
+        page = keyset_paginate(query, Task, get_per_page(), request.args.get('cursor'))
+    except InvalidCursor:
+        abort(400, 'Cursor inválido.')
+    return conditional_json({
+        'tasks': [task.to_dict() for task in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
+
+@api_bp.route('/tasks/<int:task_id>', methods=['GET'])
+@replica_reads
+@login_required
+def get_task(task_id):
+    return conditional_json(get_user_task_or_404(task_id).to_dict())
+
+
+@api_bp.route('/tasks', methods=['POST'])
+@login_required
+def create_task():
+    values, errors = validate_task_data(json_body())
+    if errors:
+        raise ValidationFailed(errors)
+    task = Task(user_id=current_user.id, **values)
+    db.session.add(task)
+    db.session.flush() # Gera id e created_at; serializar antes do commit evita recarregar a tarefa
+    response = jsonify(task.to_dict())
+    bump_data_version(current_user.id)
+    db.session.commit()
+    response.status_code = 201
+    response.headers['Location'] = url_for('api.get_task', task_id=task.id)
+    return response
+
+
+@api_bp.route('/tasks/<int:task_id>', methods=['PATCH'])
+@login_required
+def update_task(task_id):
+    task = get_user_task_or_404(task_id)
+    check_if_match(task)
+    values, errors = validate_task_data(json_body(), task)
+    if errors:
+        raise ValidationFailed(errors)
+    for name, value in values.items():
+        setattr(task, name, value)
+    response = jsonify(task.to_dict())
+    bump_data_version(current_user.id)
+    db.session.commit()
+    response.add_etag()
+    return response
+
+
+@api_bp.route('/tasks/<int:task_id>', methods=['DELETE'])
+@login_required
+def delete_task(task_id):
+    task = get_user_task_or_404(task_id)
+    check_if_match(task)
+    delete_reminders([task.id])
+    db.session.delete(task)
+    bump_data_version(current_user.id)
+    db.session.commit()
+    return '', 204
+
+
+@api_bp.route('/tasks/batch', methods=['POST'])
+@login_required
+def batch_create_tasks():
+    """Cria várias tarefas num único INSERT/commit; qualquer item inválido rejeita o lote todo."""
+    items = batch_items()
+    rows, errors = [], []
+    now = datetime.utcnow()
+    for index, item in enumerate(items):
+        values, item_errors = validate_task_data(item)
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+        else:
+            rows.append(dict(values, user_id=current_user.id, created_at=now,
+                             completed_at=completed_at_for(values['status'], now)))
+    if errors:
+        raise ValidationFailed(errors)
+    # Um único INSERT com várias linhas (o flush do ORM faria um INSERT por tarefa para obter os ids).
+    # O SQLite atribui os rowids na ordem do VALUES, então ordenar pelo id devolve a ordem do lote.
+    tasks = sorted(db.session.scalars(insert(Task).returning(Task), rows), key=lambda task: task.id)
+    response = jsonify(tasks=[task.to_dict() for task in tasks]) # Antes do commit, que expira as tarefas
+    add_to_stats(current_user.id, status_deltas(row['status'] for row in rows)) # O INSERT direto não passa pelo flush
+    bump_data_version(current_user.id)
+    db.session.commit()
+    response.status_code = 201
+    return response
+
+
+@api_bp.route('/tasks/batch', methods=['PATCH'])
+@login_required
+def batch_update_tasks():
+    """Atualiza várias tarefas (cada item traz seu 'id') com uma única consulta e um único commit."""
+    items = batch_items()
+    # Ids inválidos ou repetidos são recusados antes da consulta: dois itens com o mesmo id
+    # seriam validados contra a mesma linha e o segundo apagaria as mudanças do primeiro.
+    id_errors, ids = {}, set()
+    for index, item in enumerate(items):
+        task_id = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(task_id, int) or isinstance(task_id, bool):
+            id_errors[index] = 'Informe o id numérico da tarefa.'
+        elif task_id in ids:
+            id_errors[index] = 'Tarefa repetida no lote.'
+        else:
+            ids.add(task_id)
+    owned = {task.id: task for task in
+             Task.query.filter(Task.user_id == current_user.id, Task.id.in_(ids))} if ids else {}
+
+    updates, errors = [], []
+    for index, item in enumerate(items):
+        if index in id_errors:
+            errors.append({'index': index, 'errors': {'id': [id_errors[index]]}})
+            continue
+        task = owned.get(item['id'])
+        if task is None:
+            errors.append({'index': index, 'errors': {'id': ['Tarefa não encontrada.']}})
+            continue
+        values, item_errors = validate_task_data(item, task)
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+        else:
+            updates.append((task, values))
+    if errors:
+        raise ValidationFailed(errors)
+    for task, values in updates:
+        for name, value in values.items():
+            setattr(task, name, value)
+    response = jsonify(tasks=[task.to_dict() for task, _ in updates])
+    bump_data_version(current_user.id)
+    db.session.commit()
+    return response
@@ -1,33 +1,138 @@
-from flask import Flask, render_template
-from flask_login import LoginManager, current_user
-from config import Config
-from extensions import db  # db importado daqui
-from models import User, Task
-from forms import RegistrationForm, LoginForm, TaskForm
+# app.py
+# Fábrica da aplicação. Importar este módulo é barato: os módulos das funcionalidades só são
+# importados dentro de create_app(), e cada chamada monta uma aplicação nova e independente
+# (configuração, engine do banco, caches e broker próprios), como os testes fazem a cada teste.
+#
+# * flask --app app ...: o Flask encontra create_app() sozinho;
+# * wsgi.py: ponto de entrada dos servidores WSGI, em modo preload (ver create_app).
+import os
+import threading
+from flask import Flask, current_app, render_template
+from flask_login import current_user
+from config import get_config
+from extensions import db, init_db, login_manager
 
-app = Flask(__name__)
-app.config.from_object(Config)
 
-db.init_app(app)  # Inicializa o db com o app
+def create_app(config=None, preload=False, **overrides):
+    """
+    Cria e configura uma aplicação.
+
+    config: nome do perfil ('development', 'testing', 'production'; padrão: APP_ENV) ou um objeto
+    de configuração. Os argumentos nomeados sobrescrevem chaves da configuração.
+
+    preload: para servidores que carregam a aplicação antes de criar os workers por fork
+    (gunicorn --preload). O trabalho de "primeira requisição" (mapeamentos do ORM, compilação dos
+    templates) é feito aqui e herdado pelos workers, e o que não pode atravessar um fork (conexões
+    do pool, threads em segundo plano) só começa na primeira requisição de cada worker.
+    """
+    import migrations
+    import fragment_cache
+    import user_cache
+    import search
+    import profiling
+    import reminders
+    import archive
+    import live
+    import stats
+    import login_guard
+    import sharding
+    import replicas
+    import assets
+    import compression
+    import provisioning
+    from auth import auth_bp
+    from tasks import tasks_bp
+    from api import api_bp
+    from transfer import transfer_bp
+
+    app = Flask(__name__)
+    app.config.from_object(get_config(config) if config is None or isinstance(config, str) else config)
+    app.config.update(overrides)
+    app.extensions['created_pid'] = os.getpid()
+
+    sharding.init_app(app)  # Antes do init_db: os shards das tarefas entram como binds do SQLAlchemy
+    replicas.init_app(app)  # Antes do init_db: réplicas de leitura e 'flask sync-replicas'
+    init_db(app)  # Inicializa o db com o app (e os PRAGMAs do SQLite)
+    login_manager.init_app(app)
+    migrations.init_app(app)  # Comando 'flask upgrade-db'
+    fragment_cache.init_app(app)  # Cache da lista de tarefas renderizada
+    user_cache.init_app(app)  # Cache do usuário carregado a cada requisição
+    search.init_app(app)  # Índice de busca FTS5 e comando 'flask rebuild-search'
+    profiling.init_app(app)  # Server-Timing, log de tempos e cProfile amostrado (PROFILING_ENABLED)
+    reminders.init_app(app)  # Lembretes de prazo: destino, agendador opcional e 'flask send-reminders'
+    archive.init_app(app)  # Comando 'flask archive-tasks'
+    live.init_app(app)  # Broker de eventos e publicação das escritas em tarefas (SSE)
+    stats.init_app(app)  # Contadores do painel mantidos a cada escrita e 'flask reconcile-stats'
+    login_guard.init_app(app)  # Limites de tentativas de login e pool de hash de senha
+    assets.init_app(app)  # asset_url(), rota /assets/ (cache immutable) e 'flask build-assets'
+    compression.init_app(app)  # gzip/brotli negociado das respostas HTML e JSON
+    provisioning.init_app(app)  # Cadastro em massa de usuários: 'flask provision-users'
+
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(tasks_bp, url_prefix='/')
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    app.register_blueprint(transfer_bp, url_prefix='/')
+    app.register_blueprint(live.live_bp, url_prefix='/')
+    app.add_url_rule('/', 'home', replicas.replica_reads(home))
+
+    if preload:
+        warm_up(app)
+        lock = threading.Lock()
+
+        @app.before_request
+        def start_worker_once():
+            # Uma comparação por requisição; só a primeira de cada processo entra no lock
+            if app.extensions.get('worker_pid') != os.getpid():
+                with lock:
+                    if app.extensions.get('worker_pid') != os.getpid():
+                        start_worker(app)
+    else:
+        start_worker(app)
+    return app
 
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'auth.login'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    import user_cache
+    return user_cache.load_user(int(user_id))  # Evita uma consulta ao banco por requisição
 
-from auth import auth_bp
-from tasks import tasks_bp
-app.register_blueprint(auth_bp, url_prefix='/auth')
-app.register_blueprint(tasks_bp, url_prefix='/')
 
-@app.route('/')
 def home():
-    return render_template('index.html', title='Início', current_user=current_user)
+    import stats
+    dashboard = stats.get_dashboard(current_user.id, current_app.config) if current_user.is_authenticated else None
+    return render_template('index.html', title='Início', current_user=current_user, dashboard=dashboard)
+
+
+def warm_up(app):
+    """Adianta o que a primeira requisição faria: configurar os mapeamentos e compilar os templates."""
+    from sqlalchemy.orm import configure_mappers
+    from versioning import upsert_insert
+    configure_mappers()
+    for name in app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html')):
+        app.jinja_env.get_template(name)
+    with app.app_context():
+        upsert_insert(db.engine.dialect.name)
+
+
+def start_worker(app):
+    """
+    Prepara o processo que vai atender as requisições: num worker criado por fork, descarta as
+    conexões do pool herdadas do processo pai (elas continuam sendo dele); depois inicia as threads
+    em segundo plano.
+    """
+    if app.extensions['created_pid'] != os.getpid():
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+    scheduler = app.extensions.get('reminder_scheduler')
+    if scheduler is not None:
+        scheduler.start()
+    app.extensions['worker_pid'] = os.getpid()
+
 
 if __name__ == '__main__':
+    import migrations
+    app = create_app()
     with app.app_context():
-        db.create_all()
+        migrations.upgrade_all()  # Cria as tabelas e aplica migrações pendentes (em todos os shards)
     app.run(debug=True)
@@ -0,0 +1,87 @@
+# archive.py
+# Arquivamento das tarefas concluídas há mais de ARCHIVE_AFTER_DAYS dias: elas saem da tabela task
+# (a que a listagem, os índices e o VACUUM percorrem o tempo todo) para a tabela task_archive,
+# no mesmo banco. Cada lote de ARCHIVE_BATCH_SIZE tarefas é movido numa única transação
+# (INSERT ... SELECT seguido de DELETE, com as mesmas condições), então uma queda no meio não
+# perde nem duplica tarefas, e rodar de novo simplesmente continua de onde parou.
+# As tarefas arquivadas continuam acessíveis em /tasks?status=archived e podem ser restauradas.
+from collections import Counter
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import delete, insert, literal, select
+from extensions import db
+from models import ArchivedTask, Task
+from reminders import delete_reminders
+from sharding import each_shard
+from stats import add_to_stats
+from versioning import bump_data_version
+
+ARCHIVED_COLUMNS = ('task_id', 'title', 'description', 'status', 'created_at', 'due_date', 'completed_at',
+                    'user_id', 'archived_at')
+
+
+def archivable(cutoff):
+    return (Task.status == 'concluida') & (Task.completed_at < cutoff)
+
+
+def archive_batch(cutoff, batch_size, now):
+    """Move um lote de tarefas arquiváveis e retorna quantas foram movidas."""
+    candidates = db.session.execute(
+        select(Task.id, Task.user_id).where(archivable(cutoff))
+        .order_by(Task.completed_at, Task.id).limit(batch_size).with_for_update()).all()
+    if not candidates:
+        return 0
+    ids = [row.id for row in candidates]
+    # As condições se repetem no INSERT e no DELETE: uma tarefa reaberta entre a seleção e a
+    # escrita fica onde está (no SQLite, a trava de escrita é tomada pelo INSERT)
+    moving = (Task.id.in_(ids)) & archivable(cutoff)
+    db.session.execute(insert(ArchivedTask).from_select(ARCHIVED_COLUMNS, select(
+        Task.id, Task.title, Task.description, Task.status, Task.created_at, Task.due_date,
+        Task.completed_at, Task.user_id, literal(now, ArchivedTask.archived_at.type)).where(moving)))
+    delete_reminders(select(Task.id).where(moving))
+    moved_by_user = Counter(db.session.scalars(delete(Task).where(moving).returning(Task.user_id)))
+    for user_id in sorted({row.user_id for row in candidates}):
+        add_to_stats(user_id, {'completed': -moved_by_user[user_id], 'archived': moved_by_user[user_id]})
+        bump_data_version(user_id)
+    db.session.commit()
+    return sum(moved_by_user.values())
+
+
+def archive_completed(config, older_than_days=None, now=None):
+    """
+    Arquiva, lote a lote e shard a shard, as tarefas concluídas há mais de N dias. Retorna quantas
+    foram movidas.
+    """
+    now = now or datetime.utcnow()
+    days = config['ARCHIVE_AFTER_DAYS'] if older_than_days is None else older_than_days
+    cutoff = now - timedelta(days=days)
+    total = 0
+    for _ in each_shard():
+        while True:
+            moved = archive_batch(cutoff, config['ARCHIVE_BATCH_SIZE'], now)
+            total += moved
+            if moved == 0:
+                break
+    return total
+
+
+def restore_task(archived):
+    """
+    Devolve uma tarefa arquivada à tabela task (com um id novo) e retorna a tarefa criada.
+    A data de conclusão recomeça (Task._track_completion), para que ela não volte ao arquivo na
+    próxima passada. O commit fica com quem chama, junto com o incremento da versão de dados.
+    """
+    task = Task(title=archived.title, description=archived.description, status=archived.status,
+                created_at=archived.created_at, due_date=archived.due_date, user_id=archived.user_id)
+    db.session.add(task)
+    db.session.delete(archived)
+    return task
+
+
+def init_app(app):
+    @app.cli.command('archive-tasks')
+    @click.option('--older-than', type=int, help='Dias desde a conclusão (padrão: ARCHIVE_AFTER_DAYS).')
+    def archive_tasks_command(older_than):
+        """Move as tarefas concluídas há muito tempo para a tabela de arquivo."""
+        moved = archive_completed(app.config, older_than)
+        click.echo(f'{moved} tarefas arquivadas.')
@@ -0,0 +1,10 @@
+# asgi.py
+# Ponto de entrada para servidores ASGI (modo opcional, ver async_app.py): as rotas de tarefas e de
+# autenticação rodam no event loop com o banco assíncrono, e as demais num pool de threads. Cada
+# worker do uvicorn é um processo novo que cria a sua própria aplicação.
+#
+#   pip install aiosqlite greenlet uvicorn
+#   APP_ENV=production uvicorn --workers 4 asgi:app
+from async_app import create_asgi_app
+
+app = create_asgi_app()
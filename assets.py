@@ -0,0 +1,117 @@
+# assets.py
+# Arquivos estáticos com impressão digital. 'flask build-assets' copia cada arquivo de static/ para
+# ASSETS_DIR com o hash do conteúdo no nome (css/style.css -> css/style.3f9a1c2b7d4e.css), grava as
+# versões .gz e .br (brotli, se instalado) dos arquivos de texto e um manifest.json com o mapa dos
+# nomes. Nos templates, asset_url('css/style.css') funciona como url_for('static', filename=...):
+# com o manifesto, aponta para /assets/<nome com hash>, servido com Cache-Control immutable de um
+# ano (o nome muda quando o conteúdo muda) e na versão pré-comprimida que o navegador aceitar.
+# Sem o manifesto (ou com ASSETS_FINGERPRINT desligado, como em desenvolvimento), volta para o
+# /static/ do Flask, e as alterações nos arquivos aparecem sem build.
+import hashlib
+import json
+import mimetypes
+import os
+import click
+from flask import abort, current_app, request, send_from_directory, url_for
+import compression
+
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def fingerprinted_name(filename, data):
+    root, ext = os.path.splitext(filename)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def static_files(static_folder, exclude):
+    """Caminhos relativos (com '/') dos arquivos de static/, sem os de 'exclude' (a saída do build)."""
+    exclude = os.path.abspath(exclude)
+    for directory, subdirs, files in os.walk(static_folder):
+        subdirs[:] = sorted(d for d in subdirs if os.path.abspath(os.path.join(directory, d)) != exclude)
+        for name in sorted(files):
+            yield os.path.relpath(os.path.join(directory, name), static_folder).replace(os.sep, '/')
+
+
+def build(static_folder, output_dir, compress_extensions):
+    """
+    Gera os arquivos com hash e as versões comprimidas em output_dir e grava o manifesto.
+    Os arquivos de builds anteriores ficam: páginas ainda abertas podem pedir os nomes antigos.
+    Retorna o manifesto {nome lógico: nome com hash}.
+    """
+    manifest = {}
+    for filename in static_files(static_folder, output_dir):
+        with open(os.path.join(static_folder, filename), 'rb') as f:
+            data = f.read()
+        target = fingerprinted_name(filename, data)
+        manifest[filename] = target
+        path = os.path.join(output_dir, target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if os.path.splitext(filename)[1] in compress_extensions:
+            for coding in compression.available_codings():
+                compressed = compression.compress(data, coding)
+                if len(compressed) < len(data): # Comprimido maior que o original não vale o cabeçalho
+                    with open(path + ENCODING_SUFFIXES[coding], 'wb') as f:
+                        f.write(compressed)
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(filename, **values):
+    """url_for('static', filename=...) com impressão digital, quando o arquivo está no manifesto."""
+    target = current_app.extensions['assets_manifest'].get(filename)
+    if target is None:
+        return url_for('static', filename=filename, **values)
+    return url_for('assets', filename=target, **values)
+
+
+def serve_asset(filename):
+    """Um arquivo do build, na versão pré-comprimida aceita pelo navegador, com cache de um ano."""
+    output_dir = current_app.config['ASSETS_DIR']
+    if filename == MANIFEST_NAME:
+        abort(404)
+    available = [coding for coding in compression.available_codings()
+                 if os.path.isfile(os.path.join(output_dir, filename + ENCODING_SUFFIXES[coding]))]
+    coding = compression.negotiate(request.accept_encodings, available) if available else None
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if coding is None:
+        response = send_from_directory(output_dir, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    else:
+        response = send_from_directory(output_dir, filename + ENCODING_SUFFIXES[coding], mimetype=mimetype,
+                                       max_age=IMMUTABLE_MAX_AGE)
+        response.headers['Content-Encoding'] = coding
+    if available:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('ASSETS_DIR', os.path.join(app.static_folder, 'dist'))
+    fingerprint = app.config['ASSETS_FINGERPRINT']
+    app.extensions['assets_manifest'] = load_manifest(app.config['ASSETS_DIR']) if fingerprint else {}
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Gera os arquivos estáticos com hash no nome, as versões .gz/.br e o manifesto."""
+        manifest = build(app.static_folder, app.config['ASSETS_DIR'], app.config['ASSETS_COMPRESS_EXTENSIONS'])
+        app.extensions['assets_manifest'] = manifest if fingerprint else {}
+        for filename, target in sorted(manifest.items()):
+            click.echo(f'{filename} -> {target}')
+        codings = ', '.join(compression.available_codings())
+        click.echo(f'{len(manifest)} arquivo(s) em {app.config["ASSETS_DIR"]} (comprimidos: {codings}).')
@@ -0,0 +1,249 @@
+# async_app.py
+# Modo ASGI (opcional): a mesma aplicação servida por um servidor ASGI (uvicorn), com as views dos
+# blueprints de ASGI_ASYNC_BLUEPRINTS (tarefas, autenticação e SSE) rodando no event loop sobre um engine
+# assíncrono (aiosqlite). Enquanto uma dessas requisições espera pelo banco ou pelo hash da senha,
+# ela não ocupa uma thread: mil conexões abertas não viram mil threads.
+#
+# * As views continuam as mesmas funções. A requisição inteira (before_request, view, after_request)
+#   roda dentro de AsyncSession.run_sync: cada consulta da db.session vira um await no driver
+#   assíncrono (pelo greenlet do SQLAlchemy), e os eventos da Session (contadores do painel, versão de
+#   dados, atualizações ao vivo) continuam valendo. O modo WSGI (wsgi.py) não muda.
+# * O hash de senha continua no pool de login_guard; no event loop, a espera por ele é um await.
+# * O stream SSE (live.py) é enviado com 'async for': a conexão parada espera no loop, então muitas
+#   conexões ociosas não ocupam o pool de threads nem conexões do banco.
+# * As demais rotas (API, exportação, assets) rodam como WSGI num pool de ASGI_SYNC_THREADS
+#   threads, com o engine síncrono de sempre.
+# * Chamadas curtas que ainda bloqueiam o loop: o store SQLite dos limites de login, o cache de
+#   fragmentos em disco e o broker SQLite do ao vivo, se configurados.
+# * Sem suporte a shards (SHARD_COUNT > 1) nem a réplicas: o engine assíncrono é só o do banco
+#   principal, que precisa ser um arquivo SQLite ou um servidor.
+# * Dependências opcionais: pip install aiosqlite greenlet uvicorn.
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import HTTPException
+from app import create_app
+from extensions import apply_sqlite_pragmas, db
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+class AsyncEngineSession(db.session.session_factory.class_):
+    """
+    A Session da db.session (com os eventos registrados nela), mas com todas as instruções no engine
+    assíncrono passado pela AsyncSession.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        return bind if bind is not None else self.bind
+
+
+def async_url(url):
+    """A URL do mesmo banco com o driver assíncrono."""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'Sem driver assíncrono conhecido para {backend!r}')
+    if backend == 'sqlite' and url.database in (None, '', ':memory:'):
+        raise ValueError('O modo ASGI precisa de um banco SQLite em arquivo: em memória, cada conexão '
+                         'do aiosqlite teria o seu próprio banco.')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def make_async_engine(app):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    with app.app_context():
+        url = async_url(db.engine.url) # Já com o caminho relativo resolvido para instance/
+    engine = create_async_engine(url, **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    apply_sqlite_pragmas(engine.sync_engine, app.config.get('SQLITE_PRAGMAS'))
+    return engine
+
+
+def build_environ(scope, body):
+    """O environ WSGI de uma requisição HTTP do ASGI."""
+    root_path, path = scope.get('root_path', ''), scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server, client = scope.get('server') or ('localhost', 80), scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1').upper().replace('-', '_'), value.decode('latin-1')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def start_message(status, headers):
+    return {'type': 'http.response.start', 'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]}
+
+
+class AsgiApp:
+    """Aplicação ASGI sobre a aplicação Flask: views assíncronas no event loop, o resto num pool de threads."""
+
+    def __init__(self, app):
+        self.app = app
+        self.engine = app.extensions['async_engine']
+        self.async_blueprints = frozenset(app.config['ASGI_ASYNC_BLUEPRINTS'])
+        self.session_options = {key: value for key, value in db.session.session_factory.kw.items()
+                                if key not in ('bind', 'binds')}
+        self.executor = ThreadPoolExecutor(app.config['ASGI_SYNC_THREADS'], thread_name_prefix='asgi-wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise RuntimeError(f"Tipo de conexão ASGI não suportado: {scope['type']}")
+        environ = build_environ(scope, await read_body(receive))
+        if self.runs_async(environ):
+            await self.call_async(environ, receive, send)
+        else:
+            await self.call_sync(environ, receive, send)
+
+    def runs_async(self, environ):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException: # 404, 405 e redirects ficam com o caminho WSGI de sempre
+            return False
+        blueprint, dot, _ = endpoint.partition('.')
+        return bool(dot) and blueprint in self.async_blueprints
+
+    async def call_async(self, environ, receive, send):
+        """
+        Como Flask.wsgi_app, mas com a requisição rodando no greenlet da AsyncSession. Um corpo
+        assíncrono (live.EventStream) é enviado depois que a requisição terminou e a sessão devolveu a
+        conexão: uma conexão SSE parada não prende conexão do banco nem thread.
+        """
+        from sqlalchemy.ext.asyncio import AsyncSession
+        app = self.app
+        ctx = app.request_context(environ)
+        session = AsyncSession(self.engine, sync_session_class=AsyncEngineSession, **self.session_options)
+        error, stream = None, None
+        try:
+            try:
+                ctx.push()
+                db.session.registry.set(session.sync_session) # db.session desta requisição
+                response = await session.run_sync(lambda _: app.full_dispatch_request())
+            except Exception as exc:
+                error = exc
+                response = app.handle_exception(exc)
+            app_iter, status, headers = response.get_wsgi_response(environ)
+            if response.is_streamed and hasattr(response.response, '__aiter__'):
+                stream = response.response
+            else:
+                try:
+                    body = b''.join(app_iter)
+                finally:
+                    if hasattr(app_iter, 'close'):
+                        app_iter.close()
+        finally:
+            await session.close()
+            db.session.registry.clear()
+            if error is not None and app.should_ignore_error(error):
+                error = None
+            ctx.pop(error)
+        await send(start_message(status, headers))
+        if stream is None:
+            await send({'type': 'http.response.body', 'body': body})
+        else:
+            try:
+                await self.send_stream(stream, receive, send)
+            finally:
+                app_iter.close() # Response.close(): o assinante sai do broker
+
+    async def send_stream(self, stream, receive, send):
+        """Envia o corpo assíncrono pedaço a pedaço, até ele acabar ou o cliente desconectar."""
+        disconnected = asyncio.ensure_future(wait_disconnect(receive))
+        chunks = stream.__aiter__()
+        try:
+            while True:
+                chunk = asyncio.ensure_future(chunks.__anext__())
+                await asyncio.wait((chunk, disconnected), return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    await asyncio.gather(chunk, return_exceptions=True)
+                    break
+                if chunk.exception() is not None:
+                    if isinstance(chunk.exception(), StopAsyncIteration):
+                        break
+                    raise chunk.exception()
+                await send({'type': 'http.response.body', 'body': chunk.result().encode('utf-8'), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            await chunks.aclose()
+
+    async def call_sync(self, environ, receive, send):
+        """A aplicação WSGI num thread do pool; o corpo é lido pedaço a pedaço (streaming, SSE)."""
+        loop = asyncio.get_running_loop()
+        started = []
+        app_iter = await loop.run_in_executor(
+            self.executor, self.app, environ, lambda status, headers, exc_info=None: started.append((status, headers)))
+        disconnected = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            iterator = iter(app_iter)
+            chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            await send(start_message(*started[-1]))
+            while chunk is not None and not disconnected.done():
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            if hasattr(app_iter, 'close'):
+                await loop.run_in_executor(self.executor, app_iter.close)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(config=None, **overrides):
+    """create_app() servida como ASGI (mesmos argumentos). Cada worker do uvicorn cria a sua."""
+    app = create_app(config, **overrides)
+    if app.config['SHARD_COUNT'] > 1 or app.config['REPLICA_DATABASE_URLS']:
+        raise ValueError('O modo ASGI não suporta shards (SHARD_COUNT > 1) nem réplicas de leitura.')
+    app.extensions['async_engine'] = make_async_engine(app)
+    return AsgiApp(app)
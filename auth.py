@@ -3,7 +3,11 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from models import User # Agora importa User do models.py que já terá db
 from forms import RegistrationForm, LoginForm # Continua importando os formulários
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from extensions import db
+import user_cache
+import login_guard
+from profiling import measure
 
 auth_bp = Blueprint('auth', __name__, template_folder='templates', static_folder='static')
 
@@ -14,10 +18,19 @@ def register():
 
     form = RegistrationForm()
     if form.validate_on_submit():
-        user = User(username=form.username.data, email=form.email.data)
-        user.set_password(form.password.data)
+        try:
+            password_hash = login_guard.hash_password(form.password.data) # No pool de hash, como o login
+        except login_guard.LoginBusy:
+            flash('O servidor está recebendo muitos cadastros agora. Tente novamente em instantes.', 'danger')
+            return render_template('register.html', title='Registrar', form=form), 503, {'Retry-After': '1'}
+        user = User(username=form.username.data, email=form.email.data, password_hash=password_hash)
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError: # Nome ou email já cadastrado (restrições UNIQUE da tabela user)
+            db.session.rollback()
+            form.add_taken_errors()
+            return render_template('register.html', title='Registrar', form=form)
         flash('Sua conta foi criada com sucesso! Agora você pode fazer login.', 'success')
         return redirect(url_for('auth.login'))
     return render_template('register.html', title='Registrar', form=form)
@@ -29,8 +42,22 @@ def login():
 
     form = LoginForm()
     if form.validate_on_submit():
+        # Limites por IP e por conta antes de consultar o banco ou calcular qualquer hash
+        retry_after = login_guard.check_attempt(form.email.data)
+        if retry_after:
+            flash(f'Muitas tentativas de login. Tente novamente em {retry_after} segundos.', 'danger')
+            return render_template('login.html', title='Login', form=form), 429, {'Retry-After': str(retry_after)}
         user = User.query.filter_by(email=form.email.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            with measure('hash'): # Aparece no Server-Timing: o hash da senha domina o tempo do login
+                password_ok = user is not None and login_guard.verify_password(user, form.password.data)
+        except login_guard.LoginBusy:
+            flash('O servidor está recebendo muitos logins agora. Tente novamente em instantes.', 'danger')
+            return render_template('login.html', title='Login', form=form), 503, {'Retry-After': '1'}
+        login_guard.record_result(form.email.data, password_ok)
+        if password_ok:
+            if db.session.is_modified(user): # Hash refeito com o método/custo atual
+                db.session.commit()
             login_user(user)
             next_page = request.args.get('next')
             flash('Login bem-sucedido!', 'success')
@@ -42,6 +69,7 @@ def login():
 @auth_bp.route('/logout')
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)  # A próxima sessão deste usuário relê o banco
     logout_user()
     flash('Você foi desconectado.', 'info')
     return redirect(url_for('home'))
\ No newline at end of file
@@ -0,0 +1 @@
+# Benchmarks executáveis com: python -m benchmarks.<nome>
@@ -0,0 +1,81 @@
+# benchmarks/bench_archive.py
+# Latência das listagens do conjunto ativo antes e depois de arquivar um histórico grande de
+# tarefas concluídas (archive.py), e o tamanho da tabela task (com os índices) nos dois momentos.
+# O cache de fragmentos é esvaziado antes de cada requisição: o que se mede é a consulta e a renderização.
+#
+# Uso: python -m benchmarks.bench_archive [--users 20] [--tasks-per-user 5000] [--completed-ratio 0.9]
+import argparse
+import statistics
+from benchmarks.common import bootstrap, print_table, timed
+from benchmarks import datagen
+
+ROUTES = [
+    ('todas', '/tasks'),
+    ('pendentes', '/tasks?status=pendente'),
+    ('concluídas', '/tasks?status=concluida'),
+    ('busca', '/tasks/search?q=relatorio'),
+]
+
+
+def task_table_bytes(app):
+    """Espaço ocupado pela tabela task e seus índices (tabela virtual dbstat do SQLite)."""
+    from extensions import db
+    with app.app_context():
+        return db.session.execute(db.text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE tbl_name = 'task' AND type IN ('table', 'index'))")).scalar()
+
+
+def measure(app, client, repeat):
+    cache = app.extensions['fragment_cache']
+    results = {}
+    for name, url in ROUTES:
+        samples = []
+        for _ in range(repeat):
+            cache.clear()
+            response, seconds = timed(client.get, url)
+            assert response.status_code == 200, (url, response.status_code)
+            samples.append(seconds * 1000)
+        results[name] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Listagens antes e depois do arquivamento')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--tasks-per-user', type=int, default=5000)
+    parser.add_argument('--completed-ratio', type=float, default=0.9, help='fração de tarefas concluídas no histórico')
+    parser.add_argument('--older-than', type=int, default=30, help='arquiva as concluídas há mais de N dias')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = bootstrap()
+    datagen.generate(app, args.users, args.tasks_per_user, args.seed, completed_ratio=args.completed_ratio)
+    client = app.test_client()
+    response = client.post('/auth/login', data={'email': datagen.email_for(0), 'password': datagen.PASSWORD})
+    assert response.status_code == 302, 'login do benchmark falhou'
+    client.get('/') # Consome a mensagem flash do login
+
+    size_before = task_table_bytes(app)
+    before = measure(app, client, args.repeat)
+
+    import archive
+    with app.app_context():
+        moved, seconds = timed(archive.archive_completed, app.config, args.older_than, datagen.REFERENCE_DATE)
+    total = args.users * args.tasks_per_user
+    print(f'{moved} de {total} tarefas arquivadas em {seconds:.1f}s '
+          f'(lotes de {app.config["ARCHIVE_BATCH_SIZE"]})\n')
+
+    size_after = task_table_bytes(app)
+    after = measure(app, client, args.repeat)
+
+    rows = [(name, f'{before[name]:.2f}', f'{after[name]:.2f}', f'{before[name] / after[name]:.1f}x')
+            for name, _ in ROUTES]
+    rows.append(('task + índices (MB)', f'{size_before / 2**20:.1f}', f'{size_after / 2**20:.1f}',
+                 f'{size_before / size_after:.1f}x'))
+    print_table(('listagem (mediana ms)', 'antes', 'depois', 'ganho'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+# benchmarks/bench_asgi.py
+# Modo WSGI (werkzeug com uma thread por conexão, como o servidor de desenvolvimento com threads) x
+# modo ASGI (uvicorn com async_app.py) com 10, 100 e 1000 clientes simultâneos na listagem (GET
+# /tasks) e na criação (POST /tasks/new). Cada modo roda num processo próprio, com um worker; cada
+# cliente mantém uma conexão HTTP/1.1 aberta (keep-alive) e faz uma requisição atrás da outra,
+# todos com o mesmo usuário logado.
+#
+# O cliente (asyncio, HTTP cru) roda neste processo: com poucos núcleos, ele disputa a CPU com o
+# servidor, e os números servem para comparar os modos entre si, não como capacidade absoluta.
+#
+# Uso: python -m benchmarks.bench_asgi [--seconds 5] [--clients 10,100,1000] [--users 20]
+# Requer as dependências do modo ASGI: pip install aiosqlite greenlet uvicorn
+import argparse
+import asyncio
+import http.client
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import time
+import urllib.parse
+from benchmarks.common import bootstrap, print_table
+from benchmarks import datagen
+
+CLIENT_COUNTS = (10, 100, 1000)
+ROUTES = {
+    'listagem': ('GET', '/tasks', None, 200),
+    'criação': ('POST', '/tasks/new', {'title': 'Tarefa do benchmark', 'status': 'pendente'}, 302),
+}
+OVERRIDES = {'TESTING': True, 'WTF_CSRF_ENABLED': False, 'REMINDER_SCHEDULER_ENABLED': False}
+
+
+def listening_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # As conexões aceitas herdam o TCP_NODELAY: sem ele, cabeçalho e corpo enviados em dois writes
+    # esperam pelo ACK atrasado do cliente (~40 ms por requisição numa conexão keep-alive)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(2048) # 1000 conexões chegando juntas não transbordam a fila do accept
+    return sock
+
+
+def serve_wsgi(database_url, sock):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import create_app
+    from config import engine_options
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app = create_app('production', SQLALCHEMY_DATABASE_URI=database_url,
+                     SQLALCHEMY_ENGINE_OPTIONS=engine_options(database_url), **OVERRIDES)
+    server = make_server('127.0.0.1', sock.getsockname()[1], app, threaded=True,
+                         request_handler=KeepAliveHandler, fd=sock.fileno())
+    server.serve_forever()
+
+
+def serve_asgi(database_url, sock):
+    import uvicorn
+    from async_app import create_asgi_app
+    from config import engine_options
+    app = create_asgi_app('production', SQLALCHEMY_DATABASE_URI=database_url,
+                          SQLALCHEMY_ENGINE_OPTIONS=engine_options(database_url), **OVERRIDES)
+    config = uvicorn.Config(app, http='h11', loop='asyncio', lifespan='on', log_level='warning', access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def login_cookie(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        conn.request('POST', '/auth/login',
+                     body=urllib.parse.urlencode({'email': datagen.email_for(0), 'password': datagen.PASSWORD}),
+                     headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 302, 'login do benchmark falhou'
+        return response.getheader('Set-Cookie').split(';', 1)[0]
+    finally:
+        conn.close()
+
+
+def build_request(method, path, form, cookie):
+    body = urllib.parse.urlencode(form).encode() if form else b''
+    head = [f'{method} {path} HTTP/1.1', 'Host: 127.0.0.1', f'Cookie: {cookie}', f'Content-Length: {len(body)}']
+    if form:
+        head.append('Content-Type: application/x-www-form-urlencoded')
+    return ('\r\n'.join(head) + '\r\n\r\n').encode() + body
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('conexão fechada pelo servidor')
+    length, closes = 0, False
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection':
+            closes = value.strip().lower() == 'close'
+    await reader.readexactly(length)
+    return int(status_line.split()[1]), closes
+
+
+async def client(port, payload, expected, deadline, latencies, errors):
+    """Uma conexão keep-alive fazendo requisições até o prazo; reconecta se o servidor fechar."""
+    writer = None
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(payload)
+                status, closes = await asyncio.wait_for(read_response(reader), timeout=60)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                errors.append('conexão')
+                if writer is not None:
+                    writer.close()
+                writer = None
+                await asyncio.sleep(0.1)
+                continue
+            if status == expected:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors.append(status)
+            if closes:
+                writer.close()
+                writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def load(port, clients, route, cookie, seconds):
+    method, path, form, expected = ROUTES[route]
+    payload = build_request(method, path, form, cookie)
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, payload, expected, started + seconds, latencies, errors)
+                           for _ in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_mode(serve, database_url, client_counts, seconds):
+    sock = listening_socket()
+    server = multiprocessing.get_context('fork').Process(target=serve, args=(database_url, sock), daemon=True)
+    server.start()
+    port = sock.getsockname()[1]
+    try:
+        time.sleep(1) # Aplicação criada antes da primeira conexão
+        cookie = login_cookie(port)
+        results = []
+        for route in ROUTES:
+            asyncio.run(load(port, 10, route, cookie, 1)) # Aquecimento
+            for clients in client_counts:
+                results.append((route, clients, *asyncio.run(load(port, clients, route, cookie, seconds))))
+        return results
+    finally:
+        server.terminate()
+        server.join()
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Modo WSGI x modo ASGI com 10, 100 e 1000 clientes simultâneos')
+    parser.add_argument('--seconds', type=float, default=5, help='duração de cada medida')
+    parser.add_argument('--clients', default=','.join(map(str, CLIENT_COUNTS)))
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--tasks-per-user', type=int, default=200)
+    args = parser.parse_args()
+    client_counts = [int(count) for count in args.clients.split(',')]
+
+    app = bootstrap()
+    datagen.generate(app, args.users, args.tasks_per_user)
+    database_url = app.config['SQLALCHEMY_DATABASE_URI']
+
+    rows = []
+    for mode, serve in (('WSGI', serve_wsgi), ('ASGI', serve_asgi)):
+        for route, clients, latencies, errors, elapsed in run_mode(serve, database_url, client_counts, args.seconds):
+            percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [float('nan')] * 99
+            rows.append((mode, route, clients, f'{len(latencies) / elapsed:.0f}',
+                         f'{statistics.median(latencies) if latencies else float("nan"):.0f}',
+                         f'{percentiles[98]:.0f}', len(errors)))
+    print(f'{args.seconds:g} s por medida, {os.cpu_count()} CPU(s)')
+    print_table(('modo', 'rota', 'clientes', 'req/s', 'p50 ms', 'p99 ms', 'erros'), rows)
+
+
+if __name__ == '__main__':
+    main()
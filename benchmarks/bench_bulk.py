@@ -0,0 +1,46 @@
+# benchmarks/bench_bulk.py
+# Compara concluir N tarefas pelas rotas individuais (/tasks/<id>/complete, uma por tarefa,
+# cada uma seguida do redirect para a listagem) com uma única chamada a /tasks/bulk.
+#
+# Uso: python -m benchmarks.bench_bulk [--sizes 10 100 1000]
+import argparse
+from benchmarks.common import bootstrap, create_user, login, seed_tasks, clear_tasks, timed, print_table
+
+def per_item(client, task_ids):
+    for task_id in task_ids:
+        response = client.post(f'/tasks/{task_id}/complete', follow_redirects=True)
+        assert response.status_code == 200
+
+def bulk(client, task_ids):
+    response = client.post('/tasks/bulk', data={'action': 'complete', 'task_ids': task_ids},
+                           follow_redirects=True)
+    assert response.status_code == 200
+
+def main():
+    parser = argparse.ArgumentParser(description='Rotas individuais x /tasks/bulk')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    app = bootstrap()
+    app.config['BULK_MAX_TASKS'] = max(args.sizes)
+    user_id = create_user(app, 'benchbulk')
+    client = app.test_client()
+    login(client, 'benchbulk')
+
+    rows = []
+    for size in args.sizes:
+        task_ids = seed_tasks(app, user_id, size)
+        _, per_item_seconds = timed(per_item, client, task_ids)
+        clear_tasks(app, user_id)
+
+        task_ids = seed_tasks(app, user_id, size)
+        _, bulk_seconds = timed(bulk, client, task_ids)
+        clear_tasks(app, user_id)
+
+        rows.append((size, f'{per_item_seconds * 1000:.1f}', f'{bulk_seconds * 1000:.1f}',
+                     f'{per_item_seconds / bulk_seconds:.1f}x'))
+
+    print_table(('tarefas', 'individual (ms)', 'lote (ms)', 'ganho'), rows)
+
+if __name__ == '__main__':
+    main()
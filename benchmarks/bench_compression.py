@@ -0,0 +1,68 @@
+# benchmarks/bench_compression.py
+# Bytes transferidos e latência de uma listagem com 1000 tarefas (HTML) e da mesma página pela API
+# (JSON), sem compressão, com gzip e com brotli (se o pacote estiver instalado), e o tamanho dos
+# arquivos estáticos depois do 'flask build-assets'. O cache de fragmentos é esvaziado antes de cada
+# requisição: a latência inclui a consulta, a renderização e a compressão. A coluna "em 10 Mbit/s"
+# estima só o tempo de transferência do corpo.
+#
+# Uso: python -m benchmarks.bench_compression [--tasks 1000] [--repeat 20]
+import argparse
+import os
+import statistics
+import tempfile
+from benchmarks.common import bootstrap, login, print_table, timed
+from benchmarks import datagen
+
+LINK_BITS_PER_SECOND = 10_000_000
+
+
+def measure(app, client, url, accept_encoding, repeat):
+    cache = app.extensions['fragment_cache']
+    samples, size = [], None
+    for _ in range(repeat):
+        cache.clear()
+        response, seconds = timed(client.get, url, headers={'Accept-Encoding': accept_encoding})
+        assert response.status_code == 200, (url, response.status_code)
+        samples.append(seconds * 1000)
+        size = len(response.data)
+    return statistics.median(samples), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bytes e latência com e sem compressão')
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    import assets
+    import compression
+    app = bootstrap()
+    app.config['TASKS_MAX_PER_PAGE'] = args.tasks # Uma única página com todas as tarefas
+    datagen.generate(app, 1, args.tasks)
+    client = app.test_client()
+    login(client, datagen.username_for(0), datagen.PASSWORD)
+
+    codings = [('nenhuma', 'identity')] + [(coding, coding) for coding in reversed(compression.available_codings())]
+    rows = []
+    for name, url in [('HTML', f'/tasks?per_page={args.tasks}'), ('JSON', f'/api/v1/tasks?per_page={args.tasks}')]:
+        for label, accept in codings:
+            median, size = measure(app, client, url, accept, args.repeat)
+            rows.append((name, label, f'{size / 1024:.1f}', f'{median:.1f}',
+                         f'{size * 8 / LINK_BITS_PER_SECOND * 1000:.1f}'))
+    print_table(('resposta', 'compressão', 'KiB', 'p50 ms', 'em 10 Mbit/s ms'), rows)
+    print()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        manifest = assets.build(app.static_folder, output_dir, app.config['ASSETS_COMPRESS_EXTENSIONS'])
+        rows = []
+        for filename, target in sorted(manifest.items()):
+            path = os.path.join(output_dir, target)
+            sizes = [os.path.getsize(path)] + [
+                os.path.getsize(path + suffix) if os.path.exists(path + suffix) else None
+                for suffix in (assets.ENCODING_SUFFIXES['gzip'], assets.ENCODING_SUFFIXES['br'])]
+            rows.append((filename, *('-' if size is None else str(size) for size in sizes)))
+    print_table(('arquivo', 'bytes', '.gz', '.br'), rows)
+
+
+if __name__ == '__main__':
+    main()
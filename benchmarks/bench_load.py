@@ -0,0 +1,267 @@
+# benchmarks/bench_load.py
+# Teste de carga das principais rotas sobre um banco populado por benchmarks/datagen.py.
+# Mede p50/p95/p99, requisições por segundo e consultas SQL por requisição de cada rota,
+# pelo cliente de teste do Flask (padrão) ou por HTTP num servidor WSGI local (--server).
+#
+# Uso:
+#   python -m benchmarks.bench_load --users 50 --tasks-per-user 200 --output resultado.json
+#   python -m benchmarks.bench_load --server --concurrency 4 --baseline resultado.json
+# Com --baseline, termina com código 1 se alguma rota regrediu além de --max-regression.
+import argparse
+import http.cookiejar
+import logging
+import platform
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from datetime import datetime, timezone
+from benchmarks.common import bootstrap, print_table
+from benchmarks import datagen, report
+
+
+class ClientDriver:
+    """Requisições pelo cliente de teste do Flask: mede a aplicação sem rede nem servidor."""
+    name = 'client'
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        return self.app.test_client()
+
+    def send(self, session, method, path, data=None):
+        response = session.open(path, method=method, data=data)
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None # O 302 é a resposta medida, não a página seguinte
+
+
+class ServerDriver:
+    """Requisições HTTP de verdade para um servidor WSGI (werkzeug, com threads) no mesmo processo."""
+    name = 'server'
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR) # Sem uma linha de log por requisição
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def session(self):
+        cookies = urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        return urllib.request.build_opener(cookies, _NoRedirect())
+
+    def send(self, session, method, path, data=None):
+        body = urllib.parse.urlencode(data, doseq=True).encode('ascii') if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with session.open(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    def close(self):
+        self.server.shutdown()
+
+
+class QueryCounter:
+    """Conta as consultas SQL emitidas pelo engine (todas as threads)."""
+
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        from sqlalchemy import event
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+
+
+class BenchUser:
+    """Um usuário gerado, com sua sessão logada e as tarefas usadas pelos cenários."""
+
+    def __init__(self, index, session, task_ids, pending_ids, cursor):
+        self.email = datagen.email_for(index)
+        self.session = session
+        self.task_ids = task_ids
+        self.pending_ids = pending_ids
+        self.cursor = cursor
+        self._views = 0
+
+    def next_task(self):
+        self._views += 1
+        return self.task_ids[self._views % len(self.task_ids)]
+
+    def next_pending(self):
+        # Cada requisição conclui uma tarefa pendente diferente enquanto houver
+        return self.pending_ids.pop() if self.pending_ids else self.task_ids[0]
+
+
+Scenario = namedtuple('Scenario', 'name expected_status build fresh_session', defaults=(False,))
+
+# Leituras primeiro: os cenários de escrita alteram os dados
+SCENARIOS = [
+    Scenario('home', 200, lambda user: ('GET', '/', None)),
+    Scenario('list', 200, lambda user: ('GET', '/tasks', None)),
+    Scenario('list_pending', 200, lambda user: ('GET', '/tasks?status=pendente', None)),
+    Scenario('list_page2', 200, lambda user: ('GET', f'/tasks?cursor={user.cursor}', None)),
+    Scenario('view', 200, lambda user: ('GET', f'/tasks/{user.next_task()}', None)),
+    Scenario('search', 200, lambda user: ('GET', '/tasks/search?q=relatorio', None)),
+    Scenario('api_list', 200, lambda user: ('GET', '/api/v1/tasks', None)),
+    Scenario('login', 302, lambda user: ('POST', '/auth/login', {'email': user.email, 'password': datagen.PASSWORD}),
+             fresh_session=True),
+    Scenario('create', 302, lambda user: ('POST', '/tasks/new', {'title': 'Nova tarefa de benchmark', 'status': 'pendente'})),
+    Scenario('complete', 302, lambda user: ('POST', f'/tasks/{user.next_pending()}/complete', None)),
+]
+
+
+def prepare_users(app, driver, user_ids, sessions):
+    from models import Task
+    from pagination import encode_cursor
+    with app.app_context():
+        tasks_by_user = [
+            Task.query.with_entities(Task.id, Task.status, Task.created_at)
+            .filter_by(user_id=user_id).order_by(Task.created_at.desc(), Task.id.desc()).all()
+            for user_id in user_ids[:sessions]
+        ]
+
+    # Os logins ficam fora do app_context acima: dentro dele, todas as requisições dividiriam o mesmo 'g'
+    users = []
+    for index, recent in enumerate(tasks_by_user):
+        session = driver.session()
+        status = driver.send(session, 'POST', '/auth/login',
+                             {'email': datagen.email_for(index), 'password': datagen.PASSWORD})
+        assert status == 302, f'login de {datagen.email_for(index)} falhou ({status})'
+        driver.send(session, 'GET', '/') # Consome a mensagem flash do login
+        edge = recent[min(19, len(recent) - 1)]
+        users.append(BenchUser(index, session, [row.id for row in recent],
+                               [row.id for row in recent if row.status == 'pendente'],
+                               encode_cursor(edge.created_at, edge.id)))
+    return users
+
+
+def run_scenario(driver, counter, scenario, users, requests, concurrency, warmup):
+    for i in range(warmup):
+        user = users[i % len(users)]
+        method, path, data = scenario.build(user)
+        driver.send(driver.session() if scenario.fresh_session else user.session, method, path, data)
+
+    latencies, errors = [], []
+    counter.reset()
+
+    def worker(number):
+        # Cada thread usa só as suas sessões: o cliente de teste não é compartilhável entre threads
+        own = users[number::concurrency]
+        for i in range(number, requests, concurrency):
+            user = own[(i // concurrency) % len(own)]
+            session = driver.session() if scenario.fresh_session else user.session
+            method, path, data = scenario.build(user)
+            start = time.perf_counter()
+            status = driver.send(session, method, path, data)
+            latencies.append(time.perf_counter() - start)
+            if status != scenario.expected_status:
+                errors.append(status)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return report.summarize(latencies, wall, counter.count, len(errors))
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga das rotas principais')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--tasks-per-user', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200, help='requisições medidas por rota')
+    parser.add_argument('--warmup', type=int, default=10, help='requisições descartadas antes de medir')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--sessions', type=int, default=10, help='usuários logados que revezam as requisições')
+    parser.add_argument('--server', action='store_true', help='usa HTTP num servidor WSGI local')
+    parser.add_argument('--routes', nargs='+', choices=[s.name for s in SCENARIOS])
+    parser.add_argument('--database-url', help='banco a usar (padrão: arquivo SQLite temporário)')
+    parser.add_argument('--output', help='grava o resultado neste arquivo JSON')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='aumento tolerado no p95 (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    app = bootstrap(args.database_url)
+    app.config['LOGIN_RATE_LIMIT_ENABLED'] = False # O cenário 'login' repete o login centenas de vezes do mesmo IP
+    user_ids = datagen.generate(app, args.users, args.tasks_per_user, args.seed)
+    driver = ServerDriver(app) if args.server else ClientDriver(app)
+    sessions = min(max(args.sessions, args.concurrency), len(user_ids))
+    users = prepare_users(app, driver, user_ids, sessions)
+    from extensions import db
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+
+    routes = {}
+    try:
+        for scenario in SCENARIOS:
+            if args.routes and scenario.name not in args.routes:
+                continue
+            routes[scenario.name] = run_scenario(driver, counter, scenario, users, args.requests,
+                                                 args.concurrency, args.warmup)
+    finally:
+        driver.close()
+
+    result = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'mode': driver.name,
+            'users': args.users, 'tasks_per_user': args.tasks_per_user, 'seed': args.seed,
+            'requests': args.requests, 'concurrency': args.concurrency,
+        },
+        'routes': routes,
+    }
+    print_table(('rota', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s', 'consultas/req', 'erros'), [
+        (name, r['p50_ms'], r['p95_ms'], r['p99_ms'], r['rps'], r['queries_per_request'], r['errors'])
+        for name, r in routes.items()
+    ])
+    if args.output:
+        report.save(args.output, result)
+
+    if args.baseline:
+        failures = report.compare(report.load(args.baseline), result, args.max_regression)
+        for failure in failures:
+            print(f'REGRESSÃO {failure}', file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        print(f'Sem regressões em relação a {args.baseline}.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/bench_login_flood.py
+# Latência de /tasks para um usuário logado enquanto uma rajada de logins com senha errada chega
+# de muitos IPs (login_guard.py). Cada cenário sobe um servidor WSGI (werkzeug, com threads) num
+# processo próprio; a rajada e as medidas saem deste processo, por HTTP.
+#
+#   * sem rajada: a referência;
+#   * sem proteção: cada tentativa calcula o hash na hora, como antes do login_guard (o pool tem
+#     uma thread por tentativa simultânea e nenhum limite);
+#   * pool de hash: no máximo LOGIN_HASH_WORKERS hashes ao mesmo tempo, sem limite de tentativas;
+#   * pool + limites: a configuração padrão, com os limites por IP e por conta.
+#
+# Uso: python -m benchmarks.bench_login_flood [--flooders 16] [--seconds 10]
+import argparse
+import http.client
+import logging
+import multiprocessing
+import statistics
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from benchmarks.common import bootstrap, print_table
+from benchmarks import datagen
+
+
+def serve(database_url, overrides, port_pipe):
+    from werkzeug.serving import make_server
+    from app import create_app
+    from config import engine_options
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app = create_app('production', SQLALCHEMY_DATABASE_URI=database_url,
+                     SQLALCHEMY_ENGINE_OPTIONS=engine_options(database_url), TESTING=True, WTF_CSRF_ENABLED=False,
+                     **overrides)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port_pipe.send(server.server_port)
+    server.serve_forever()
+
+
+def request(port, method, path, body=None, cookie=None, source_ip='127.0.0.1'):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60, source_address=(source_ip, 0))
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    if cookie:
+        headers['Cookie'] = cookie
+    try:
+        conn.request(method, path, body=urllib.parse.urlencode(body) if body else None, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response
+    finally:
+        conn.close()
+
+
+def login_cookie(port):
+    response = request(port, 'POST', '/auth/login', {'email': datagen.email_for(0), 'password': datagen.PASSWORD})
+    assert response.status == 302, 'login do benchmark falhou'
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+
+def flood(port, index, accounts, stop, statuses, lock):
+    """Logins errados sem parar, cada rajadeiro com seu próprio IP (127.0.x.y) e contas em rodízio."""
+    source_ip = f'127.0.{index // 250}.{index % 250 + 2}'
+    attempt = 0
+    while not stop.is_set():
+        account = accounts[(index + attempt) % len(accounts)]
+        response = request(port, 'POST', '/auth/login', {'email': account, 'password': 'senha-errada'},
+                           source_ip=source_ip)
+        with lock:
+            statuses[response.status] += 1
+        attempt += 1
+
+
+def run_scenario(database_url, overrides, flooders, seconds, accounts):
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    server = multiprocessing.get_context('fork').Process(target=serve, args=(database_url, overrides, sender), daemon=True)
+    server.start()
+    try:
+        port = receiver.recv()
+        cookie = login_cookie(port)
+        request(port, 'GET', '/tasks', cookie=cookie) # Aquece a listagem
+
+        stop, lock, statuses = threading.Event(), threading.Lock(), Counter()
+        threads = [threading.Thread(target=flood, args=(port, index, accounts, stop, statuses, lock), daemon=True)
+                   for index in range(flooders)]
+        for thread in threads:
+            thread.start()
+        time.sleep(1 if flooders else 0) # A rajada já no ritmo antes de medir
+
+        samples = []
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            start = time.perf_counter()
+            response = request(port, 'GET', '/tasks', cookie=cookie)
+            assert response.status == 200, response.status
+            samples.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.02)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return samples, statuses, elapsed
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latência de /tasks durante uma rajada de logins')
+    parser.add_argument('--flooders', type=int, default=16, help='clientes simultâneos fazendo login errado')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=20)
+    args = parser.parse_args()
+
+    app = bootstrap()
+    datagen.generate(app, args.users, 200)
+    database_url = app.config['SQLALCHEMY_DATABASE_URI']
+    accounts = [datagen.email_for(i) for i in range(1, args.users)] # O usuário 0 é o que mede /tasks
+
+    unbounded = {'LOGIN_HASH_WORKERS': args.flooders, 'LOGIN_HASH_QUEUE': args.flooders}
+    scenarios = [
+        ('sem rajada', 0, {}),
+        ('sem proteção', args.flooders, dict(unbounded, LOGIN_RATE_LIMIT_ENABLED=False)),
+        ('pool de hash', args.flooders, {'LOGIN_RATE_LIMIT_ENABLED': False}),
+        ('pool + limites', args.flooders, {}),
+    ]
+    rows = []
+    for name, flooders, overrides in scenarios:
+        samples, statuses, elapsed = run_scenario(database_url, overrides, flooders, args.seconds, accounts)
+        percentiles = statistics.quantiles(samples, n=100)
+        rows.append((name, f'{statistics.median(samples):.1f}', f'{percentiles[94]:.1f}', f'{percentiles[98]:.1f}',
+                     f'{sum(statuses.values()) / elapsed:.0f}',
+                     ' '.join(f'{status}:{count}' for status, count in sorted(statuses.items())) or '-'))
+    print_table(('cenário', '/tasks p50 ms', 'p95', 'p99', 'logins/s', 'respostas do login'), rows)
+
+
+if __name__ == '__main__':
+    main()
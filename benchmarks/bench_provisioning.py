@@ -0,0 +1,60 @@
+# benchmarks/bench_provisioning.py
+# Cadastrar N usuários pela rota /auth/register, um a um (cliente de teste, sem HTTP), contra o
+# comando 'flask provision-users' com o hash no próprio processo e num pool de processos.
+#
+# O hash de senha domina os dois caminhos: com o scrypt de produção, o ganho do comando vem do pool
+# de processos (um hash por núcleo ao mesmo tempo). Com um hash barato (--hash-method
+# pbkdf2:sha256:1000), sobra o custo de consultas e commits, que o comando faz por lote.
+#
+# Uso: python -m benchmarks.bench_provisioning [--users 200] [--hash-method scrypt:32768:8:1]
+import argparse
+import json
+import os
+import tempfile
+from benchmarks.common import bootstrap, print_table, timed
+
+
+def via_register(app, users):
+    client = app.test_client()
+    for user in users:
+        response = client.post('/auth/register', data=dict(user, confirm_password=user['password']))
+        assert response.status_code == 302, 'cadastro do benchmark falhou'
+
+
+def via_command(app, path, workers):
+    result = app.test_cli_runner().invoke(args=['provision-users', path, '--workers', str(workers)])
+    assert result.exit_code == 0 and ', 0 linhas com erro' in result.output, result.output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='/auth/register um a um x flask provision-users')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--hash-method', help='PASSWORD_HASH_METHOD (padrão: o do perfil de produção)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processos de hash do pool')
+    args = parser.parse_args()
+
+    rows = []
+    scenarios = [('register, um a um', None), ('provision-users, 1 processo', 1),
+                 (f'provision-users, {args.workers} processos', args.workers)]
+    for name, workers in scenarios:
+        app = bootstrap() # Banco novo a cada cenário: os mesmos usuários, nenhum repetido
+        if args.hash_method:
+            app.config['PASSWORD_HASH_METHOD'] = args.hash_method
+        users = [{'username': f'novo{i}', 'email': f'novo{i}@example.com', 'password': f'senha-{i}'}
+                 for i in range(args.users)]
+        if workers is None:
+            _, seconds = timed(via_register, app, users)
+        else:
+            with tempfile.TemporaryDirectory(prefix='bench-provisioning-') as directory:
+                path = os.path.join(directory, 'usuarios.ndjson')
+                with open(path, 'w', encoding='utf-8') as users_file:
+                    users_file.writelines(json.dumps(user) + '\n' for user in users)
+                _, seconds = timed(via_command, app, path, workers)
+        rows.append((name, f'{seconds:.2f}', f'{args.users / seconds:.0f}'))
+
+    print(f"{args.users} usuários, hash {args.hash_method or 'de produção'}, {os.cpu_count()} CPU(s)")
+    print_table(('caminho', 'segundos', 'usuários/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
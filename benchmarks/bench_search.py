@@ -0,0 +1,77 @@
+# benchmarks/bench_search.py
+# Compara a busca pelo índice FTS5 (search.py) com um LIKE '%termo%' no título e na descrição,
+# que precisa ler todas as tarefas do usuário.
+#
+# Uso: python -m benchmarks.bench_search [--tasks 100000] [--repeat 20] [--terms relatorio ...]
+import argparse
+import random
+from datetime import datetime, timedelta
+from benchmarks.common import bootstrap, create_user, timed, print_table
+
+WORDS = ('relatório reunião cliente fatura projeto revisar enviar comprar agendar backend deploy '
+         'orçamento contrato planilha treinamento entrevista viagem pagamento servidor banco '
+         'documentação suporte campanha marketing estoque fornecedor auditoria').split()
+
+def seed_text_tasks(app, user_id, count, seed=42):
+    """Tarefas com título e descrição sorteados de um vocabulário fixo (sempre os mesmos dados)."""
+    from extensions import db
+    from models import Task
+    rng = random.Random(seed)
+    clients = [f'cliente{n:04d}' for n in range(5000)] # Termos raros: ~count/5000 tarefas cada
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        for start in range(0, count, 10000):
+            db.session.execute(Task.__table__.insert(), [
+                {'title': ' '.join(rng.choices(WORDS, k=3)).capitalize(),
+                 'description': ' '.join(rng.choices(WORDS, k=20)) + f' {rng.choice(clients)} lote-{i}',
+                 'status': 'pendente', 'user_id': user_id, 'created_at': base + timedelta(seconds=i)}
+                for i in range(start, min(start + 10000, count))
+            ])
+        db.session.commit()
+
+def fts_search(term, user_id, limit):
+    from search import search_query
+    return search_query(user_id, term).limit(limit).all()
+
+def like_search(term, user_id, limit):
+    """A alternativa ingênua: todas as palavras em qualquer posição do título ou da descrição."""
+    from sqlalchemy import or_
+    from models import Task
+    query = Task.query.filter(Task.user_id == user_id)
+    for word in term.split():
+        pattern = f'%{word}%'
+        query = query.filter(or_(Task.title.like(pattern), Task.description.like(pattern)))
+    return query.order_by(Task.created_at.desc()).limit(limit).all()
+
+def best_of(repeat, func, *args):
+    return min(timed(func, *args)[1] for _ in range(repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description='Busca FTS5 x LIKE')
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=20, help='tamanho da página de resultados')
+    # Termos frequentes (metade das tarefas), raros (cliente0042: ~20 tarefas), únicos e ausentes.
+    # Nos frequentes o FTS5 ordena todos os acertos por relevância, enquanto o LIKE para nas 20 primeiras linhas.
+    parser.add_argument('--terms', nargs='+',
+                        default=['relatório', 'auditoria contrato', 'cliente0042', 'lote-99999', 'inexistente'])
+    args = parser.parse_args()
+
+    app = bootstrap()
+    user_id = create_user(app, 'benchsearch')
+    _, seed_seconds = timed(seed_text_tasks, app, user_id, args.tasks)
+    print(f'{args.tasks} tarefas inseridas (e indexadas) em {seed_seconds:.1f}s\n')
+
+    rows = []
+    with app.app_context():
+        for term in args.terms:
+            found = len(fts_search(term, user_id, args.limit)), len(like_search(term, user_id, args.limit))
+            fts_seconds = best_of(args.repeat, fts_search, term, user_id, args.limit)
+            like_seconds = best_of(args.repeat, like_search, term, user_id, args.limit)
+            rows.append((term, '%d / %d' % found, f'{fts_seconds * 1000:.2f}', f'{like_seconds * 1000:.2f}',
+                         f'{like_seconds / fts_seconds:.1f}x'))
+
+    print_table(('termo', 'resultados FTS5 / LIKE', 'FTS5 (ms)', 'LIKE (ms)', 'ganho'), rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_shards.py
+# Vazão de escrita com vários processos (como os workers do gunicorn) e as tarefas divididas em
+# 1, 2 e 4 shards (sharding.py). Cada processo cria a sua aplicação e grava, sem parar, uma tarefa +
+# a versão de dados + commit para um dos seus usuários. Os usuários de cada processo são todos de um
+# mesmo shard (processo i -> shard i % N), para que a carga se divida por igual entre os shards.
+#
+# Com um banco só, todos os commits disputam a trava de escrita do mesmo arquivo; com N shards, até
+# N commits andam ao mesmo tempo. O ganho depende de o commit esperar pelo disco (--synchronous FULL,
+# um fsync por commit) e de haver núcleos para os processos: o benchmark mostra os dois casos.
+#
+# Uso: python -m benchmarks.bench_shards [--processes 4] [--seconds 5] [--synchronous NORMAL]
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from benchmarks.common import print_table
+
+SHARD_COUNTS = (1, 2, 4)
+
+
+def make_app(directory, shards, synchronous):
+    from app import create_app
+    from config import SQLITE_CONCURRENT_PRAGMAS
+    return create_app('production', SQLALCHEMY_DATABASE_URI=f'sqlite:///{directory}/catalog.db',
+                      SHARD_COUNT=shards, SHARD_DATABASE_URL=f'sqlite:///{directory}/shard-{{shard}}.db',
+                      SQLITE_PRAGMAS=dict(SQLITE_CONCURRENT_PRAGMAS, synchronous=synchronous),
+                      REMINDER_SCHEDULER_ENABLED=False, TESTING=True)
+
+
+def prepare(directory, shards, processes, synchronous):
+    """Cria os bancos e os usuários; retorna [(id, shard)] dos usuários de cada processo."""
+    import migrations
+    from extensions import db
+    from models import User
+    app = make_app(directory, shards, synchronous)
+    with app.app_context():
+        migrations.upgrade_all()
+        users = []
+        while min(sum(1 for _, shard in users if shard == s) for s in range(shards)) < processes:
+            user = User(username=f'bench{len(users)}', email=f'bench{len(users)}@example.com', password_hash='-')
+            db.session.add(user)
+            db.session.commit()
+            users.append((user.id, user.shard))
+        db.engine.dispose()
+    return [[user for user in users if user[1] == index % shards][:2] for index in range(processes)]
+
+
+def write(directory, shards, synchronous, users, start, seconds, results):
+    from sqlalchemy.exc import OperationalError
+    from extensions import db
+    from models import Task
+    from sharding import use_shard
+    from versioning import bump_data_version
+    app = make_app(directory, shards, synchronous)
+    commits = errors = 0
+    with app.app_context(), use_shard(users[0][1]):
+        start.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            user_id, _ = users[commits % len(users)]
+            try:
+                db.session.add(Task(title=f'Tarefa {commits}', user_id=user_id))
+                bump_data_version(user_id)
+                db.session.commit()
+                commits += 1
+            except OperationalError: # database is locked: o busy_timeout acabou
+                db.session.rollback()
+                errors += 1
+    results.put((commits, errors))
+
+
+def run(shards, processes, seconds, synchronous):
+    context = multiprocessing.get_context('fork')
+    with tempfile.TemporaryDirectory(prefix='bench-shards-') as directory:
+        assignments = prepare(directory, shards, processes, synchronous)
+        start, results = context.Event(), context.Queue()
+        workers = [context.Process(target=write, args=(directory, shards, synchronous, users, start, seconds, results))
+                   for users in assignments]
+        for worker in workers:
+            worker.start()
+        time.sleep(1) # Todos os processos com a aplicação criada antes de começar
+        start.set()
+        totals = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+    return sum(commits for commits, _ in totals), sum(errors for _, errors in totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Commits por segundo com as tarefas em 1, 2 e 4 shards')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--synchronous', default='NORMAL', choices=('OFF', 'NORMAL', 'FULL'))
+    args = parser.parse_args()
+
+    rows, baseline = [], None
+    for shards in SHARD_COUNTS:
+        commits, errors = run(shards, args.processes, args.seconds, args.synchronous)
+        rate = commits / args.seconds
+        baseline = baseline or rate
+        rows.append((shards, commits, f'{rate:.0f}', f'{rate / baseline:.2f}x', errors))
+    print(f'{args.processes} processos, {args.seconds:g} s, synchronous={args.synchronous}, {os.cpu_count()} CPU(s)')
+    print_table(('shards', 'commits', 'commits/s', 'vs 1 shard', 'erros'), rows)
+
+
+if __name__ == '__main__':
+    main()
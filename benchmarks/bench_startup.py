@@ -0,0 +1,104 @@
+# benchmarks/bench_startup.py
+# Custo de inicialização: quanto um processo novo leva para importar app.py, criar a aplicação
+# (create_app) e atender as primeiras requisições. Cada medida roda num interpretador novo, já que
+# os módulos importados ficam em cache. Três modos:
+#   * padrão: create_app() no próprio processo que atende (flask run, um worker sem --preload);
+#   * preload: create_app(preload=True), com o aquecimento feito antes da primeira requisição;
+#   * preload + fork: o processo mestre cria a aplicação e um worker criado por fork atende, como no
+#     'gunicorn --preload'. O worker não paga importação nem criação, só a primeira requisição.
+#
+# Uso: python -m benchmarks.bench_startup [--runs 7]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from benchmarks.common import bootstrap, create_user, print_table, seed_tasks
+
+MODES = [('padrão', False, False), ('preload', True, False), ('preload + fork', True, True)]
+USERNAME = 'benchstartup'
+
+
+def serve_first_requests(app):
+    """Tempos (ms) da primeira página anônima, da primeira listagem logada e da listagem já aquecida."""
+    client = app.test_client()
+    start = time.perf_counter()
+    assert client.get('/auth/login').status_code == 200
+    first_page = time.perf_counter() - start
+    response = client.post('/auth/login', data={'email': f'{USERNAME}@example.com', 'password': 'benchpass'})
+    assert response.status_code == 302
+    start = time.perf_counter()
+    assert client.get('/tasks').status_code == 200
+    first_list = time.perf_counter() - start
+    samples = []
+    for _ in range(20):
+        start = time.perf_counter()
+        client.get('/tasks')
+        samples.append(time.perf_counter() - start)
+    return {'first_page': first_page * 1000, 'first_list': first_list * 1000,
+            'warm_list': statistics.median(samples) * 1000}
+
+
+def child(database_url, preload, fork):
+    """Executado num interpretador novo: imprime os tempos medidos em JSON."""
+    start = time.perf_counter()
+    from app import create_app
+    imported = time.perf_counter()
+    app = create_app('production', preload=preload, SQLALCHEMY_DATABASE_URI=database_url,
+                     TESTING=True, WTF_CSRF_ENABLED=False)
+    created = time.perf_counter()
+    result = {'import': (imported - start) * 1000, 'create': (created - imported) * 1000}
+    if not fork:
+        result.update(serve_first_requests(app))
+    else:
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            with os.fdopen(write_end, 'w') as pipe:
+                pipe.write(json.dumps(serve_first_requests(app)))
+            os._exit(0)
+        os.close(write_end)
+        with os.fdopen(read_end) as pipe:
+            result.update(json.loads(pipe.read()))
+        os.waitpid(pid, 0)
+    print(json.dumps(result))
+
+
+def run_child(database_url, preload, fork):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_startup', '--child', database_url,
+         '--preload' if preload else '--no-preload', '--fork' if fork else '--no-fork'],
+        capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de importação, criação e primeiras requisições')
+    parser.add_argument('--runs', type=int, default=7, help='processos por modo (mediana)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--preload', action=argparse.BooleanOptionalAction, help=argparse.SUPPRESS)
+    parser.add_argument('--fork', action=argparse.BooleanOptionalAction, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.preload, args.fork)
+
+    app = bootstrap()
+    seed_tasks(app, create_user(app, USERNAME), 200)
+    database_url = app.config['SQLALCHEMY_DATABASE_URI']
+
+    rows = []
+    for name, preload, fork in MODES:
+        runs = [run_child(database_url, preload, fork) for _ in range(args.runs)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        worker = 0 if fork else median['import'] + median['create'] # O que o worker paga antes de atender
+        rows.append((name, f"{median['import']:.1f}", f"{median['create']:.1f}", f"{worker:.1f}",
+                     f"{median['first_page']:.1f}", f"{median['first_list']:.1f}", f"{median['warm_list']:.2f}"))
+    print_table(('modo (mediana ms)', 'import', 'create_app', 'no worker', '1ª página', '1ª listagem',
+                 'listagem aquecida'), rows)
+
+
+if __name__ == '__main__':
+    main()
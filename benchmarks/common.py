@@ -0,0 +1,77 @@
+# benchmarks/common.py
+# Utilitários compartilhados pelos benchmarks: app sobre um banco SQLite temporário em arquivo,
+# criação de usuários, login pelo cliente de teste e carga de tarefas em lote.
+import atexit
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def bootstrap(database_url=None):
+    """
+    Cria uma aplicação apontando para um banco próprio do benchmark.
+    """
+    if database_url is None:
+        fd, path = tempfile.mkstemp(prefix='bench-', suffix='.db')
+        os.close(fd)
+        atexit.register(os.remove, path)
+        database_url = f'sqlite:///{path}'
+
+    from app import create_app
+    from config import engine_options
+    import migrations
+    app = create_app(os.environ.get('APP_ENV') or 'production', # PRAGMAs e pool de produção
+                     SQLALCHEMY_DATABASE_URI=database_url, SQLALCHEMY_ENGINE_OPTIONS=engine_options(database_url),
+                     TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        migrations.upgrade()
+    return app
+
+def create_user(app, username, password='benchpass'):
+    from extensions import db
+    from models import User
+    with app.app_context():
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+def login(client, username, password='benchpass'):
+    response = client.post('/auth/login', data={'email': f'{username}@example.com', 'password': password})
+    assert response.status_code == 302, 'login do benchmark falhou'
+
+def seed_tasks(app, user_id, count, status='pendente'):
+    """Insere 'count' tarefas num único INSERT em lote e retorna seus ids."""
+    from extensions import db
+    from models import Task
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        db.session.execute(Task.__table__.insert(), [
+            {'title': f'Tarefa de benchmark {i}', 'status': status, 'user_id': user_id,
+             'created_at': base + timedelta(seconds=i)}
+            for i in range(count)
+        ])
+        db.session.commit()
+        return [task_id for (task_id,) in
+                db.session.query(Task.id).filter_by(user_id=user_id).order_by(Task.id)]
+
+def clear_tasks(app, user_id):
+    from extensions import db
+    from models import Task
+    with app.app_context():
+        Task.query.filter_by(user_id=user_id).delete()
+        db.session.commit()
+
+def timed(func, *args, **kwargs):
+    """Executa func e retorna (resultado, segundos decorridos)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def print_table(headers, rows):
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    line = '  '.join(f'{{:>{width}}}' for width in widths)
+    print(line.format(*headers))
+    for row in rows:
+        print(line.format(*row))
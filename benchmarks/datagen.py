@@ -0,0 +1,86 @@
+# benchmarks/datagen.py
+# Gerador determinístico de dados: N usuários x M tarefas com distribuições parecidas com as reais.
+# A mesma semente gera sempre os mesmos registros, então duas execuções do benchmark são comparáveis.
+import random
+from datetime import datetime, timedelta
+
+PASSWORD = 'benchpass'
+REFERENCE_DATE = datetime(2025, 1, 1) # "Hoje" dos dados gerados: independe do relógio da máquina
+
+VERBS = 'Revisar Enviar Comprar Agendar Preparar Atualizar Corrigir Ligar Organizar Publicar'.split()
+NOUNS = ('relatório reunião fatura contrato planilha apresentação orçamento proposta documentação '
+         'backup campanha entrevista viagem pagamento treinamento').split()
+DETAILS = ('com o cliente para a diretoria até sexta antes do deploy do trimestre da equipe '
+           'conforme combinado urgente revisão final').split()
+
+# Distribuições: cerca de 40% das tarefas concluídas; 35% sem prazo, o resto com prazo entre
+# 30 dias atrás e 60 dias à frente (parte das pendentes fica atrasada); descrição em 70% delas.
+COMPLETED_RATIO = 0.4
+NO_DUE_DATE_RATIO = 0.35
+DESCRIPTION_RATIO = 0.7
+
+
+def username_for(index):
+    return f'bench{index:05d}'
+
+
+def email_for(index):
+    return f'{username_for(index)}@example.com'
+
+
+def task_rows(rng, user_id, count, completed_ratio=COMPLETED_RATIO):
+    for _ in range(count):
+        created_at = REFERENCE_DATE - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        due_date = None
+        if rng.random() >= NO_DUE_DATE_RATIO:
+            due_date = (REFERENCE_DATE + timedelta(days=rng.randint(-30, 60))).replace(hour=0, minute=0, second=0)
+        description = None
+        if rng.random() < DESCRIPTION_RATIO:
+            description = ' '.join(rng.choices(DETAILS, k=rng.randint(3, 12)))
+        title = f'{rng.choice(VERBS)} {rng.choice(NOUNS)} {rng.randrange(1000)}'
+        completed = rng.random() < completed_ratio
+        yield {
+            'title': title,
+            'description': description,
+            'status': 'concluida' if completed else 'pendente',
+            'created_at': created_at,
+            'due_date': due_date,
+            # Concluída no meio do caminho entre a criação e "hoje" (sem sortear: não muda a sequência da semente)
+            'completed_at': created_at + (REFERENCE_DATE - created_at) / 2 if completed else None,
+            'user_id': user_id,
+        }
+
+
+def generate(app, users, tasks_per_user, seed=42, chunk_size=5000, completed_ratio=COMPLETED_RATIO):
+    """
+    Insere os usuários e as tarefas em lotes e retorna a lista de ids dos usuários.
+    Todos os usuários têm a senha PASSWORD; o hash é calculado uma única vez.
+    """
+    from werkzeug.security import generate_password_hash
+    from extensions import db
+    from models import User, Task
+    import stats
+
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(PASSWORD)
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {'username': username_for(i), 'email': email_for(i), 'password_hash': password_hash}
+            for i in range(users)
+        ])
+        user_ids = [user_id for (user_id,) in
+                    db.session.query(User.id).filter(User.username.like('bench%')).order_by(User.id)]
+
+        chunk = []
+        for user_id in user_ids:
+            for row in task_rows(rng, user_id, tasks_per_user, completed_ratio):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    db.session.execute(Task.__table__.insert(), chunk)
+                    chunk = []
+        if chunk:
+            db.session.execute(Task.__table__.insert(), chunk)
+        # Os INSERTs em lote não passam pelos contadores do painel: eles são calculados de uma vez no fim
+        stats.reconcile(db.session.connection())
+        db.session.commit()
+    return user_ids
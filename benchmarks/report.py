@@ -0,0 +1,67 @@
+# benchmarks/report.py
+# Resumo estatístico das medições e comparação com uma execução anterior (baseline) em JSON.
+import json
+import statistics
+
+# Diferenças abaixo disso são ruído de medição, mesmo que a variação relativa seja grande
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+def percentile(sorted_values, fraction):
+    """Percentil com interpolação linear entre as duas amostras vizinhas."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies, wall_seconds, queries, errors=0):
+    """latencies em segundos; queries é o total de consultas SQL emitidas pelas requisições medidas."""
+    values = sorted(latency * 1000 for latency in latencies)
+    count = len(values)
+    return {
+        'requests': count,
+        'errors': errors,
+        'p50_ms': round(percentile(values, 0.50), 3),
+        'p95_ms': round(percentile(values, 0.95), 3),
+        'p99_ms': round(percentile(values, 0.99), 3),
+        'mean_ms': round(statistics.fmean(values), 3) if values else 0.0,
+        'rps': round(count / wall_seconds, 1) if wall_seconds else 0.0,
+        'queries_per_request': round(queries / count, 2) if count else 0.0,
+    }
+
+
+def compare(baseline, current, max_regression=0.25, max_extra_queries=0.0):
+    """
+    Lista as regressões de 'current' em relação a 'baseline' (os dois no formato gerado pelo
+    bench_load): p95 mais de max_regression acima do anterior, mais consultas por requisição
+    ou qualquer erro. Lista vazia = nenhuma regressão.
+    """
+    failures = []
+    for route, now in current['routes'].items():
+        if now['errors']:
+            failures.append(f'{route}: {now["errors"]} respostas com status inesperado')
+        before = baseline['routes'].get(route)
+        if before is None:
+            continue
+        limit = before['p95_ms'] * (1 + max_regression)
+        if now['p95_ms'] > limit and now['p95_ms'] - before['p95_ms'] > MIN_LATENCY_DELTA_MS:
+            failures.append(f'{route}: p95 {now["p95_ms"]:.2f} ms > {limit:.2f} ms '
+                            f'(baseline {before["p95_ms"]:.2f} ms + {max_regression:.0%})')
+        if now['queries_per_request'] > before['queries_per_request'] + max_extra_queries:
+            failures.append(f'{route}: {now["queries_per_request"]} consultas por requisição '
+                            f'(baseline {before["queries_per_request"]})')
+    return failures
+
+
+def load(path):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def save(path, result):
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(result, fh, indent=2, ensure_ascii=False)
+        fh.write('\n')
@@ -0,0 +1,60 @@
+# compression.py
+# Compressão das respostas dinâmicas (HTML e JSON), negociada pelo cabeçalho Accept-Encoding. Usa
+# brotli quando o pacote opcional 'brotli' está instalado e o navegador aceita, senão gzip. Só
+# comprime respostas com corpo pronto e de pelo menos COMPRESS_MIN_SIZE bytes; respostas em
+# streaming (exportação, SSE) e arquivos enviados do disco (send_file, assets.py) passam direto.
+#
+# O ETag de uma resposta comprimida vira fraco (W/"..."): os bytes mudaram, mas o conteúdo é o
+# mesmo, e o If-None-Match usa comparação fraca (versioning.conditional_page, API).
+import gzip
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError: # Opcional: sem ele, só gzip
+    brotli = None
+
+
+def available_codings():
+    """Codificações suportadas, na ordem de preferência do servidor."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encodings, codings=None):
+    """A codificação aceita pelo cliente com maior qualidade (empate: a preferida do servidor), ou None."""
+    return accept_encodings.best_match(codings or available_codings())
+
+
+def compress(data, coding, level=None):
+    """Comprime os bytes com a codificação dada; level=None usa o nível máximo (para o build dos assets)."""
+    if coding == 'br':
+        return brotli.compress(data, quality=11 if level is None else level)
+    if coding == 'gzip':
+        # mtime=0: o mesmo conteúdo gera sempre os mesmos bytes (ETags e builds reproduzíveis)
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    raise ValueError(f'Codificação desconhecida: {coding!r}')
+
+
+def compress_response(response):
+    config = current_app.config
+    if (not config['COMPRESS_ENABLED'] or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in config['COMPRESS_MIMETYPES']
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    response.vary.add('Accept-Encoding') # Mesmo sem comprimir: outra requisição poderia receber a versão comprimida
+    coding = negotiate(request.accept_encodings)
+    data = response.get_data()
+    if coding is None or len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+    level = config['COMPRESS_BROTLI_QUALITY'] if coding == 'br' else config['COMPRESS_GZIP_LEVEL']
+    response.set_data(compress(data, coding, level))
+    response.headers['Content-Encoding'] = coding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
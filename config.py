@@ -1,6 +1,139 @@
 import os
 
+def engine_options(uri):
+    """Opções do pool de conexões; só fazem sentido para bancos servidor (PostgreSQL, MySQL...)."""
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE') or 10),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 20),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE') or 1800), # Segundos; evita conexões derrubadas pelo servidor
+        'pool_pre_ping': True, # Testa a conexão antes de usá-la
+    }
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'uma-chave-secreta-bem-segura' # Mudar em produção!
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///site.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # PRAGMAs aplicados a cada nova conexão SQLite (extensions.init_db); vazio = padrões do SQLite
+    SQLITE_PRAGMAS = {}
+    APP_VERSION = '1.1' # Entra nos ETags: mudar de versão invalida as páginas em cache dos navegadores
+    TASKS_PER_PAGE = int(os.environ.get('TASKS_PER_PAGE') or 20) # Tamanho padrão da página em /tasks
+    TASKS_MAX_PER_PAGE = 100 # Limite para o parâmetro ?per_page=
+    BULK_MAX_TASKS = 1000 # Máximo de tarefas por operação em lote (/tasks/bulk)
+    EXPORT_BATCH_SIZE = 1000 # Tarefas lidas do banco por vez na exportação (transfer.py)
+    IMPORT_BATCH_SIZE = 1000 # Tarefas por INSERT (e por commit) na importação
+    # Cadastro em massa (provisioning.py, 'flask provision-users'): usuários por INSERT e processos de hash
+    PROVISION_BATCH_SIZE = 1000
+    PROVISION_HASH_WORKERS = int(os.environ.get('PROVISION_HASH_WORKERS') or os.cpu_count() or 1)
+    # Cache de fragmentos da listagem: 'memory' (por processo) ou 'filesystem' (compartilhado entre workers)
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND') or 'memory'
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES') or 1000)
+    # FRAGMENT_CACHE_DIR: padrão instance/fragment_cache (backend 'filesystem')
+    # Cache do usuário da sessão (user_cache.py): em outros workers, uma alteração pode levar até TTL segundos
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+    USER_CACHE_MAX_ENTRIES = 10000
+    # Instrumentação por requisição (profiling.py): Server-Timing e log JSON; desligada por padrão
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE') or 0) # Fração das requisições sob o cProfile
+    PROFILING_SLOW_MS = float(os.environ.get('PROFILING_SLOW_MS') or 500) # Só grava o perfil acima deste tempo
+    PROFILING_LOG_FILE = os.environ.get('PROFILING_LOG_FILE') # Grava as linhas JSON do logger 'profiling' neste arquivo (sem ele, vão para o stderr)
+    # PROFILING_DIR: padrão instance/profiles
+    # Lembretes de prazo (reminders.py): 'log' (logger 'reminders') ou 'file' (uma linha JSON por lembrete)
+    REMINDER_SINK = os.environ.get('REMINDER_SINK') or 'log'
+    # REMINDER_SINK_FILE: padrão instance/reminders.ndjson
+    REMINDER_DUE_SOON_DAYS = 1 # Lembra das tarefas que vencem hoje ou nos próximos N dias
+    REMINDER_OVERDUE_LOOKBACK_DAYS = 7 # Tarefas vencidas há mais tempo não geram lembrete novo
+    REMINDER_BATCH_SIZE = 500
+    REMINDER_CLAIM_TIMEOUT = 300 # Segundos até um lote reservado por um worker que caiu voltar à fila
+    # Agendador dentro do processo da aplicação; sem ele, use 'flask send-reminders' no cron
+    REMINDER_SCHEDULER_ENABLED = os.environ.get('REMINDER_SCHEDULER_ENABLED') == '1'
+    REMINDER_INTERVAL = int(os.environ.get('REMINDER_INTERVAL') or 300)
+    # Atualizações ao vivo (live.py, SSE): 'memory' (por processo) ou 'sqlite' (arquivo compartilhado entre workers)
+    LIVE_BROKER = os.environ.get('LIVE_BROKER') or 'memory'
+    # LIVE_BROKER_PATH: padrão instance/live_events.db (broker 'sqlite')
+    LIVE_QUEUE_SIZE = 100 # Eventos pendentes por conexão; acima disso o navegador recebe um 'refresh'
+    LIVE_HEARTBEAT = 15 # Segundos entre os comentários que mantêm a conexão ociosa viva
+    LIVE_POLL_INTERVAL = 0.5 # Segundos entre as leituras do arquivo de eventos (broker 'sqlite')
+    LIVE_RETENTION = 60 # Segundos que um evento fica no arquivo (broker 'sqlite')
+    LIVE_SUBSCRIBER_TTL = 30 # Prazo, renovado pelo worker, da anotação de quem está ouvindo (broker 'sqlite')
+    # Arquivamento (archive.py, 'flask archive-tasks'): tarefas concluídas há mais de N dias saem da tabela task
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS') or 90)
+    ARCHIVE_BATCH_SIZE = 500 # Tarefas movidas por transação
+    # Painel da página inicial (stats.py): pendentes que vencem entre hoje e os próximos N dias
+    STATS_DUE_SOON_DAYS = 7
+    # Login (login_guard.py). Mudar o método ou o custo do hash refaz cada senha no próximo login certo
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    LOGIN_RATE_LIMIT_ENABLED = True
+    LOGIN_LIMIT_STORE = os.environ.get('LOGIN_LIMIT_STORE') or 'memory' # 'memory' (por processo) ou 'sqlite' (entre workers)
+    # LOGIN_LIMIT_STORE_PATH: padrão instance/login_limits.db (store 'sqlite')
+    LOGIN_LIMIT_WINDOW = 300 # Segundos da janela deslizante
+    LOGIN_LIMIT_PER_IP = 30 # Tentativas de um IP na janela, certas ou erradas
+    LOGIN_LIMIT_PER_ACCOUNT = 5 # Tentativas erradas numa conta na janela; um login certo zera
+    LOGIN_LIMIT_MAX_KEYS = 100000 # Store em memória: IPs e contas lembrados (os mais antigos saem primeiro)
+    LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS') or max(1, (os.cpu_count() or 2) // 2))
+    LOGIN_HASH_QUEUE = 32 # Verificações rodando ou esperando por processo; acima disso o login responde 503
+    # Modo ASGI (async_app.py, asgi.py): blueprints com as views no event loop e o banco assíncrono
+    # ('live': as conexões SSE abertas esperam no loop, sem ocupar o pool de threads)
+    ASGI_ASYNC_BLUEPRINTS = ('tasks', 'auth', 'live')
+    ASGI_SYNC_THREADS = int(os.environ.get('ASGI_SYNC_THREADS') or 16) # Demais rotas: pool de threads WSGI
+    # Shards das tarefas (sharding.py): o shard 0 é o banco principal; os demais seguem o modelo abaixo
+    SHARD_COUNT = int(os.environ.get('SHARD_COUNT') or 1)
+    SHARD_DATABASE_URL = os.environ.get('SHARD_DATABASE_URL') or 'sqlite:///shard-{shard}.db' # Relativo: em instance/
+    # Réplicas de leitura do banco principal (replicas.py): URLs separadas por vírgula
+    REPLICA_DATABASE_URLS = [url for url in (os.environ.get('REPLICA_DATABASE_URLS') or '').split(',') if url]
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS') or 10) # Leituras no primário depois de uma escrita
+    REPLICA_SYNC_INTERVAL = 5 # 'flask sync-replicas --loop': segundos entre as cópias
+    # Arquivos estáticos (assets.py, 'flask build-assets'): nomes com hash, .gz/.br e cache immutable
+    ASSETS_FINGERPRINT = True # Usa o manifesto do build; desligado, asset_url() aponta para /static/
+    # ASSETS_DIR: padrão static/dist
+    ASSETS_COMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+    # Compressão das respostas dinâmicas (compression.py); brotli só com o pacote 'brotli' instalado
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') == '1' # Desligue se o proxy já comprime
+    COMPRESS_MIN_SIZE = 1024 # Bytes; abaixo disso os cabeçalhos custam mais do que se economiza
+    COMPRESS_MIMETYPES = ('text/html', 'application/json')
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 4 # Níveis altos do brotli custam caro demais para cada requisição
+
+# Com vários workers escrevendo no mesmo arquivo: WAL deixa leitores e o escritor trabalharem em paralelo,
+# e busy_timeout faz o escritor esperar pela trava em vez de falhar com "database is locked".
+SQLITE_CONCURRENT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL', # Seguro com WAL: só perde as últimas transações numa queda de energia
+    'busy_timeout': 5000, # Milissegundos
+}
+
+class DevelopmentConfig(Config):
+    SQLITE_PRAGMAS = dict(SQLITE_CONCURRENT_PRAGMAS)
+    ASSETS_FINGERPRINT = False # Alterações em static/ aparecem sem rodar o build
+
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False # Desativa CSRF para facilitar os testes de formulário
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000' # Hash barato: os testes fazem centenas de logins
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    REPLICA_DATABASE_URLS = [] # Os testes de réplicas (test_replicas.py) montam as suas
+
+class ProductionConfig(Config):
+    SQLITE_PRAGMAS = dict(
+        SQLITE_CONCURRENT_PRAGMAS,
+        cache_size=int(os.environ.get('SQLITE_CACHE_KB') or 64000) * -1, # Negativo = KiB, não páginas
+        mmap_size=int(os.environ.get('SQLITE_MMAP_BYTES') or 256 * 1024 * 1024),
+        temp_store='MEMORY',
+    )
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+}
+
+def get_config(name=None):
+    """Perfil de configuração pelo nome ou pela variável de ambiente APP_ENV (padrão: development)."""
+    name = name or os.environ.get('APP_ENV') or 'development'
+    try:
+        return config_by_name[name]
+    except KeyError:
+        raise ValueError(f'APP_ENV desconhecido: {name!r} (opções: {", ".join(config_by_name)})') from None
@@ -1,4 +1,60 @@
 # extensions.py
+from flask import current_app
+from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """
+    Session do Flask-SQLAlchemy que, com vários shards configurados (sharding.py), manda as tabelas
+    de tarefas para o shard do usuário e, com réplicas (replicas.py), as leituras das páginas só de
+    leitura para uma réplica do banco principal. Sem nenhum dos dois, é a Session de sempre.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            engine = None
+            shards = current_app.extensions.get('shard_router')
+            if shards is not None:
+                engine = shards.route(self, mapper, clause)
+            replicas = current_app.extensions.get('replica_router')
+            if replicas is not None:
+                engine = replicas.route(self, engine, clause) or engine
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# Extensões sem aplicação: create_app() (app.py) as liga a cada aplicação criada
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+login_manager.blueprint_login_views = {'api': None} # Na API, sem login a resposta é 401 em vez de redirect
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Executa os PRAGMAs em toda nova conexão DBAPI do engine (cada conexão tem os seus)."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+def init_db(app):
+    """Inicializa o db com o app e aplica SQLITE_PRAGMAS aos engines SQLite."""
+    # O Flask-SQLAlchemy cria um MetaData (vazio) por bind no db, que é do processo: sem descartar os
+    # binds de uma aplicação anterior (shards, réplicas), o create_all/drop_all desta falharia
+    binds = app.config.get('SQLALCHEMY_BINDS') or {}
+    for key in [key for key in db.metadatas if key is not None and key not in binds and not db.metadatas[key].tables]:
+        del db.metadatas[key]
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, app.config.get('SQLITE_PRAGMAS'))
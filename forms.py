@@ -1,10 +1,14 @@
 # forms.py
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, TextAreaField, SelectField, ValidationError
+from flask_wtf.file import FileField, FileRequired
+from wtforms import StringField, PasswordField, SubmitField, TextAreaField, SelectField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, Optional
 from wtforms.fields import DateField # Para a data de vencimento (due_date)
 from models import User
 
+USERNAME_TAKEN = 'Esse nome de usuário já está em uso. Por favor, escolha outro.'
+EMAIL_TAKEN = 'Esse email já está registrado. Por favor, use outro ou faça login.'
+
 class RegistrationForm(FlaskForm):
     username = StringField('Usuário',
                            validators=[DataRequired(), Length(min=2, max=20)])
@@ -16,15 +20,15 @@ class RegistrationForm(FlaskForm):
                                      validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Registrar')
 
-    def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('Esse nome de usuário já está em uso. Por favor, escolha outro.')
-
-    def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('Esse email já está registrado. Por favor, use outro ou faça login.')
+    def add_taken_errors(self):
+        """
+        Depois de um IntegrityError no cadastro: marca o nome e/ou o email que já existem. A unicidade
+        fica com as restrições UNIQUE da tabela user, então o caminho feliz não faz consulta nenhuma.
+        """
+        if User.query.filter_by(username=self.username.data).first():
+            self.username.errors.append(USERNAME_TAKEN)
+        if User.query.filter_by(email=self.email.data).first():
+            self.email.errors.append(EMAIL_TAKEN)
 
 class LoginForm(FlaskForm):
     email = StringField('Email',
@@ -42,4 +46,24 @@ class TaskForm(FlaskForm):
     status = SelectField('Status',
                          choices=[('pendente', 'Pendente'), ('concluida', 'Concluída')],
                          validators=[DataRequired()])
-    submit = SubmitField('Salvar Tarefa')
\ No newline at end of file
+    submit = SubmitField('Salvar Tarefa')
+
+class BulkTaskForm(FlaskForm):
+    # Os ids das tarefas chegam como vários campos 'task_ids' (checkboxes da listagem)
+    action = SelectField('Ação',
+                         choices=[('complete', 'Marcar como concluídas'),
+                                  ('uncomplete', 'Marcar como pendentes'),
+                                  ('delete', 'Excluir')],
+                         validators=[DataRequired()])
+    submit = SubmitField('Aplicar às selecionadas')
+
+
+class SearchForm(FlaskForm):
+    class Meta:
+        csrf = False # Formulário GET: só lê, não altera nada
+
+    q = StringField('Buscar', validators=[DataRequired(), Length(max=200)])
+
+class ImportTasksForm(FlaskForm):
+    file = FileField('Arquivo (CSV ou NDJSON)', validators=[FileRequired()])
+    submit = SubmitField('Importar')
@@ -0,0 +1,217 @@
+# fragment_cache.py
+# Cache de fragmentos HTML já renderizados (a lista de tarefas de /tasks).
+# A chave inclui a versão de dados do usuário (versioning.py), então um fragmento nunca é servido
+# depois de uma escrita, mesmo entre processos; a invalidação explícita por usuário apenas
+# libera o espaço das entradas que ficaram obsoletas.
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+from flask import current_app, jsonify
+from flask_login import login_required
+from versioning import data_version_bumped
+
+
+class CacheStats:
+    """Contadores de acerto/erro do cache (por processo)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.sets = self.evictions = self.invalidations = 0
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits, 'misses': self.misses, 'sets': self.sets,
+            'evictions': self.evictions, 'invalidations': self.invalidations,
+            'hit_ratio': round(self.hits / total, 4) if total else None,
+        }
+
+
+class MemoryBackend:
+    """LRU em memória do processo, limitado a max_entries."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # chave -> (user_id, valor)
+        self._by_user = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, user_id, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, user_id, key, value):
+        """Grava e retorna quantas entradas foram despejadas para respeitar o limite."""
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (user_id, value)
+            self._entries.move_to_end(key)
+            self._by_user[user_id].add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, (old_user, _) = self._entries.popitem(last=False)
+                self._discard_index(old_user, old_key)
+                evicted += 1
+        return evicted
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in self._by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard_index(self, user_id, key):
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+
+class FileSystemBackend:
+    """
+    Um arquivo por entrada, em <diretório>/<user_id>/<hash>.json, compartilhável entre
+    processos (workers do Gunicorn). O horário de modificação faz o papel do LRU:
+    cada acerto o renova e, acima de max_entries, os arquivos mais antigos são apagados.
+    """
+
+    def __init__(self, directory, max_entries=10000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _user_dir(self, user_id):
+        return os.path.join(self.directory, str(user_id))
+
+    def _path(self, user_id, key):
+        return os.path.join(self._user_dir(user_id), hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, user_id, key):
+        path = self._path(user_id, key)
+        try:
+            with open(path, encoding='utf-8') as fh:
+                value = json.load(fh)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def set(self, user_id, key, value):
+        user_dir = self._user_dir(user_id)
+        os.makedirs(user_dir, exist_ok=True)
+        # Escreve num arquivo temporário e renomeia: leitores nunca veem um JSON pela metade
+        tmp_path = os.path.join(user_dir, f'.{uuid.uuid4().hex}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(value, fh)
+        os.replace(tmp_path, self._path(user_id, key))
+        self._writes += 1
+        # Varre o diretório só de vez em quando, para não pagar o custo em toda gravação
+        if self._writes % 100 == 0:
+            return self._evict()
+        return 0
+
+    def _evict(self):
+        files = []
+        for user_dir in os.scandir(self.directory):
+            if user_dir.is_dir():
+                files.extend(entry for entry in os.scandir(user_dir.path) if entry.name.endswith('.json'))
+        excess = len(files) - self.max_entries
+        if excess <= 0:
+            return 0
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        return excess
+
+    def invalidate_user(self, user_id):
+        user_dir = self._user_dir(user_id)
+        # Renomear antes de apagar torna a invalidação atômica para os outros processos
+        doomed = f'{user_dir}.{uuid.uuid4().hex}.deleted'
+        try:
+            os.rename(user_dir, doomed)
+        except OSError:
+            return
+        shutil.rmtree(doomed, ignore_errors=True)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+
+class FragmentCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats = CacheStats()
+
+    def get(self, user_id, key):
+        value = self.backend.get(user_id, key)
+        self.stats.incr('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, user_id, key, value):
+        evicted = self.backend.set(user_id, key, value)
+        self.stats.incr('sets')
+        if evicted:
+            self.stats.incr('evictions', evicted)
+
+    def invalidate_user(self, user_id):
+        self.backend.invalidate_user(user_id)
+        self.stats.incr('invalidations')
+
+    def clear(self):
+        self.backend.clear()
+
+
+def make_backend(config):
+    name = config['FRAGMENT_CACHE_BACKEND']
+    if name == 'memory':
+        return MemoryBackend(config['FRAGMENT_CACHE_MAX_ENTRIES'])
+    if name == 'filesystem':
+        return FileSystemBackend(config['FRAGMENT_CACHE_DIR'], config['FRAGMENT_CACHE_MAX_ENTRIES'])
+    raise ValueError(f'FRAGMENT_CACHE_BACKEND desconhecido: {name!r}')
+
+
+def get_cache():
+    return current_app.extensions['fragment_cache']
+
+
+def fragment_key(user_id, version, *parts):
+    return ':'.join(str(part) for part in ('tasks', user_id, version) + parts)
+
+
+def init_app(app):
+    app.config.setdefault('FRAGMENT_CACHE_DIR', os.path.join(app.instance_path, 'fragment_cache'))
+    cache = FragmentCache(make_backend(app.config))
+    app.extensions['fragment_cache'] = cache
+
+    @data_version_bumped.connect_via(app, weak=False)
+    def invalidate_on_write(sender, user_id, **extra):
+        cache.invalidate_user(user_id)
+
+    @app.route('/_stats/fragment-cache')
+    @login_required
+    def fragment_cache_stats():
+        """Contadores do cache de fragmentos do processo que atendeu a requisição."""
+        return jsonify(backend=app.config['FRAGMENT_CACHE_BACKEND'], pid=os.getpid(), **cache.stats.as_dict())
@@ -0,0 +1,414 @@
+# live.py
+# Atualizações ao vivo da lista de tarefas por Server-Sent Events (/tasks/stream).
+# As escritas não precisam chamar nada: os eventos da sessão do SQLAlchemy anotam as tarefas
+# inseridas, alteradas e excluídas pelo ORM, e o sinal data_version_bumped anota os usuários
+# afetados por escritas em lote (UPDATE/DELETE/INSERT diretos). Só depois do commit os eventos
+# vão para o broker; um rollback os descarta.
+#
+# * upsert: a linha renderizada por _task_row.html, que o main.js troca (ou insere) na página;
+# * delete: o id da tarefa que saiu;
+# * refresh: a lista mudou de um jeito que não dá para aplicar linha a linha (lote, importação,
+#   arquivamento, fila do assinante cheia); o navegador busca a lista de novo.
+#
+# Brokers: 'memory' entrega só aos assinantes do próprio processo; 'sqlite' grava os eventos num
+# arquivo compartilhado e uma única thread por processo os repassa aos assinantes locais, então
+# vários workers (Gunicorn) se enxergam. Cada assinante tem uma fila limitada (LIVE_QUEUE_SIZE).
+# Nos dois, uma escrita de um usuário sem ninguém ouvindo não monta nem grava eventos.
+#
+# No modo WSGI cada conexão aberta ocupa uma thread do servidor. No modo ASGI (async_app.py) a
+# conexão parada só espera no event loop (EventStream é também um iterável assíncrono).
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from flask import Blueprint, Response, current_app, has_request_context, render_template
+from flask_login import current_user, login_required
+from sqlalchemy import event
+from extensions import db
+from models import Task
+from versioning import data_version_bumped, get_data_version
+
+live_bp = Blueprint('live', __name__)
+logger = logging.getLogger('live')
+
+ROW_FIELDS = ('id', 'title', 'description', 'status', 'created_at', 'due_date', 'completed_at', 'user_id')
+REFRESH = {'type': 'refresh'}
+
+
+class Subscription:
+    """Fila de eventos de uma conexão SSE. Cheia, ela é trocada por um único 'refresh'."""
+
+    def __init__(self, broker, user_id, max_events):
+        self.broker = broker
+        self.user_id = user_id
+        self.max_events = max_events
+        self._events = deque()
+        self._cond = threading.Condition()
+        self._waiters = [] # (loop, future) de quem espera por get_async()
+
+    def put(self, event):
+        with self._cond:
+            if len(self._events) >= self.max_events:
+                # Um cliente lento não segura memória: ele perde os eventos e recarrega a lista
+                self._events.clear()
+                event = REFRESH
+            self._events.append(event)
+            self._cond.notify()
+            waiters, self._waiters = self._waiters, []
+        # put() roda na thread de quem fez o commit (ou na do poller): o loop é acordado de fora
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def get(self, timeout=None):
+        """Próximo evento, ou None se nada chegou em 'timeout' segundos."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    async def get_async(self, timeout=None):
+        """Como get(), mas esperando no event loop, sem ocupar uma thread."""
+        future = asyncio.get_running_loop().create_future()
+        with self._cond:
+            if self._events:
+                return self._events.popleft()
+            self._waiters.append((future.get_loop(), future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._waiters = [item for item in self._waiters if item[1] is not future]
+        with self._cond:
+            return self._events.popleft() if self._events else None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class MemoryBroker:
+    """Publicação/assinatura dentro do processo."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id, self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def wants(self, user_id):
+        """Se vale a pena montar os eventos do usuário (há alguém ouvindo)."""
+        return user_id in self._subscribers
+
+    def publish(self, user_id, events):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            for item in events:
+                subscription.put(item)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def user_ids(self):
+        with self._lock:
+            return list(self._subscribers)
+
+
+class SQLiteBroker:
+    """
+    Eventos compartilhados entre processos por um arquivo SQLite próprio (não o banco da aplicação).
+    publish() só grava; a entrega, inclusive aos assinantes do mesmo processo, é feita pela thread
+    que lê as linhas novas a cada poll_interval segundos.
+
+    Cada processo anota em live_subscriber os usuários com conexões abertas nele, com um prazo
+    (subscriber_ttl) que a thread de leitura renova; wants() consulta essa tabela, então quem não
+    tem ninguém ouvindo em nenhum worker não gera eventos. Um worker que morreu sai sozinho quando o
+    prazo vence. Eventos mais velhos que 'retention' segundos e anotações vencidas são apagados.
+    """
+
+    def __init__(self, path, queue_size=100, poll_interval=0.5, retention=60, subscriber_ttl=30):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.subscriber_ttl = subscriber_ttl
+        self._token = None
+        self.local = MemoryBroker(queue_size)
+        self._poller = None
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS live_event ('
+                         'id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, '
+                         'payload TEXT NOT NULL, created_at REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS live_subscriber ('
+                         'token TEXT NOT NULL, user_id INTEGER NOT NULL, expires_at REAL NOT NULL, '
+                         'PRIMARY KEY (user_id, token))')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    @property
+    def token(self):
+        """Identifica as anotações deste processo em live_subscriber (um por worker, mesmo com --preload)."""
+        if self._token is None or self._token[0] != os.getpid():
+            self._token = (os.getpid(), uuid.uuid4().hex)
+        return self._token[1]
+
+    def _announce(self, conn, user_ids, now):
+        with conn:
+            conn.executemany('INSERT INTO live_subscriber (token, user_id, expires_at) VALUES (?, ?, ?) '
+                             'ON CONFLICT (user_id, token) DO UPDATE SET expires_at = excluded.expires_at',
+                             [(self.token, user_id, now + self.subscriber_ttl) for user_id in user_ids])
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name='live-sqlite-poller', daemon=True)
+                self._poller.start()
+            subscription = self.local.subscribe(user_id)
+            subscription.broker = self # close() passa por aqui e remove a anotação compartilhada
+            conn = self._connect()
+            try:
+                self._announce(conn, [user_id], time.time())
+            finally:
+                conn.close()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.local.unsubscribe(subscription)
+            if self.local.wants(subscription.user_id):
+                return
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute('DELETE FROM live_subscriber WHERE user_id = ? AND token = ?',
+                                 (subscription.user_id, self.token))
+            except sqlite3.Error:
+                logger.exception('Falha ao remover o assinante de %s', self.path) # O prazo vence sozinho
+            finally:
+                conn.close()
+
+    def wants(self, user_id):
+        # Os assinantes podem estar em outro processo: a tabela compartilhada responde por todos
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT 1 FROM live_subscriber WHERE user_id = ? AND expires_at > ? LIMIT 1',
+                                (user_id, time.time())).fetchone() is not None
+        finally:
+            conn.close()
+
+    def publish(self, user_id, events):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany('INSERT INTO live_event (user_id, payload, created_at) VALUES (?, ?, ?)',
+                                 [(user_id, json.dumps(item, ensure_ascii=False), now) for item in events])
+            # Também aqui, e não só na thread de leitura: um worker que só publica também limpa
+            if now - self._last_cleanup > self.retention:
+                self.cleanup(conn, now)
+        finally:
+            conn.close()
+
+    def cleanup(self, conn, now):
+        """Apaga os eventos mais velhos que 'retention' e as anotações de assinantes vencidas."""
+        self._last_cleanup = now
+        with conn:
+            conn.execute('DELETE FROM live_event WHERE created_at < ?', (now - self.retention,))
+            conn.execute('DELETE FROM live_subscriber WHERE expires_at < ?', (now,))
+
+    def _poll(self):
+        conn = self._connect()
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM live_event').fetchone()[0]
+        announced = 0.0
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                rows = conn.execute('SELECT id, user_id, payload FROM live_event WHERE id > ? ORDER BY id',
+                                    (last_id,)).fetchall()
+                for event_id, user_id, payload in rows:
+                    self.local.publish(user_id, [json.loads(payload)])
+                    last_id = event_id
+                now = time.time()
+                if now - announced > self.subscriber_ttl / 3: # Renova o prazo bem antes de vencer
+                    with self._lock: # Sem trava, reanunciaria quem unsubscribe() acabou de remover
+                        self._announce(conn, self.local.user_ids(), now)
+                    announced = now
+                if now - self._last_cleanup > self.retention:
+                    self.cleanup(conn, now)
+            except sqlite3.Error:
+                logger.exception('Falha ao ler os eventos de %s', self.path) # Tenta de novo na próxima volta
+
+
+def make_broker(config):
+    name = config['LIVE_BROKER']
+    if name == 'memory':
+        return MemoryBroker(config['LIVE_QUEUE_SIZE'])
+    if name == 'sqlite':
+        return SQLiteBroker(config['LIVE_BROKER_PATH'], config['LIVE_QUEUE_SIZE'], config['LIVE_POLL_INTERVAL'],
+                            config['LIVE_RETENTION'], config['LIVE_SUBSCRIBER_TTL'])
+    raise ValueError(f'LIVE_BROKER desconhecido: {name!r}')
+
+
+def get_broker():
+    return current_app.extensions['live_broker']
+
+
+def row_snapshot(task):
+    """Valores da tarefa logo depois do flush: depois do commit a sessão não pode mais consultá-la."""
+    return {name: getattr(task, name) for name in ROW_FIELDS}
+
+
+def _pending(session):
+    return session.info.setdefault('live_pending', {})
+
+
+def _after_flush(session, flush_context):
+    pending = _pending(session)
+    changed = [(task, task in session.new) for task in session.new | session.dirty
+               if isinstance(task, Task) and (task in session.new or session.is_modified(task))]
+    for task, created in changed:
+        events = pending.setdefault(task.user_id, {})
+        previous = events.get(task.id)
+        events[task.id] = ('upsert', row_snapshot(task), created or (previous is not None and previous[2]))
+    for task in session.deleted:
+        if isinstance(task, Task):
+            pending.setdefault(task.user_id, {})[task.id] = ('delete', None, False)
+
+
+def _on_data_version_bumped(sender, user_id, **extra):
+    # Escritas em lote não passam pelo flush do ORM: o usuário recebe um 'refresh'
+    _pending(db.session()).setdefault(user_id, {})
+
+
+def _after_rollback(session):
+    session.info.pop('live_pending', None)
+
+
+def build_events(changes):
+    """Eventos SSE de um usuário a partir das mudanças anotadas na transação."""
+    if not changes or not has_request_context(): # Sem requisição não há url_for para renderizar a linha
+        return [REFRESH]
+    events = []
+    for task_id, (kind, snapshot, created) in changes.items():
+        if kind == 'delete':
+            events.append({'type': 'delete', 'task_id': task_id})
+        else:
+            html = render_template('_task_row.html', task=SimpleNamespace(**snapshot))
+            events.append({'type': 'upsert', 'task_id': task_id, 'status': snapshot['status'],
+                           'created': created, 'html': html})
+    return events
+
+
+def _after_commit(session):
+    pending = session.info.pop('live_pending', None)
+    if not pending:
+        return
+    broker = current_app.extensions['live_broker']
+    for user_id, changes in pending.items():
+        if broker.wants(user_id):
+            broker.publish(user_id, build_events(changes))
+
+
+def sse_message(name, data):
+    return f'event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+class EventStream:
+    """
+    Corpo da resposta SSE. Parada, a conexão só espera na fila do assinante (sem consultar o banco);
+    o comentário periódico mantém proxies e o navegador cientes de que ela continua viva e faz o
+    servidor notar quando o cliente foi embora. Iterado normalmente no WSGI (uma thread parada em
+    get()) e com 'async for' no ASGI (parado em get_async(), sem thread).
+    """
+
+    def __init__(self, subscription, hello, heartbeat):
+        self.subscription = subscription
+        self.hello = hello
+        self.heartbeat = heartbeat
+
+    def first(self):
+        return 'retry: 3000\n' + sse_message('hello', self.hello)
+
+    @staticmethod
+    def message(item):
+        return ': ping\n\n' if item is None else sse_message(item['type'], item)
+
+    def __iter__(self):
+        try:
+            yield self.first()
+            while True:
+                yield self.message(self.subscription.get(timeout=self.heartbeat))
+        finally:
+            self.close()
+
+    async def __aiter__(self):
+        try:
+            yield self.first()
+            while True:
+                yield self.message(await self.subscription.get_async(timeout=self.heartbeat))
+        finally:
+            self.close()
+
+    def close(self):
+        self.subscription.close() # Idempotente: o Response e o gerador podem chamar os dois
+
+
+@live_bp.route('/tasks/stream')
+@login_required
+def task_stream():
+    # A versão de dados permite ao navegador notar o que mudou entre carregar a página e conectar
+    version, _ = get_data_version(current_user.id)
+    subscription = get_broker().subscribe(current_user.id)
+    # O gerador não usa o contexto da requisição: ao fim da view a sessão do banco é liberada,
+    # e a conexão aberta não prende nenhuma conexão do pool
+    response = Response(EventStream(subscription, {'version': version}, current_app.config['LIVE_HEARTBEAT']),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # nginx: entrega cada evento sem esperar o buffer encher
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('LIVE_BROKER_PATH', os.path.join(app.instance_path, 'live_events.db'))
+    if app.config['LIVE_BROKER'] == 'sqlite':
+        os.makedirs(os.path.dirname(app.config['LIVE_BROKER_PATH']), exist_ok=True)
+    app.extensions['live_broker'] = make_broker(app.config)
+
+    # A fábrica de sessões é do db, compartilhada por todas as aplicações criadas no processo
+    for name, listener in (('after_flush', _after_flush), ('after_commit', _after_commit),
+                           ('after_rollback', _after_rollback)):
+        if not event.contains(db.session.session_factory, name, listener):
+            event.listen(db.session.session_factory, name, listener)
+    data_version_bumped.connect(_on_data_version_bumped, app, weak=False)
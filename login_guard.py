@@ -0,0 +1,294 @@
+# login_guard.py
+# Proteção do login contra rajadas de tentativas, honestas ou de força bruta. Sem ela, cada tentativa
+# calcula um hash de senha (scrypt, ~100 ms de CPU) na thread da requisição, e uma rajada ocupa
+# todos os workers e trava /tasks para todo mundo.
+#
+# * Limite por janela deslizante, checado antes de qualquer consulta ou hash: por IP (toda
+#   tentativa conta) e por conta (só as erradas contam; um login certo zera). Acima do limite a
+#   resposta é 429 com Retry-After. Store 'memory' (por processo) ou 'sqlite' (um arquivo
+#   compartilhado pelos workers, para que o limite valha para o servidor inteiro).
+# * Pool de hash: no máximo LOGIN_HASH_WORKERS verificações rodam ao mesmo tempo por processo. O
+#   hashlib libera o GIL durante o scrypt/pbkdf2, então as outras threads continuam atendendo. Com
+#   LOGIN_HASH_QUEUE verificações já rodando ou esperando, o login responde 503 na hora. A
+#   conexão do banco é devolvida antes da espera (se a sessão não tiver mudanças a perder), para a
+#   fila não esgotar o pool de conexões.
+# * Rehash: se PASSWORD_HASH_METHOD mudou desde que a senha foi gravada, o hash é refeito no
+#   login certo, enquanto a senha está em mãos. A forma curta ('scrypt') vale o mesmo que os
+#   parâmetros padrão do werkzeug por extenso ('scrypt:32768:8:1').
+# * No modo ASGI (async_app.py), a espera pelo pool de hash não bloqueia o event loop.
+import asyncio
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context, request
+from sqlalchemy import event
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+from extensions import db
+
+
+class LoginBusy(Exception):
+    """O pool de hash já tem LOGIN_HASH_QUEUE verificações rodando ou esperando."""
+
+
+class MemoryLimitStore:
+    """Janelas deslizantes em memória: os instantes das últimas 'limit' tentativas de cada chave."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._hits = OrderedDict() # chave -> deque de instantes, da mais antiga para a mais recente
+        self._lock = threading.Lock()
+
+    def _retry_after(self, key, limit, window, now):
+        hits = self._hits.get(key)
+        if hits is None:
+            return 0
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        return hits[-limit] + window - now if len(hits) >= limit else 0
+
+    def retry_after(self, key, limit, window, now):
+        """Segundos até a próxima tentativa ser aceita (0: aceita agora). Não registra nada."""
+        with self._lock:
+            return self._retry_after(key, limit, window, now)
+
+    def hit(self, key, limit, window, now):
+        """Registra uma tentativa se ela cabe na janela; senão retorna quanto falta esperar."""
+        with self._lock:
+            wait = self._retry_after(key, limit, window, now)
+            if wait:
+                return wait
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque(maxlen=limit)
+                while len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+            else:
+                self._hits.move_to_end(key)
+            hits.append(now)
+            return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+class SQLiteLimitStore:
+    """
+    Janelas deslizantes num arquivo SQLite próprio, compartilhado pelos processos. hit() roda numa
+    transação IMMEDIATE: dois workers nunca aceitam juntos a última tentativa da janela.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS login_attempt (key TEXT NOT NULL, at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_login_attempt_key_at ON login_attempt (key, at)')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    @staticmethod
+    def _retry_after(conn, key, limit, window, now):
+        # A 'limit'-ésima tentativa mais recente ainda dentro da janela decide quando a próxima cabe
+        row = conn.execute('SELECT at FROM login_attempt WHERE key = ? AND at > ? ORDER BY at DESC '
+                           'LIMIT 1 OFFSET ?', (key, now - window, limit - 1)).fetchone()
+        return row[0] + window - now if row else 0
+
+    def retry_after(self, key, limit, window, now):
+        conn = self._connect()
+        try:
+            return self._retry_after(conn, key, limit, window, now)
+        finally:
+            conn.close()
+
+    def hit(self, key, limit, window, now):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            wait = self._retry_after(conn, key, limit, window, now)
+            if not wait:
+                conn.execute('DELETE FROM login_attempt WHERE key = ? AND at <= ?', (key, now - window))
+                conn.execute('INSERT INTO login_attempt (key, at) VALUES (?, ?)', (key, now))
+                if random.random() < 0.01: # De vez em quando, as chaves que ninguém mais usou
+                    conn.execute('DELETE FROM login_attempt WHERE at <= ?', (now - window,))
+            conn.execute('COMMIT')
+            return wait
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def reset(self, key):
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM login_attempt WHERE key = ?', (key,))
+        finally:
+            conn.close()
+
+
+class HashPool:
+    """Pool limitado de threads para calcular e verificar hashes de senha."""
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Criado no primeiro uso de cada processo: threads de um pool não atravessam um fork (preload)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, func, *args):
+        """Executa func no pool e espera o resultado; LoginBusy se a fila estiver cheia."""
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            return wait_for(self._get_executor().submit(func, *args))
+        finally:
+            self._slots.release()
+
+
+def wait_for(future):
+    """
+    Espera o resultado do future. No modo ASGI (async_app.py), a requisição roda num greenlet sobre o
+    event loop: a espera vira um await, e as outras requisições seguem enquanto o hash é calculado.
+    """
+    if has_app_context() and 'async_engine' in current_app.extensions:
+        from sqlalchemy.util.concurrency import await_only, in_greenlet
+        if in_greenlet():
+            return await_only(asyncio.wrap_future(future))
+    return future.result()
+
+
+def make_store(config):
+    name = config['LOGIN_LIMIT_STORE']
+    if name == 'memory':
+        return MemoryLimitStore(config['LOGIN_LIMIT_MAX_KEYS'])
+    if name == 'sqlite':
+        return SQLiteLimitStore(config['LOGIN_LIMIT_STORE_PATH'])
+    raise ValueError(f'LOGIN_LIMIT_STORE desconhecido: {name!r}')
+
+
+def _keys(email):
+    return f'ip:{request.remote_addr}', f'account:{email.strip().lower()}'
+
+
+def check_attempt(email):
+    """
+    Registra a tentativa do IP e retorna em quantos segundos (inteiros) o login volta a ser aceito
+    para este IP e esta conta; 0 se a tentativa pode seguir.
+    """
+    config = current_app.config
+    if not config['LOGIN_RATE_LIMIT_ENABLED']:
+        return 0
+    store, now, window = current_app.extensions['login_limit_store'], time.time(), config['LOGIN_LIMIT_WINDOW']
+    ip_key, account_key = _keys(email)
+    # A conta primeiro: uma tentativa contra uma conta bloqueada não gasta a cota do IP
+    wait = (store.retry_after(account_key, config['LOGIN_LIMIT_PER_ACCOUNT'], window, now)
+            or store.hit(ip_key, config['LOGIN_LIMIT_PER_IP'], window, now))
+    return math.ceil(wait)
+
+
+def record_result(email, success):
+    """Uma tentativa errada conta para a conta; uma certa zera a contagem."""
+    config = current_app.config
+    if not config['LOGIN_RATE_LIMIT_ENABLED']:
+        return
+    store, account_key = current_app.extensions['login_limit_store'], _keys(email)[1]
+    if success:
+        store.reset(account_key)
+    else:
+        store.hit(account_key, config['LOGIN_LIMIT_PER_ACCOUNT'], config['LOGIN_LIMIT_WINDOW'], time.time())
+
+
+# Parâmetros que o werkzeug usa quando PASSWORD_HASH_METHOD os omite ('scrypt', 'pbkdf2:sha256')
+HASH_DEFAULTS = {
+    'scrypt': ['scrypt', str(2 ** 15), '8', '1'],
+    'pbkdf2': ['pbkdf2', 'sha256', str(DEFAULT_PBKDF2_ITERATIONS)],
+}
+
+
+def hash_params(method):
+    """O método de hash com os parâmetros omitidos preenchidos: 'scrypt' -> ['scrypt', '32768', '8', '1']."""
+    parts = method.split(':')
+    return parts + HASH_DEFAULTS.get(parts[0], [])[len(parts):]
+
+
+def needs_rehash(password_hash, method):
+    return hash_params(password_hash.split('$', 1)[0]) != hash_params(method)
+
+
+def _mark_flushed(session, flush_context):
+    session.info['unsaved_flush'] = True
+
+
+def _clear_flushed(session):
+    session.info.pop('unsaved_flush', None)
+
+
+def release_connection():
+    """
+    Devolve a conexão ao pool do banco antes de esperar pelo hash: numa rajada, as tentativas na
+    fila prenderiam todas as conexões e as outras páginas ficariam esperando por uma. O rollback
+    só acontece se a sessão não tiver nada a perder; com mudanças de quem chama (pendentes ou já
+    enviadas num flush), a conexão fica presa durante a espera.
+    """
+    session = db.session
+    if session.new or session.dirty or session.deleted or session.info.get('unsaved_flush'):
+        return
+    session.rollback()
+
+
+def hash_password(password):
+    """Hash de uma senha nova (cadastro), calculado no pool de hash. LoginBusy se o pool estiver cheio."""
+    release_connection()
+    return current_app.extensions['hash_pool'].run(
+        generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(user, password):
+    """
+    Confere a senha no pool de hash e, se ela estiver certa mas o hash usar outro método ou custo,
+    grava o hash novo no usuário (o commit fica com quem chama). LoginBusy se o pool estiver cheio.
+    """
+    pool, password_hash = current_app.extensions['hash_pool'], user.password_hash
+    release_connection()
+    if not pool.run(check_password_hash, password_hash, password):
+        return False
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    if needs_rehash(password_hash, method):
+        try:
+            user.password_hash = pool.run(generate_password_hash, password, method)
+        except LoginBusy:
+            pass # Fica para o próximo login
+    return True
+
+
+def init_app(app):
+    app.config.setdefault('LOGIN_LIMIT_STORE_PATH', os.path.join(app.instance_path, 'login_limits.db'))
+    if app.config['LOGIN_LIMIT_STORE'] == 'sqlite':
+        os.makedirs(os.path.dirname(app.config['LOGIN_LIMIT_STORE_PATH']), exist_ok=True)
+    app.extensions['login_limit_store'] = make_store(app.config)
+    app.extensions['hash_pool'] = HashPool(app.config['LOGIN_HASH_WORKERS'], app.config['LOGIN_HASH_QUEUE'])
+    # A fábrica de sessões é do db, compartilhada por todas as aplicações criadas no processo
+    for name, listener in (('after_flush', _mark_flushed), ('after_commit', _clear_flushed),
+                           ('after_rollback', _clear_flushed)):
+        if not event.contains(db.session.session_factory, name, listener):
+            event.listen(db.session.session_factory, name, listener)
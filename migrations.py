@@ -0,0 +1,149 @@
+# migrations.py
+# Migrações de esquema versionadas e idempotentes.
+# db.create_all() só cria tabelas que ainda não existem: ele não adiciona índices nem colunas
+# a tabelas antigas. Cada migração abaixo leva um banco já existente (ex.: instance/site.db)
+# até o esquema atual sem recriar tabelas, ou seja, sem perda de dados.
+from collections import namedtuple
+from datetime import datetime
+import click
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+from extensions import db
+
+# Tabela de controle fora do db.metadata para não se misturar aos modelos da aplicação
+version_metadata = MetaData()
+schema_version = Table(
+    'schema_version', version_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+Migration = namedtuple('Migration', 'version description apply')
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Registra uma função de migração; as versões são aplicadas em ordem crescente."""
+    def decorator(func):
+        MIGRATIONS.append(Migration(version, description, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+
+def create_indexes(conn, table):
+    existing = {col['name'] for col in inspect(conn).get_columns(table.name)}
+    for index in table.indexes:
+        # Índices sobre colunas que uma migração posterior ainda vai adicionar ficam para ela
+        if all(column.name in existing for column in index.columns):
+            index.create(conn, checkfirst=True)
+
+
+def add_column_if_missing(conn, table, column):
+    """ALTER TABLE ... ADD COLUMN apenas se a coluna ainda não existir."""
+    existing = {col['name'] for col in inspect(conn).get_columns(table.name)}
+    if column.name in existing:
+        return
+    column_type = column.type.compile(dialect=conn.dialect)
+    ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+    if column.server_default is not None:
+        ddl += f' DEFAULT {column.server_default.arg}'
+    if not column.nullable:
+        ddl += ' NOT NULL'
+    conn.exec_driver_sql(ddl)
+
+
+@migration(1, 'Índices compostos da tabela task')
+def add_task_indexes(conn):
+    from models import Task
+    create_indexes(conn, Task.__table__)
+
+
+@migration(2, 'Índice de busca textual (FTS5) das tarefas')
+def add_task_search_index(conn):
+    from search import create_search_index, rebuild_search_index
+    if conn.dialect.name != 'sqlite':
+        return
+    create_search_index(conn)
+    rebuild_search_index(conn) # Indexa as tarefas que já existiam
+
+
+@migration(3, 'Índice de prazos para os lembretes')
+def add_due_date_scan_index(conn):
+    from models import Task
+    create_indexes(conn, Task.__table__) # A tabela task_reminder é criada pelo create_all
+
+
+@migration(4, 'Data de conclusão das tarefas e tabela de arquivo')
+def add_completed_at(conn):
+    from models import Task
+    add_column_if_missing(conn, Task.__table__, Task.__table__.c.completed_at)
+    # A data real de conclusão das tarefas antigas não existe: o prazo do arquivamento conta a
+    # partir da migração, então nada é arquivado logo depois de atualizar o banco
+    conn.execute(Task.__table__.update()
+                 .where(Task.__table__.c.status == 'concluida', Task.__table__.c.completed_at.is_(None))
+                 .values(completed_at=datetime.utcnow()))
+    create_indexes(conn, Task.__table__) # A tabela task_archive é criada pelo create_all
+
+
+@migration(5, 'Contadores do painel de estatísticas')
+def add_task_stats(conn):
+    from models import Task
+    from stats import reconcile
+    create_indexes(conn, Task.__table__) # A tabela task_stats é criada pelo create_all
+    reconcile(conn) # Preenche os contadores a partir das tarefas que já existem
+
+
+@migration(6, 'Shard das tarefas de cada usuário')
+def add_user_shard(conn):
+    from models import User
+    if not inspect(conn).has_table(User.__tablename__): # Os shards não têm a tabela user
+        return
+    add_column_if_missing(conn, User.__table__, User.__table__.c.shard) # Os usuários existentes ficam no shard 0
+
+
+def applied_versions(conn):
+    schema_version.create(conn, checkfirst=True)
+    return {row.version for row in conn.execute(select(schema_version.c.version))}
+
+
+def pending_migrations(engine):
+    with engine.begin() as conn:
+        applied = applied_versions(conn)
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def upgrade(engine=None, tables=None):
+    """
+    Cria as tabelas que faltam (todas, ou só 'tables') e aplica as migrações pendentes, cada uma em
+    sua própria transação. Retorna a lista de migrações aplicadas. Pode ser executada várias vezes.
+    """
+    engine = engine or db.engine
+    db.metadata.create_all(bind=engine, tables=tables)
+    applied = []
+    for pending in pending_migrations(engine):
+        with engine.begin() as conn:
+            pending.apply(conn)
+            conn.execute(schema_version.insert().values(
+                version=pending.version, description=pending.description, applied_at=datetime.utcnow()))
+        applied.append(pending)
+    return applied
+
+
+def upgrade_all():
+    """upgrade() no banco principal e em cada shard das tarefas. Retorna [(shard, migrações aplicadas)]."""
+    from sharding import shard_engines, shard_tables
+    return [(shard, upgrade(engine, None if shard == 0 else shard_tables())) for shard, engine in shard_engines()]
+
+
+def init_app(app):
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Atualiza o esquema do banco de dados (e dos shards) sem perder dados."""
+        results = upgrade_all()
+        for shard, applied in results:
+            prefix = f'Shard {shard}: ' if len(results) > 1 else ''
+            if not applied:
+                click.echo(f'{prefix}Banco de dados já está atualizado.')
+            for item in applied:
+                click.echo(f'{prefix}Migração {item.version} aplicada: {item.description}')
@@ -1,6 +1,8 @@
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from extensions import db  # ✅ Importação correta
 
 class User(db.Model, UserMixin):
@@ -8,10 +10,13 @@ class User(db.Model, UserMixin):
     username = db.Column(db.String(20), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128))
+    # Shard com as tarefas do usuário (sharding.py); 0 é o próprio banco principal
+    shard = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     tasks = db.relationship('Task', backref='author', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # Método e custo vêm de PASSWORD_HASH_METHOD; senhas com outro método são refeitas no login
+        self.password_hash = generate_password_hash(password, current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -26,7 +31,133 @@ class Task(db.Model):
     status = db.Column(db.String(20), default='pendente', nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     due_date = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True) # Preenchido ao concluir; base do arquivamento
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    # Índices compostos que seguem os padrões de acesso de tasks.py:
+    # toda consulta filtra por user_id, a listagem filtra (ou não) por status e ordena por created_at.
+    # O id (rowid) já vem implícito no fim de todo índice do SQLite; percorrendo o índice ao contrário,
+    # o SQLite entrega (created_at DESC, id DESC) sem ordenação extra. Um índice 'created_at DESC'
+    # atrapalharia: o rowid implícito continuaria ascendente e o desempate exigiria um B-tree temporário.
+    __table_args__ = (
+        db.Index('ix_task_user_status_created', 'user_id', 'status', 'created_at'),
+        db.Index('ix_task_user_created', 'user_id', 'created_at'),
+        db.Index('ix_task_user_due', 'user_id', 'due_date'),
+        # Painel (stats.py): pendentes atrasadas e a vencer de um usuário, contadas só no índice
+        db.Index('ix_task_user_status_due', 'user_id', 'status', 'due_date'),
+        # Varredura de prazos de todos os usuários (reminders.py): só tarefas pendentes, por faixa de data
+        db.Index('ix_task_status_due', 'status', 'due_date'),
+        # Arquivamento (archive.py): tarefas concluídas há mais de N dias, das mais antigas para as mais novas
+        db.Index('ix_task_status_completed', 'status', 'completed_at'),
+    )
+
+    @validates('status')
+    def _track_completion(self, key, status):
+        # Só a mudança de status conta: editar uma tarefa já concluída não reinicia a data de conclusão
+        if status != self.status:
+            self.completed_at = completed_at_for(status)
+        return status
+
+    def to_dict(self):
+        """Representação JSON usada pela API."""
+        due_date = self.due_date
+        if isinstance(due_date, datetime): # Antes do commit o valor ainda pode ser um date do formulário
+            due_date = due_date.date()
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+            'due_date': due_date.isoformat() if due_date else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+        }
+
     def __repr__(self):
         return f"Task('{self.title}', '{self.status}')"
+
+def completed_at_for(status, now=None):
+    """Data de conclusão de uma tarefa gravada com o status dado (inclusive em INSERTs em lote)."""
+    if status != 'concluida':
+        return None
+    return now or datetime.utcnow()
+
+class ArchivedTask(db.Model):
+    """
+    Tarefa concluída movida para fora da tabela task (archive.py), para que a listagem, os índices
+    e o VACUUM da tabela ativa não paguem pelo histórico. O id é próprio do arquivo (AUTOINCREMENT,
+    nunca reaproveitado); task_id guarda o id que a tarefa tinha, só como referência.
+    """
+    __tablename__ = 'task_archive'
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    due_date = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    __table_args__ = (
+        # Mesma listagem de tasks.py (keyset por created_at, id), restrita ao usuário
+        db.Index('ix_task_archive_user_created', 'user_id', 'created_at'),
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self):
+        return f"ArchivedTask('{self.title}', '{self.archived_at}')"
+
+class DataVersion(db.Model):
+    """
+    Versão monotônica dos dados de tarefas de cada usuário: toda escrita em tarefas a incrementa
+    na mesma transação. Serve de base para o ETag das páginas sem consultar a tabela task.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"DataVersion('{self.user_id}', '{self.version}')"
+
+class TaskStats(db.Model):
+    """
+    Contadores de tarefas por usuário, mantidos na mesma transação de cada escrita (stats.py).
+    O painel da página inicial lê esta linha em vez de contar as tarefas a cada visita.
+    """
+    __tablename__ = 'task_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    archived = db.Column(db.Integer, nullable=False, default=0) # Concluídas movidas para task_archive
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"TaskStats('{self.user_id}', '{self.pending}', '{self.completed}', '{self.archived}')"
+
+class TaskReminder(db.Model):
+    """
+    Lembrete de prazo de uma tarefa: 'due_soon' (vence em breve) ou 'overdue' (venceu).
+    A restrição única (task_id, kind, due_date) torna a varredura idempotente: a mesma tarefa gera
+    no máximo um lembrete de cada tipo para cada prazo; se o prazo mudar, um novo lembrete é gerado.
+    """
+    __tablename__ = 'task_reminder'
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    due_date = db.Column(db.DateTime, nullable=False)
+    state = db.Column(db.String(20), nullable=False, default='queued') # queued, sent ou skipped
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(100), nullable=True) # Worker que reservou o envio
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('task_id', 'kind', 'due_date', name='uq_task_reminder'),
+        db.Index('ix_task_reminder_queue', 'state', 'claimed_at'),
+    )
+
+    def __repr__(self):
+        return f"TaskReminder('{self.task_id}', '{self.kind}', '{self.state}')"
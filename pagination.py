@@ -0,0 +1,103 @@
+# pagination.py
+# Paginação por cursor (keyset) sobre (created_at, id).
+# O cursor é opaco para o cliente: um JSON codificado em base64 url-safe
+# com a posição da borda da página e a direção da navegação.
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+NEXT = 'next'
+PREV = 'prev'
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou adulterado."""
+
+
+def encode_cursor(created_at, item_id, direction=NEXT):
+    payload = json.dumps([created_at.isoformat(), item_id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Retorna (created_at, id, direção) ou levanta InvalidCursor."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, item_id, direction = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if direction not in (NEXT, PREV) or not isinstance(item_id, int):
+            raise InvalidCursor(token)
+        return datetime.fromisoformat(created_at), item_id, direction
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as exc:
+        raise InvalidCursor(token) from exc
+
+
+class Page:
+    """Uma página de resultados com os cursores para a vizinhança."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, model, per_page, cursor=None):
+    """
+    Executa UMA consulta ordenada por (created_at DESC, id DESC) buscando
+    per_page + 1 linhas: a linha extra só serve para saber se existe mais uma página.
+    """
+    key = tuple_(model.created_at, model.id)
+    direction = NEXT
+    if cursor:
+        created_at, item_id, direction = decode_cursor(cursor)
+        if direction == NEXT:
+            query = query.filter(key < (created_at, item_id))
+        else:
+            query = query.filter(key > (created_at, item_id))
+
+    if direction == NEXT:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        # Para voltar, percorre o índice no sentido inverso e depois desinverte a página
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == PREV:
+        rows.reverse()
+
+    if not rows:
+        return Page(rows)
+
+    first, last = rows[0], rows[-1]
+    if direction == NEXT:
+        has_next, has_prev = has_more, cursor is not None
+    else:
+        has_next, has_prev = True, has_more
+    return Page(
+        rows,
+        next_cursor=encode_cursor(last.created_at, last.id, NEXT) if has_next else None,
+        prev_cursor=encode_cursor(first.created_at, first.id, PREV) if has_prev else None,
+    )
+
+
+def offset_paginate(query, per_page, page=1):
+    """
+    Paginação por número de página (LIMIT/OFFSET), para ordens sem chave estável como a relevância
+    da busca. Aqui os "cursores" da Page são os números das páginas vizinhas.
+    """
+    page = max(1, page)
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(rows) > per_page
+    return Page(rows[:per_page], next_cursor=page + 1 if has_next else None,
+                prev_cursor=page - 1 if page > 1 else None)
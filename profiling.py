@@ -0,0 +1,257 @@
+# profiling.py
+# Instrumentação opcional por requisição (PROFILING_ENABLED): tempo total, SQL (quantidade, tempo,
+# consulta mais lenta, via eventos do engine), renderização de templates e trechos medidos com
+# measure() (ex.: o hash de senha no login). Os tempos saem no cabeçalho Server-Timing e numa
+# linha JSON no logger 'profiling'. Com PROFILING_SAMPLE_RATE > 0, uma fração das requisições roda
+# sob o cProfile, e o perfil é gravado em PROFILING_DIR quando passa de PROFILING_SLOW_MS.
+# 'flask profile-report' agrega as linhas de log (de todos os workers) e mostra as rotas mais lentas.
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+import click
+from sqlalchemy import event
+from flask import before_render_template, current_app, g, has_request_context, request, template_rendered
+from flask.logging import default_handler
+from extensions import db
+
+logger = logging.getLogger('profiling')
+
+SQL_PREVIEW_CHARS = 500
+
+
+class RequestProfile:
+    """Tempos acumulados de uma requisição."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.slowest_sql_seconds = 0.0
+        self.slowest_sql = None
+        self.template_seconds = 0.0
+        self.template_starts = []
+        self.measures = defaultdict(float) # nome -> segundos, preenchido por measure()
+        self.profiler = None
+
+    def record_sql(self, statement, seconds):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        if seconds > self.slowest_sql_seconds:
+            self.slowest_sql_seconds = seconds
+            self.slowest_sql = ' '.join(statement.split())[:SQL_PREVIEW_CHARS]
+
+
+def current_profile():
+    if has_request_context():
+        return g.get('profile')
+    return None
+
+
+@contextmanager
+def measure(name):
+    """Mede um trecho do código e o inclui no Server-Timing com o nome dado (sem efeito se desligado)."""
+    profile = current_profile()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.measures[name] += time.perf_counter() - start
+
+
+def server_timing(profile, total_seconds):
+    metrics = [
+        f'db;dur={profile.sql_seconds * 1000:.2f};desc="{profile.sql_count} consultas"',
+        f'tpl;dur={profile.template_seconds * 1000:.2f}',
+    ]
+    metrics.extend(f'{name};dur={seconds * 1000:.2f}' for name, seconds in profile.measures.items())
+    metrics.append(f'total;dur={total_seconds * 1000:.2f}')
+    return ', '.join(metrics)
+
+
+def log_record(profile, response, total_seconds):
+    return {
+        'ts': datetime.utcnow().isoformat(timespec='milliseconds'),
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'total_ms': round(total_seconds * 1000, 3),
+        'db_ms': round(profile.sql_seconds * 1000, 3),
+        'db_count': profile.sql_count,
+        'db_slowest_ms': round(profile.slowest_sql_seconds * 1000, 3),
+        'db_slowest_sql': profile.slowest_sql,
+        'tpl_ms': round(profile.template_seconds * 1000, 3),
+        **{f'{name}_ms': round(seconds * 1000, 3) for name, seconds in profile.measures.items()},
+    }
+
+
+def dump_profile(app, profiler, total_seconds):
+    directory = app.config['PROFILING_DIR']
+    os.makedirs(directory, exist_ok=True)
+    endpoint = re.sub(r'[^\w.-]', '_', request.endpoint or 'sem-endpoint')
+    name = f'{datetime.utcnow():%Y%m%dT%H%M%S%f}-{endpoint}-{total_seconds * 1000:.0f}ms.prof'
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path)
+    return path
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None:
+        conn.info.setdefault('profiling_starts', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    starts = conn.info.get('profiling_starts')
+    if profile is not None and starts:
+        profile.record_sql(statement, time.perf_counter() - starts.pop())
+
+
+def _before_render(sender, template, context, **extra):
+    profile = current_profile()
+    if profile is not None:
+        profile.template_starts.append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    profile = current_profile()
+    if profile is not None and profile.template_starts:
+        start = profile.template_starts.pop()
+        if not profile.template_starts: # Só o render mais externo conta, para não somar duas vezes
+            profile.template_seconds += time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round((len(sorted_values) - 1) * fraction)))
+    return sorted_values[index]
+
+
+def aggregate(records):
+    """Agrupa as linhas de log por endpoint, da rota com maior p95 para a menor."""
+    groups = defaultdict(list)
+    for record in records:
+        groups[record.get('endpoint') or record['path']].append(record)
+    rows = []
+    for endpoint, items in groups.items():
+        totals = sorted(item['total_ms'] for item in items)
+        rows.append({
+            'endpoint': endpoint,
+            'requests': len(items),
+            'p50_ms': percentile(totals, 0.50),
+            'p95_ms': percentile(totals, 0.95),
+            'max_ms': totals[-1],
+            'db_ms': round(sum(item['db_ms'] for item in items) / len(items), 3),
+            'db_count': round(sum(item['db_count'] for item in items) / len(items), 2),
+            'tpl_ms': round(sum(item['tpl_ms'] for item in items) / len(items), 3),
+            'slowest_sql': max(items, key=lambda item: item['db_slowest_ms'])['db_slowest_sql'],
+        })
+    rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return rows
+
+
+def read_log(lines):
+    """Extrai os registros JSON das linhas de log, ignorando o prefixo do formatter e outras linhas."""
+    for line in lines:
+        start = line.find('{')
+        if start < 0:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except ValueError:
+            continue
+        if isinstance(record, dict) and 'total_ms' in record:
+            yield record
+
+
+def configure_logger(app):
+    """
+    Deixa o logger 'profiling' emitindo INFO, com ou sem PROFILING_LOG_FILE (sem handler, as linhas
+    cairiam no nível WARNING da raiz). O logger é global do módulo e create_app pode rodar várias
+    vezes no mesmo processo (testes, preload): um handler equivalente já presente não é repetido.
+    """
+    logger.setLevel(logging.INFO)
+    path = app.config.get('PROFILING_LOG_FILE')
+    if path:
+        path = os.path.abspath(path)
+        if not any(isinstance(handler, logging.FileHandler) and handler.baseFilename == path
+                   for handler in logger.handlers):
+            handler = logging.FileHandler(path, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+    elif not logger.handlers:
+        logger.addHandler(default_handler) # O mesmo destino do app.logger (stderr do servidor)
+
+
+def init_app(app):
+    app.config.setdefault('PROFILING_DIR', os.path.join(app.instance_path, 'profiles'))
+    configure_logger(app)
+
+    # Os ganchos ficam sempre registrados e consultam a configuração a cada requisição:
+    # desligado, o custo é um if por requisição e por consulta
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app, weak=False)
+    template_rendered.connect(_rendered, app, weak=False)
+
+    @app.before_request
+    def start_profile():
+        if not current_app.config['PROFILING_ENABLED']:
+            return
+        profile = g.profile = RequestProfile()
+        if random.random() < current_app.config['PROFILING_SAMPLE_RATE']:
+            profile.profiler = cProfile.Profile()
+            try:
+                profile.profiler.enable()
+            except ValueError: # Outro profiler já ativo nesta thread
+                profile.profiler = None
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        total_seconds = time.perf_counter() - profile.start
+        if profile.profiler is not None:
+            profile.profiler.disable()
+            if total_seconds * 1000 >= current_app.config['PROFILING_SLOW_MS']:
+                dump_profile(current_app, profile.profiler, total_seconds)
+        response.headers['Server-Timing'] = server_timing(profile, total_seconds)
+        logger.info(json.dumps(log_record(profile, response, total_seconds), ensure_ascii=False))
+        return response
+
+    @app.teardown_request
+    def discard_profile(exc):
+        # Se after_request não chegou a rodar, o cProfile não pode ficar ligado na thread
+        profile = g.pop('profile', None)
+        if profile is not None and profile.profiler is not None:
+            profile.profiler.disable()
+
+    @app.cli.command('profile-report')
+    @click.argument('log_file', type=click.File('r', encoding='utf-8'))
+    @click.option('--top', default=10, show_default=True, help='Quantas rotas mostrar.')
+    def profile_report_command(log_file, top):
+        """Rotas mais lentas (p95) segundo o log do profiling (PROFILING_LOG_FILE)."""
+        rows = aggregate(read_log(log_file))[:top]
+        if not rows:
+            click.echo('Nenhum registro de profiling no arquivo.')
+            return
+        click.echo(f'{"endpoint":30} {"req":>6} {"p50 ms":>9} {"p95 ms":>9} {"max ms":>9} '
+                   f'{"db ms":>8} {"sql/req":>7} {"tpl ms":>8}')
+        for row in rows:
+            click.echo(f'{row["endpoint"]:30} {row["requests"]:>6} {row["p50_ms"]:>9.2f} {row["p95_ms"]:>9.2f} '
+                       f'{row["max_ms"]:>9.2f} {row["db_ms"]:>8.2f} {row["db_count"]:>7} {row["tpl_ms"]:>8.2f}')
+            if row['slowest_sql']:
+                click.echo(f'    consulta mais lenta: {row["slowest_sql"]}')
+        profiles = app.config['PROFILING_DIR']
+        if os.path.isdir(profiles) and os.listdir(profiles):
+            click.echo(f'Perfis do cProfile em {profiles} (abra com: python -m pstats <arquivo>)')
@@ -0,0 +1,252 @@
+# provisioning.py
+# Cadastro em massa de usuários (onboarding de uma organização): 'flask provision-users usuarios.csv'.
+# Pela página, cada cadastro é um hash de senha e um commit; para dezenas de milhares de contas, o
+# comando faz o mesmo trabalho em lotes de PROVISION_BATCH_SIZE linhas.
+#
+# * Arquivo CSV (cabeçalho username,email,password) ou NDJSON, lido linha a linha como na importação
+#   de tarefas. Cada linha passa pelas regras do RegistrationForm; as inválidas vão para o relatório
+#   (NDJSON, com o número da linha) e não interrompem o cadastro.
+# * Unicidade por lote: duas consultas com IN (nomes e emails já cadastrados) para o lote inteiro, e
+#   as repetições dentro do próprio arquivo também são recusadas.
+# * Hash das senhas num pool de PROVISION_HASH_WORKERS processos (o scrypt é CPU pura; threads
+#   ficariam presas no GIL entre um hash e outro), só das linhas que passaram nas checagens.
+# * Um INSERT e um commit por lote. Se um cadastro pela página ganhar a corrida entre a checagem e o
+#   INSERT (IntegrityError), o lote é refeito linha a linha e só a repetida vai para o relatório.
+# * Depois de cada commit, o checkpoint grava a última linha tratada. Interrompido, o comando continua
+#   dela ao rodar de novo. Mesmo sem o checkpoint, rodar de novo não duplica ninguém: quem já foi
+#   cadastrado volta como "já está em uso" no relatório.
+import csv
+import json
+import os
+from functools import partial
+import click
+from flask import current_app
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+from werkzeug.security import generate_password_hash
+from extensions import db
+from forms import EMAIL_TAKEN, USERNAME_TAKEN, RegistrationForm
+from models import User
+from sharding import place_users
+from transfer import detect_format, parse_csv, parse_ndjson
+
+FIELDS = ('username', 'email', 'password')
+
+
+class UserValidator:
+    """Valida cada linha com as regras do RegistrationForm, reaproveitando uma única instância."""
+
+    def __init__(self):
+        self.form = RegistrationForm(formdata=None, meta={'csrf': False})
+
+    def validate(self, data):
+        """Retorna ({username, email, password}, erros)."""
+        if not isinstance(data, dict):
+            return None, {'linha': ['Linha ilegível: esperado um objeto JSON ou uma linha CSV.']}
+        values = {name: '' if data.get(name) is None else str(data[name]) for name in FIELDS}
+        self.form.process(formdata=MultiDict(dict(values, confirm_password=values['password'])))
+        if not self.form.validate():
+            return None, dict(self.form.errors)
+        return values, None
+
+
+def taken(usernames, emails):
+    """Nomes e emails já cadastrados, entre os informados: duas consultas, qualquer que seja o lote."""
+    existing_usernames = set(db.session.scalars(select(User.username).where(User.username.in_(usernames))))
+    existing_emails = set(db.session.scalars(select(User.email).where(User.email.in_(emails))))
+    return existing_usernames, existing_emails
+
+
+def taken_errors(values, existing_usernames, existing_emails):
+    errors = {}
+    if values['username'] in existing_usernames:
+        errors['username'] = [USERNAME_TAKEN]
+    if values['email'] in existing_emails:
+        errors['email'] = [EMAIL_TAKEN]
+    return errors
+
+
+class Checkpoint:
+    """Progresso do cadastro num arquivo JSON, regravado (de forma atômica) depois de cada lote."""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.line = 0 # Última linha do arquivo já tratada (cadastrada ou no relatório)
+        self.created = 0
+        self.error_count = 0
+
+    def load(self):
+        """Retoma o progresso gravado; False se não houver checkpoint."""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding='utf-8') as checkpoint_file:
+            state = json.load(checkpoint_file)
+        if state['source'] != self.source:
+            raise click.ClickException(f'O checkpoint {self.path} é de outro arquivo ({state["source"]}). '
+                                       'Use --restart para começar do início.')
+        self.line, self.created, self.error_count = state['line'], state['created'], state['errors']
+        return True
+
+    def save(self):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump({'source': self.source, 'line': self.line, 'created': self.created,
+                       'errors': self.error_count}, checkpoint_file)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Provisioner:
+    """Cadastra os usuários lote a lote; os erros vão para 'report' (um arquivo de texto aberto)."""
+
+    def __init__(self, checkpoint, report, batch_size, hash_passwords):
+        self.checkpoint = checkpoint
+        self.report = report
+        self.batch_size = batch_size
+        self.hash_passwords = hash_passwords
+        self.validator = UserValidator()
+        self.batch = [] # (linha, valores) das linhas válidas ainda não gravadas
+        self.errors = [] # (linha, dados, erros) ainda não gravados no relatório
+
+    def run(self, rows):
+        last_line = self.checkpoint.line
+        try:
+            for line_number, data in rows:
+                if line_number <= self.checkpoint.line:
+                    continue # Já tratada numa execução anterior
+                last_line = line_number
+                values, errors = self.validator.validate(data)
+                if errors:
+                    self.errors.append((line_number, data, errors))
+                else:
+                    self.batch.append((line_number, values))
+                    if len(self.batch) >= self.batch_size:
+                        self.flush(last_line)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            self.errors.append((None, None, {'arquivo': [f'Arquivo ilegível: {exc}']}))
+        self.flush(last_line)
+
+    def flush(self, last_line):
+        """Grava o lote (com o relatório e o checkpoint) e marca as linhas até last_line como tratadas."""
+        batch, self.batch = self.batch, []
+        if batch:
+            batch = self.drop_taken(batch)
+        if batch:
+            hashes = self.hash_passwords([values['password'] for _, values in batch])
+            rows = [{'username': values['username'], 'email': values['email'], 'password_hash': password_hash}
+                    for (_, values), password_hash in zip(batch, hashes)]
+            self.insert(batch, rows)
+        self.write_report()
+        self.checkpoint.line = last_line
+        self.checkpoint.save()
+
+    def drop_taken(self, batch):
+        """Tira do lote os nomes e emails já cadastrados ou repetidos no próprio arquivo."""
+        existing_usernames, existing_emails = taken({values['username'] for _, values in batch},
+                                                    {values['email'] for _, values in batch})
+        db.session.rollback() # Nenhuma transação aberta durante os hashes
+        kept = []
+        for line_number, values in batch:
+            errors = taken_errors(values, existing_usernames, existing_emails)
+            if errors:
+                self.errors.append((line_number, values, errors))
+                continue
+            existing_usernames.add(values['username'])
+            existing_emails.add(values['email'])
+            kept.append((line_number, values))
+        return kept
+
+    def insert(self, batch, rows):
+        table = User.__table__
+        try:
+            user_ids = db.session.scalars(insert(table).returning(table.c.id), rows).all()
+            place_users(db.session, user_ids)
+            db.session.commit()
+            self.checkpoint.created += len(rows)
+        except IntegrityError:
+            # Alguém se cadastrou com o mesmo nome ou email depois da checagem: uma linha por vez
+            db.session.rollback()
+            for (line_number, values), row in zip(batch, rows):
+                try:
+                    user_id = db.session.execute(insert(table).values(row)).inserted_primary_key[0]
+                    place_users(db.session, [user_id])
+                    db.session.commit()
+                    self.checkpoint.created += 1
+                except IntegrityError:
+                    db.session.rollback()
+                    self.errors.append((line_number, values,
+                                        taken_errors(values, *taken([values['username']], [values['email']]))))
+
+    def write_report(self):
+        for line_number, data, errors in sorted(self.errors, key=lambda error: error[0] or 0):
+            data = data if isinstance(data, dict) else {}
+            self.report.write(json.dumps({'line': line_number, 'username': data.get('username'),
+                                          'email': data.get('email'), 'errors': errors}, ensure_ascii=False) + '\n')
+        self.report.flush()
+        self.checkpoint.error_count += len(self.errors)
+        self.errors.clear()
+
+
+def password_hasher(method, workers):
+    """
+    (função que calcula os hashes de uma lista de senhas, executor a encerrar ou None). Com mais de
+    um worker, os hashes de cada lote se dividem entre os processos do pool.
+    """
+    hash_one = partial(generate_password_hash, method=method)
+    if workers <= 1:
+        return (lambda passwords: [hash_one(password) for password in passwords]), None
+    from concurrent.futures import ProcessPoolExecutor # Só o comando usa: fora do caminho do create_app
+    executor = ProcessPoolExecutor(workers)
+
+    def hash_passwords(passwords):
+        return list(executor.map(hash_one, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+    return hash_passwords, executor
+
+
+def provision_users(path, import_format, batch_size, workers, checkpoint_path, report_path, restart=False):
+    """Cadastra os usuários do arquivo e retorna o Checkpoint final (criados, erros)."""
+    checkpoint = Checkpoint(checkpoint_path, path)
+    resumed = False if restart else checkpoint.load()
+    hash_passwords, executor = password_hasher(current_app.config['PASSWORD_HASH_METHOD'], workers)
+    try:
+        with open(path, 'rb') as stream, open(report_path, 'a' if resumed else 'w', encoding='utf-8') as report:
+            rows = parse_csv(stream) if import_format == 'csv' else parse_ndjson(stream)
+            Provisioner(checkpoint, report, batch_size, hash_passwords).run(rows)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return checkpoint
+
+
+def init_app(app):
+    @app.cli.command('provision-users')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'import_format', type=click.Choice(['csv', 'ndjson']),
+                  help='Formato do arquivo (padrão: pela extensão).')
+    @click.option('--batch-size', type=int, help='Usuários por INSERT e por commit (padrão: PROVISION_BATCH_SIZE).')
+    @click.option('--workers', type=int, help='Processos de hash (padrão: PROVISION_HASH_WORKERS; 1 = sem pool).')
+    @click.option('--checkpoint', 'checkpoint_path', type=click.Path(dir_okay=False),
+                  help='Arquivo de progresso (padrão: <arquivo>.progress.json).')
+    @click.option('--report', 'report_path', type=click.Path(dir_okay=False),
+                  help='Relatório de erros em NDJSON (padrão: <arquivo>.errors.ndjson).')
+    @click.option('--restart', is_flag=True, help='Ignora o checkpoint e começa do início do arquivo.')
+    def provision_users_command(path, import_format, batch_size, workers, checkpoint_path, report_path, restart):
+        """Cadastra em massa os usuários de um arquivo CSV ou NDJSON (username, email, password)."""
+        import_format = import_format or detect_format(path)
+        if import_format is None:
+            raise click.BadParameter('use um arquivo .csv, .ndjson ou .jsonl, ou informe --format',
+                                     param_hint='PATH')
+        checkpoint_path = checkpoint_path or f'{path}.progress.json'
+        report_path = report_path or f'{path}.errors.ndjson'
+        result = provision_users(path, import_format, batch_size or app.config['PROVISION_BATCH_SIZE'],
+                                 workers or app.config['PROVISION_HASH_WORKERS'], checkpoint_path, report_path,
+                                 restart)
+        result.clear() # Arquivo inteiro tratado: rodar de novo começa do início
+        click.echo(f'{result.created} usuários cadastrados, {result.error_count} linhas com erro.')
+        if result.error_count:
+            click.echo(f'Relatório de erros: {report_path}')
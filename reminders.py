@@ -0,0 +1,250 @@
+# reminders.py
+# Lembretes de prazo: encontra tarefas pendentes que vencem em breve ou que acabaram de vencer,
+# registra um TaskReminder para cada uma e entrega os lembretes a um destino plugável (sink).
+#
+# * Varredura: consulta por faixa de due_date no índice (status, due_date), em lotes pela chave
+#   (due_date, id). A inserção ignora lembretes que já existem (restrição única), então repetir
+#   a varredura, ou rodá-la em vários workers ao mesmo tempo, não duplica nada.
+# * Entrega: cada worker reserva um lote de lembretes numa única instrução UPDATE (claimed_by /
+#   claimed_at) e só então os envia, marcando-os como 'sent'. Se o worker cair no meio, a reserva
+#   expira depois de REMINDER_CLAIM_TIMEOUT segundos e outro worker retoma o envio. A entrega é
+#   "pelo menos uma vez": o id do lembrete vai junto para que o destino possa descartar repetições.
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import and_, delete, or_, select, tuple_, update
+from extensions import db
+from models import Task, TaskReminder
+from sharding import each_shard, selected_shard
+from versioning import upsert_insert
+
+logger = logging.getLogger('reminders')
+
+DUE_SOON = 'due_soon'
+OVERDUE = 'overdue'
+
+
+class LogSink:
+    """Escreve cada lembrete no logger 'reminders'."""
+
+    def send(self, reminder):
+        logger.info(json.dumps(reminder, ensure_ascii=False))
+
+
+class FileSink:
+    """Acrescenta cada lembrete como uma linha JSON num arquivo (útil em testes e para inspeção)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, reminder):
+        line = json.dumps(reminder, ensure_ascii=False) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as fh:
+            fh.write(line)
+
+
+def make_sink(config):
+    name = config['REMINDER_SINK']
+    if name == 'log':
+        return LogSink()
+    if name == 'file':
+        return FileSink(config['REMINDER_SINK_FILE'])
+    raise ValueError(f'REMINDER_SINK desconhecido: {name!r}')
+
+
+def worker_name():
+    return f'{socket.gethostname()[:40]}:{os.getpid()}:{threading.get_ident()}'
+
+
+def start_of_day(now):
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def scan_windows(config, now):
+    """(tipo, início, fim) das faixas de due_date a varrer; o prazo é a meia-noite do dia de vencimento."""
+    today = start_of_day(now)
+    return [
+        (OVERDUE, today - timedelta(days=config['REMINDER_OVERDUE_LOOKBACK_DAYS']), today),
+        (DUE_SOON, today, today + timedelta(days=config['REMINDER_DUE_SOON_DAYS'] + 1)),
+    ]
+
+
+def insert_ignoring_existing(rows):
+    dialect_insert = upsert_insert(db.session.get_bind().dialect.name)
+    if dialect_insert is not None:
+        db.session.execute(dialect_insert(TaskReminder).values(rows).on_conflict_do_nothing(
+            index_elements=['task_id', 'kind', 'due_date']))
+        return
+    keys = {(row['task_id'], row['kind'], row['due_date']) for row in rows}
+    existing = set(db.session.execute(
+        select(TaskReminder.task_id, TaskReminder.kind, TaskReminder.due_date)
+        .where(TaskReminder.task_id.in_({key[0] for key in keys}))).all())
+    new_rows = [row for row in rows if (row['task_id'], row['kind'], row['due_date']) not in existing]
+    if new_rows:
+        db.session.execute(TaskReminder.__table__.insert(), new_rows)
+
+
+def delete_reminders(task_ids):
+    """
+    Apaga os lembretes das tarefas que estão saindo (lista de ids ou subconsulta). O ON DELETE
+    CASCADE de task_reminder não vale no SQLite sem PRAGMA foreign_keys (que os shards não podem
+    ligar: a tabela user fica no banco principal), e o id de uma tarefa excluída pode ser
+    reaproveitado: um lembrete órfão seria entregue para a tarefa nova.
+    """
+    db.session.execute(delete(TaskReminder).where(TaskReminder.task_id.in_(task_ids)))
+
+
+def scan(config, now=None):
+    """Registra os lembretes das tarefas pendentes nas faixas de prazo. Retorna quantas tarefas viu."""
+    now = now or datetime.utcnow()
+    batch_size = config['REMINDER_BATCH_SIZE']
+    seen = 0
+    for kind, start, end in scan_windows(config, now):
+        query = (select(Task.id, Task.user_id, Task.due_date)
+                 .where(Task.status == 'pendente', Task.due_date >= start, Task.due_date < end)
+                 .order_by(Task.due_date, Task.id).limit(batch_size))
+        last = None
+        while True:
+            batch_query = query if last is None else query.where(tuple_(Task.due_date, Task.id) > last)
+            rows = db.session.execute(batch_query).all()
+            if rows:
+                insert_ignoring_existing([
+                    {'task_id': row.id, 'user_id': row.user_id, 'kind': kind, 'due_date': row.due_date,
+                     'state': 'queued', 'created_at': now}
+                    for row in rows
+                ])
+                db.session.commit() # Um commit por lote: uma queda perde no máximo o lote corrente
+                seen += len(rows)
+            if len(rows) < batch_size:
+                break
+            last = (rows[-1].due_date, rows[-1].id)
+    return seen
+
+
+def claim(worker, now, config):
+    """
+    Reserva até REMINDER_BATCH_SIZE lembretes na fila numa única instrução e retorna os reservados.
+    Cada reserva leva um token próprio, então só as linhas desta chamada voltam.
+    """
+    token = f'{worker}/{uuid.uuid4().hex[:12]}'
+    expired = now - timedelta(seconds=config['REMINDER_CLAIM_TIMEOUT'])
+    claimable = and_(TaskReminder.state == 'queued',
+                     or_(TaskReminder.claimed_at.is_(None), TaskReminder.claimed_at < expired))
+    candidates = (select(TaskReminder.id).where(claimable).order_by(TaskReminder.id)
+                  .limit(config['REMINDER_BATCH_SIZE']).scalar_subquery())
+    # A condição se repete fora da subconsulta: se dois workers disputarem a mesma linha,
+    # o segundo a reavalia depois do commit do primeiro e desiste dela
+    db.session.execute(update(TaskReminder).where(TaskReminder.id.in_(candidates), claimable)
+                       .values(claimed_by=token, claimed_at=now))
+    db.session.commit()
+    return db.session.execute(
+        select(TaskReminder, Task.title, Task.status, Task.due_date.label('current_due_date'))
+        .outerjoin(Task, Task.id == TaskReminder.task_id)
+        .where(TaskReminder.claimed_by == token, TaskReminder.state == 'queued')
+        .order_by(TaskReminder.id)).all()
+
+
+def reminder_payload(reminder, title, shard=0):
+    return {
+        'id': reminder.id, # Único dentro do shard (sharding.py): o destino descarta repetições por (shard, id)
+        'shard': shard,
+        'kind': reminder.kind,
+        'task_id': reminder.task_id,
+        'user_id': reminder.user_id,
+        'title': title,
+        'due_date': reminder.due_date.date().isoformat(),
+    }
+
+
+def dispatch(sink, config, worker=None, now=None):
+    """Envia os lembretes na fila, lote a lote. Retorna (enviados, descartados)."""
+    worker = worker or worker_name()
+    sent = skipped = 0
+    while True:
+        now_batch = now or datetime.utcnow()
+        rows = claim(worker, now_batch, config)
+        if not rows:
+            return sent, skipped
+        done, obsolete = [], []
+        for reminder, title, status, current_due_date in rows:
+            # A tarefa pode ter sido concluída, excluída ou remarcada depois da varredura
+            if status != 'pendente' or current_due_date != reminder.due_date:
+                obsolete.append(reminder.id)
+                continue
+            try:
+                sink.send(reminder_payload(reminder, title, selected_shard() or 0))
+            except Exception:
+                # Fica reservado até a reserva expirar; outro ciclo tenta de novo
+                logger.exception('Falha ao enviar o lembrete %s', reminder.id)
+                continue
+            done.append(reminder.id)
+        for ids, state in ((done, 'sent'), (obsolete, 'skipped')):
+            if ids:
+                db.session.execute(update(TaskReminder).where(TaskReminder.id.in_(ids))
+                                   .values(state=state, sent_at=now_batch))
+        db.session.commit()
+        sent += len(done)
+        skipped += len(obsolete)
+
+
+def run_once(app, now=None):
+    """Uma passada completa: varredura e entrega. Pode rodar em vários processos ao mesmo tempo."""
+    seen = sent = skipped = 0
+    with app.app_context():
+        for _ in each_shard():
+            seen += scan(app.config, now)
+            shard_sent, shard_skipped = dispatch(app.extensions['reminder_sink'], app.config, now=now)
+            sent, skipped = sent + shard_sent, skipped + shard_skipped
+    return seen, sent, skipped
+
+
+class ReminderScheduler:
+    """Thread em segundo plano que chama run_once a cada REMINDER_INTERVAL segundos."""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        # Espera um intervalo antes da primeira passada: na inicialização as migrações podem não ter rodado
+        while not self._stop.wait(self.interval):
+            try:
+                run_once(self.app)
+            except Exception:
+                logger.exception('Falha na passada de lembretes')
+
+
+def init_app(app):
+    app.config.setdefault('REMINDER_SINK_FILE', os.path.join(app.instance_path, 'reminders.ndjson'))
+    app.extensions['reminder_sink'] = make_sink(app.config)
+    if app.config['REMINDER_SCHEDULER_ENABLED'] and not app.testing:
+        # A thread só começa em start_worker() (app.py), no processo que vai atender as requisições
+        app.extensions['reminder_scheduler'] = ReminderScheduler(app, app.config['REMINDER_INTERVAL'])
+
+    @app.cli.command('send-reminders')
+    @click.option('--loop', is_flag=True, help='Continua rodando, uma passada a cada REMINDER_INTERVAL segundos.')
+    def send_reminders_command(loop):
+        """Procura prazos vencidos ou próximos e envia os lembretes (para o cron ou um worker dedicado)."""
+        while True:
+            seen, sent, skipped = run_once(app)
+            click.echo(f'{seen} tarefas no prazo de lembrete; {sent} lembretes enviados, {skipped} descartados.')
+            if not loop:
+                return
+            time.sleep(app.config['REMINDER_INTERVAL'])
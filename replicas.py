@@ -0,0 +1,158 @@
+# replicas.py
+# Réplicas de leitura do banco principal. As views marcadas com @replica_reads (listagem, detalhe,
+# busca, página inicial, GETs da API, exportação) leem de uma das REPLICA_DATABASE_URLS; todo o resto
+# continua no primário, assim como qualquer escrita, mesmo dentro de uma view marcada.
+#
+# * Leia o que escreveu: uma requisição que escreveu no banco grava na sessão do Flask um prazo
+#   (REPLICA_STICKY_SECONDS); até ele passar, as requisições desse navegador leem do primário. Ele
+#   precisa ser maior que o atraso das réplicas.
+# * Dentro de uma requisição, depois da primeira escrita as leituras seguintes também vão ao primário.
+# * Com shards (sharding.py), as réplicas são do banco principal (o catálogo e o shard 0); os demais
+#   shards são lidos sempre dos próprios arquivos.
+# * Para testar sem um banco replicado, uma réplica pode ser uma cópia do arquivo SQLite feita por
+#   'flask sync-replicas' (uma vez, ou --loop a cada REPLICA_SYNC_INTERVAL segundos): a réplica fica
+#   atrasada até a próxima cópia, como uma réplica de verdade.
+import random
+import sqlite3
+import time
+import click
+from flask import current_app, has_request_context, request, session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+from extensions import db
+
+STICKY_KEY = '_primary_until'
+
+
+def replica_reads(view):
+    """Marca a view: nos GETs, sem escrita recente do usuário, as leituras vão para uma réplica."""
+    view.replica_reads = True
+    return view
+
+
+def bind_key(index):
+    return f'replica-{index}'
+
+
+class ReplicaRouter:
+    """Decide, a cada instrução da Session, entre a réplica da requisição e o primário."""
+
+    def __init__(self, count):
+        self.count = count
+
+    def engines(self):
+        return [db.engines[bind_key(index)] for index in range(self.count)]
+
+    def choose(self):
+        return random.choice(self.engines())
+
+    def route(self, db_session, engine, clause):
+        """A réplica da requisição, ou None (fica o engine que já foi decidido, ou o padrão)."""
+        info = db_session.info
+        # 'flushing': o ORM está gravando (INSERT/UPDATE/DELETE e as leituras que fazem parte disso)
+        if info.get('flushing') or isinstance(clause, UpdateBase):
+            info['wrote'] = True
+            info['replica'] = None
+            return None
+        if 'replica' not in info:
+            # Escolhida na primeira leitura e mantida pela Session: uma requisição não mistura réplicas.
+            # Uma resposta em streaming ganha Session nova e escolhe de novo.
+            info['replica'] = self.choose() if reads_from_replica() else None
+        replica = info['replica']
+        if replica is None or (engine is not None and engine is not db.engine):
+            return None # Sem réplica nesta requisição, ou um shard que não é o banco principal
+        return replica
+
+
+def get_router():
+    return current_app.extensions.get('replica_router')
+
+
+def is_sticky():
+    """Se este navegador escreveu há menos de REPLICA_STICKY_SECONDS e deve ler do primário."""
+    return session.get(STICKY_KEY, 0) > time.time()
+
+
+def reads_from_replica():
+    """Se a requisição atual é um GET de uma view @replica_reads, sem escrita recente deste navegador."""
+    if not has_request_context() or request.method not in ('GET', 'HEAD'):
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'replica_reads', False) and not is_sticky()
+
+
+def _start_flush(session, flush_context, instances):
+    session.info['flushing'] = True
+
+
+def _end_flush(session, *args):
+    # Também no rollback: um flush que falhou não chega ao after_flush_postexec
+    session.info.pop('flushing', None)
+
+
+def reset_routing():
+    # A Session pode sobreviver à requisição (um app_context aberto em volta dela)
+    db.session.info.pop('replica', None)
+    db.session.info.pop('wrote', None)
+
+
+def remember_write(response):
+    if db.session.info.get('wrote'):
+        session[STICKY_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+    return response
+
+
+def sqlite_path(engine):
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        raise click.ClickException(f'{engine.url} não é um arquivo SQLite: a cópia só serve de réplica para SQLite.')
+    return engine.url.database
+
+
+def copy_sqlite(source_path, target_path):
+    """Copia o banco inteiro para o arquivo da réplica, de forma consistente (API de backup do SQLite)."""
+    source, target = sqlite3.connect(source_path, timeout=30), sqlite3.connect(target_path, timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def sync_replicas():
+    """Copia o banco principal para cada réplica SQLite. Retorna os caminhos copiados."""
+    source = sqlite_path(db.engine)
+    targets = [sqlite_path(engine) for engine in get_router().engines()]
+    for target in targets:
+        copy_sqlite(source, target)
+    return targets
+
+
+def init_app(app):
+    """Chamada antes de init_db(): as réplicas entram em SQLALCHEMY_BINDS e ganham engine, pool e PRAGMAs."""
+    urls = app.config['REPLICA_DATABASE_URLS']
+    if not urls:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for index, url in enumerate(urls):
+        binds[bind_key(index)] = url
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['replica_router'] = ReplicaRouter(len(urls))
+    # A fábrica de sessões é do db, compartilhada por todas as aplicações criadas no processo. O
+    # before_flush entra primeiro: as leituras dos outros before_flush (stats.py) já fazem parte da escrita
+    for name, listener in (('before_flush', _start_flush), ('after_flush_postexec', _end_flush),
+                           ('after_soft_rollback', _end_flush)):
+        if not event.contains(db.session.session_factory, name, listener):
+            event.listen(db.session.session_factory, name, listener, insert=True)
+    app.before_request(reset_routing)
+    app.after_request(remember_write)
+
+    @app.cli.command('sync-replicas')
+    @click.option('--loop', is_flag=True, help='Copia a cada REPLICA_SYNC_INTERVAL segundos, até ser interrompido.')
+    def sync_replicas_command(loop):
+        """Copia o banco SQLite principal para as réplicas (réplica de teste, com atraso)."""
+        while True:
+            for target in sync_replicas():
+                click.echo(f'Réplica atualizada: {target}')
+            if not loop:
+                return
+            time.sleep(app.config['REPLICA_SYNC_INTERVAL'])
@@ -0,0 +1,119 @@
+# search.py
+# Busca textual nas tarefas (título e descrição) com o FTS5 do SQLite.
+# task_fts é uma tabela virtual de "conteúdo externo": guarda só o índice invertido e lê o texto
+# da própria tabela task. Os gatilhos abaixo mantêm o índice em dia em qualquer caminho de escrita
+# (ORM, UPDATE/DELETE em lote de /tasks/bulk, SQL direto); mudar apenas o status não toca no índice.
+import re
+import click
+from sqlalchemy import column, event, func, literal_column, or_, table
+from extensions import db
+from models import Task
+
+SEARCH_INDEX_DDL = (
+    # remove_diacritics: 'relatorio' encontra 'relatório'
+    """CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5(
+        title, description, content='task', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_fts_au AFTER UPDATE OF title, description ON task BEGIN
+        INSERT INTO task_fts(task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+)
+DROP_SEARCH_INDEX_DDL = (
+    'DROP TRIGGER IF EXISTS task_fts_ai',
+    'DROP TRIGGER IF EXISTS task_fts_ad',
+    'DROP TRIGGER IF EXISTS task_fts_au',
+    'DROP TABLE IF EXISTS task_fts',
+)
+
+task_fts = table('task_fts', column('rowid'))
+TITLE_WEIGHT, DESCRIPTION_WEIGHT = 10.0, 1.0 # Pesos do bm25: acertar no título vale mais
+MAX_TERMS = 10
+TERM_RE = re.compile(r'\w+')
+
+
+def create_search_index(conn):
+    for statement in SEARCH_INDEX_DDL:
+        conn.exec_driver_sql(statement)
+
+
+def drop_search_index(conn):
+    for statement in DROP_SEARCH_INDEX_DDL:
+        conn.exec_driver_sql(statement)
+
+
+def rebuild_search_index(conn):
+    """Refaz o índice inteiro a partir da tabela task (dados antigos ou índice corrompido)."""
+    conn.exec_driver_sql("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+
+
+@event.listens_for(Task.__table__, 'after_create')
+def _create_with_task_table(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        create_search_index(connection)
+
+
+@event.listens_for(Task.__table__, 'before_drop')
+def _drop_with_task_table(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        drop_search_index(connection)
+
+
+def search_terms(text):
+    return TERM_RE.findall(text or '')[:MAX_TERMS]
+
+
+def build_match_query(text):
+    """
+    Converte o texto digitado numa expressão MATCH segura: cada palavra vira um prefixo entre aspas
+    e todas são obrigatórias. Operadores do FTS5 digitados pelo usuário (OR, NEAR, aspas, parênteses)
+    não chegam ao banco, então nenhuma entrada causa erro de sintaxe.
+    """
+    terms = search_terms(text)
+    return ' '.join(f'"{term}"*' for term in terms) or None
+
+
+def search_query(user_id, text):
+    """
+    Consulta das tarefas do usuário que contêm todas as palavras, da mais para a menos relevante.
+    Retorna None quando o texto não tem nenhuma palavra pesquisável.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return None
+    if db.engine.dialect.name != 'sqlite':
+        # Outros bancos (config.py permite PostgreSQL): sem FTS5, recorre a LIKE, sem ranking
+        query = Task.query.filter(Task.user_id == user_id)
+        for term in search_terms(text):
+            pattern = f'%{term}%'
+            query = query.filter(or_(Task.title.ilike(pattern), Task.description.ilike(pattern)))
+        return query.order_by(Task.created_at.desc(), Task.id.desc())
+
+    fts = literal_column('task_fts')
+    return (Task.query
+            .join(task_fts, task_fts.c.rowid == Task.id)
+            .filter(fts.match(match), Task.user_id == user_id)
+            .order_by(func.bm25(fts, literal_column(str(TITLE_WEIGHT)), literal_column(str(DESCRIPTION_WEIGHT))),
+                      Task.id.desc()))
+
+
+def init_app(app):
+    @app.cli.command('rebuild-search')
+    def rebuild_search_command():
+        """Cria (se preciso) e reconstrói o índice de busca a partir das tarefas existentes."""
+        if db.engine.dialect.name != 'sqlite':
+            click.echo('A busca FTS5 só existe no SQLite; nada a fazer.')
+            return
+        from sharding import shard_engines
+        total = 0
+        for _, engine in shard_engines():
+            with engine.begin() as conn:
+                create_search_index(conn)
+                rebuild_search_index(conn)
+                total += conn.exec_driver_sql('SELECT COUNT(*) FROM task').scalar()
+        click.echo(f'Índice de busca reconstruído: {total} tarefas.')
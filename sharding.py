@@ -0,0 +1,331 @@
+# sharding.py
+# Tarefas de cada usuário em um de SHARD_COUNT bancos (shards), para que as escritas de usuários
+# diferentes não disputem a mesma trava de escrita do SQLite. A tabela user fica só no catálogo (o
+# banco principal, SQLALCHEMY_DATABASE_URI); task, task_archive, task_reminder, task_stats,
+# data_version e o índice de busca ficam no shard do usuário.
+#
+# * O shard 0 é o próprio catálogo; os shards 1..N-1 vêm de SHARD_DATABASE_URL. Com SHARD_COUNT=1
+#   (o padrão) nada muda: um banco só, e a Session não passa por aqui.
+# * A posição de cada usuário fica em user.shard, gravada no cadastro a partir de um hash estável do
+#   id (home_shard). Nas requisições, a Session (extensions.RoutingSession) escolhe o banco pelo
+#   current_user; fora delas (comandos, agendador), use_shard() / each_shard() dizem qual é.
+# * 'flask rebalance-shards' move para o shard do hash os usuários que estão em outro (ex.: depois de
+#   aumentar SHARD_COUNT). Cada usuário é copiado com a trava de escrita do shard de origem, o
+#   catálogo passa a apontar para o destino e, depois de USER_CACHE_TTL segundos (o tempo para os
+#   outros workers esquecerem a posição antiga), as linhas da origem são apagadas. Se a origem
+#   recebeu alguma escrita nesse meio-tempo, ela fica intacta e o comando avisa.
+# * As tarefas e as arquivadas recebem ids novos no destino, como em archive.restore_task; cada id é
+#   único dentro do shard, não entre shards.
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+import click
+from flask import current_app, has_app_context, has_request_context
+from flask_login import current_user
+from sqlalchemy import Table, bindparam, event, false, inspect, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.util import find_tables
+import user_cache
+from extensions import db
+from models import ArchivedTask, DataVersion, Task, TaskReminder, TaskStats, User
+
+CATALOG_TABLES = frozenset({'user'})
+# Na ordem em que as linhas de um usuário são apagadas (os lembretes apontam para as tarefas)
+USER_MODELS = (TaskReminder, ArchivedTask, Task, TaskStats, DataVersion)
+
+
+class ShardNotSelected(RuntimeError):
+    """Consulta a uma tabela de tarefas sem usuário logado nem use_shard()."""
+
+
+def home_shard(user_id, count):
+    """Shard de um usuário pelo hash do id: o mesmo em qualquer processo e em qualquer versão do Python."""
+    return zlib.crc32(str(user_id).encode()) % count
+
+
+def bind_key(shard):
+    return f'shard-{shard}'
+
+
+def _statement_tables(mapper, clause):
+    if mapper is not None:
+        return [inspect(mapper).local_table]
+    if isinstance(clause, Table):
+        return [clause]
+    if isinstance(clause, UpdateBase):
+        return [clause.table]
+    return find_tables(clause) if clause is not None else []
+
+
+class ShardRouter:
+    """Escolhe o engine de cada instrução da Session (ver extensions.RoutingSession)."""
+
+    def __init__(self, count):
+        self.count = count
+
+    def engine(self, shard):
+        if not 0 <= shard < self.count:
+            raise ValueError(f'Shard {shard} não configurado (SHARD_COUNT={self.count})')
+        return db.engine if shard == 0 else db.engines[bind_key(shard)]
+
+    def route(self, session, mapper, clause):
+        """Engine do shard selecionado; None para as tabelas do catálogo (o engine padrão)."""
+        if any(table.name in CATALOG_TABLES for table in _statement_tables(mapper, clause)):
+            return None
+        shard = selected_shard(session)
+        if shard is None:
+            raise ShardNotSelected('Consulta às tarefas sem shard: use sharding.use_shard() fora das requisições.')
+        return self.engine(shard)
+
+
+def get_router():
+    return current_app.extensions.get('shard_router')
+
+
+def shard_count():
+    router = get_router()
+    return router.count if router is not None else 1
+
+
+def selected_shard(session=None):
+    """O shard de use_shard() ou, numa requisição, o do usuário logado; None se nenhum."""
+    shard = (session or db.session).info.get('shard')
+    if shard is None and has_request_context() and current_user.is_authenticated:
+        shard = current_user.shard
+    return shard
+
+
+def shard_tables():
+    """Tabelas criadas em cada shard além do catálogo."""
+    return [table for table in db.metadata.sorted_tables if table.name not in CATALOG_TABLES]
+
+
+def shard_engines():
+    """[(shard, engine)] de todos os shards, começando pelo catálogo."""
+    router = get_router()
+    if router is None:
+        return [(0, db.engine)]
+    return [(shard, router.engine(shard)) for shard in range(router.count)]
+
+
+@contextmanager
+def use_shard(shard):
+    """
+    Aponta a Session para um shard fora das requisições. A Session é fechada ao entrar e ao sair
+    (cada transação fica num shard só): faça o commit antes de sair do bloco.
+    """
+    if get_router() is None:
+        yield
+        return
+    session = db.session()
+    previous = session.info.get('shard')
+    session.close()
+    session.info['shard'] = shard
+    try:
+        yield
+    finally:
+        session.close()
+        session.info.pop('shard', None)
+        if previous is not None:
+            session.info['shard'] = previous
+
+
+def each_shard():
+    """Percorre os shards com a Session apontada para cada um (comandos e tarefas de todos os usuários)."""
+    for shard in range(shard_count()):
+        with use_shard(shard):
+            yield shard
+
+
+def place_users(connection, user_ids):
+    """
+    Grava em user.shard o shard do hash do id de usuários recém-inseridos. O cadastro passa por aqui
+    no after_insert; inserções em lote (provisioning.py) chamam direto, com a Session no lugar da
+    conexão. Retorna {id: shard}.
+    """
+    router = get_router() if has_app_context() else None
+    if router is None or not user_ids:
+        return {}
+    shards = {user_id: home_shard(user_id, router.count) for user_id in user_ids}
+    table = User.__table__
+    connection.execute(update(table).where(table.c.id == bindparam('user_id')).values(shard=bindparam('home')),
+                       [{'user_id': user_id, 'home': shard} for user_id, shard in shards.items()])
+    return shards
+
+
+def _place_new_user(mapper, connection, target):
+    shards = place_users(connection, [target.id])
+    if shards:
+        set_committed_value(target, 'shard', shards[target.id])
+
+
+def delete_user_rows(conn, user_id):
+    for model in USER_MODELS:
+        table = model.__table__
+        conn.execute(table.delete().where(table.c.user_id == user_id))
+
+
+def lock_for_write(conn):
+    """No SQLite, toma a trava de escrita já no início da transação (um UPDATE que não altera nada)."""
+    if conn.dialect.name == 'sqlite':
+        table = DataVersion.__table__
+        conn.execute(update(table).where(false()).values(version=table.c.version))
+
+
+def data_version(conn, user_id):
+    table = DataVersion.__table__
+    return conn.execute(select(table.c.version).where(table.c.user_id == user_id)).scalar()
+
+
+def _rows(conn, model, user_id):
+    table = model.__table__
+    return [dict(row) for row in conn.execute(
+        select(table).where(table.c.user_id == user_id).order_by(*table.primary_key.columns)).mappings()]
+
+
+def _without_id(row):
+    return {name: value for name, value in row.items() if name != 'id'}
+
+
+def copy_user_rows(source, target, user_id):
+    """
+    Copia as linhas do usuário de um shard para outro e incrementa a versão de dados no destino
+    (os ids mudam, então os ETags e os caches também precisam mudar). Retorna (tarefas, arquivadas).
+    """
+    delete_user_rows(target, user_id) # Restos de uma mudança interrompida
+    task_ids = {}
+    for row in _rows(source, Task, user_id):
+        old_id = row.pop('id')
+        task_ids[old_id] = target.execute(Task.__table__.insert().values(row)).inserted_primary_key[0]
+    archived = [_without_id(row) for row in _rows(source, ArchivedTask, user_id)]
+    reminders = [dict(_without_id(row), task_id=task_ids[row['task_id']])
+                 for row in _rows(source, TaskReminder, user_id) if row['task_id'] in task_ids]
+    for model, rows in ((ArchivedTask, archived), (TaskReminder, reminders),
+                        (TaskStats, _rows(source, TaskStats, user_id)), (DataVersion, _rows(source, DataVersion, user_id))):
+        if rows:
+            target.execute(model.__table__.insert(), rows)
+
+    table, now = DataVersion.__table__, datetime.utcnow()
+    updated = target.execute(update(table).where(table.c.user_id == user_id)
+                             .values(version=table.c.version + 1, updated_at=now)).rowcount
+    if not updated:
+        target.execute(table.insert().values(user_id=user_id, version=1, updated_at=now))
+    return len(task_ids), len(archived)
+
+
+def move_user(router, user_id, source, target):
+    """
+    Copia o usuário para o shard de destino e aponta o catálogo para ele. A origem fica travada
+    para escrita até o catálogo mudar, e suas linhas só são apagadas por drop_moved_rows().
+    Retorna (tarefas, arquivadas, versão de dados da origem).
+    """
+    with router.engine(source).connect() as src, router.engine(target).connect() as dst:
+        src_tx, dst_tx = src.begin(), dst.begin()
+        try:
+            lock_for_write(src)
+            version = data_version(src, user_id)
+            counts = copy_user_rows(src, dst, user_id)
+            # O catálogo é o shard 0: se ele é a origem ou o destino, a troca vai na mesma transação
+            catalog = src if source == 0 else dst if target == 0 else None
+            if catalog is not None:
+                set_user_shard(catalog, user_id, target)
+                dst_tx.commit()
+            else:
+                dst_tx.commit()
+                with db.engine.begin() as conn:
+                    set_user_shard(conn, user_id, target)
+            src_tx.commit()
+        except BaseException:
+            for tx in (dst_tx, src_tx):
+                if tx.is_active:
+                    tx.rollback()
+            raise
+    user_cache.invalidate(user_id)
+    return counts + (version,)
+
+
+def set_user_shard(conn, user_id, shard):
+    table = User.__table__
+    conn.execute(update(table).where(table.c.id == user_id).values(shard=shard))
+
+
+def drop_moved_rows(router, user_id, source, version):
+    """Apaga as linhas que ficaram na origem, se ninguém escreveu nelas depois da cópia."""
+    with router.engine(source).begin() as conn:
+        lock_for_write(conn)
+        if data_version(conn, user_id) != version:
+            return False
+        delete_user_rows(conn, user_id)
+        return True
+
+
+def plan_moves(router, user_id=None, target=None):
+    """[(usuário, shard atual, destino)] dos usuários fora do lugar (ou só o usuário pedido)."""
+    table = User.__table__
+    query = select(table.c.id, table.c.shard).order_by(table.c.id)
+    if user_id is not None:
+        query = query.where(table.c.id == user_id)
+    with db.engine.connect() as conn:
+        rows = conn.execute(query).all()
+    moves = []
+    for row_id, shard in rows:
+        destination = home_shard(row_id, router.count) if target is None else target
+        if shard != destination:
+            moves.append((row_id, shard, destination))
+    return moves
+
+
+def init_app(app):
+    """Chamada antes de init_db(): os shards entram em SQLALCHEMY_BINDS e ganham engine, pool e PRAGMAs."""
+    count = app.config['SHARD_COUNT']
+    if count < 1:
+        raise ValueError(f'SHARD_COUNT inválido: {count}')
+    if count > 1:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        for shard in range(1, count):
+            binds[bind_key(shard)] = app.config['SHARD_DATABASE_URL'].format(shard=shard)
+        app.config['SQLALCHEMY_BINDS'] = binds
+        app.extensions['shard_router'] = ShardRouter(count)
+    if not event.contains(User, 'after_insert', _place_new_user): # Uma vez por processo
+        event.listen(User, 'after_insert', _place_new_user)
+
+    @app.cli.command('rebalance-shards')
+    @click.option('--user', 'user_id', type=int, help='Só este usuário.')
+    @click.option('--to', 'target', type=int, help='Shard de destino (padrão: o do hash do id).')
+    @click.option('--dry-run', is_flag=True, help='Só mostra as mudanças, sem mover nada.')
+    @click.option('--no-wait', is_flag=True, help='Não espera USER_CACHE_TTL (aplicação parada).')
+    def rebalance_shards_command(user_id, target, dry_run, no_wait):
+        """Move os usuários para o shard do hash do id (ou --user para --to)."""
+        router = get_router()
+        if router is None:
+            raise click.ClickException('Só há um shard (SHARD_COUNT=1): nada a mover.')
+        if target is not None and not 0 <= target < router.count:
+            raise click.BadParameter(f'o shard vai de 0 a {router.count - 1}', param_hint='--to')
+        moves = plan_moves(router, user_id, target)
+        for moving_id, source, destination in moves:
+            if source >= router.count:
+                raise click.ClickException(f'Usuário {moving_id} está no shard {source}, que não está configurado '
+                                           f'(SHARD_COUNT={router.count}).')
+        if dry_run:
+            for moving_id, source, destination in moves:
+                click.echo(f'Usuário {moving_id}: shard {source} -> {destination}')
+            click.echo(f'{len(moves)} usuário(s) a mover.')
+            return
+
+        moved = []
+        for moving_id, source, destination in moves:
+            tasks, archived, version = move_user(router, moving_id, source, destination)
+            moved.append((moving_id, source, version))
+            click.echo(f'Usuário {moving_id}: shard {source} -> {destination} ({tasks} tarefas, {archived} arquivadas)')
+        if moved and not no_wait:
+            # Os outros workers guardam o usuário (e o shard) em cache por até USER_CACHE_TTL segundos
+            click.echo(f"Aguardando {app.config['USER_CACHE_TTL']} s para apagar as cópias antigas...")
+            time.sleep(app.config['USER_CACHE_TTL'] + 1)
+        kept = [moving_id for moving_id, source, version in moved
+                if not drop_moved_rows(router, moving_id, source, version)]
+        for moving_id in kept:
+            click.echo(f'Usuário {moving_id}: a origem recebeu escritas durante a mudança; as linhas antigas '
+                       f'foram mantidas para conferência.')
+        click.echo(f'{len(moved)} usuário(s) movido(s).')
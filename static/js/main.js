@@ -1,6 +1,10 @@
 document.addEventListener('DOMContentLoaded', function() {
     // Adicionar um ouvinte de evento para todas as formas de exclusão
+    // (as linhas da lista já confirmam no próprio formulário e são enviadas pelo fetch abaixo)
     document.querySelectorAll('form[action$="/delete"]').forEach(function(form) {
+        if (form.closest('#task-list')) {
+            return;
+        }
         form.addEventListener('submit', function(event) {
             // Previne o envio padrão do formulário
             event.preventDefault();
@@ -13,6 +17,158 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // Ações em lote: "Selecionar todas" marca/desmarca os checkboxes da página atual.
+    // Os ouvintes ficam no document porque a lista pode ser trocada pelas atualizações ao vivo
+    document.addEventListener('change', function(event) {
+        if (event.target.id === 'bulk-select-all') {
+            document.querySelectorAll('.bulk-select').forEach(function(checkbox) {
+                checkbox.checked = event.target.checked;
+            });
+        }
+    });
+
+    // Confirmação antes da exclusão em lote
+    document.addEventListener('submit', function(event) {
+        const bulkForm = event.target;
+        if (bulkForm.id !== 'bulk-form') {
+            return;
+        }
+        const action = bulkForm.querySelector('select[name="action"]').value;
+        if (action === 'delete' && !confirm('Tem certeza que deseja excluir as tarefas selecionadas?')) {
+            event.preventDefault();
+        }
+    });
+
+    // Mensagem no mesmo formato das mensagens flash do servidor, que some depois de alguns segundos
+    const showMessage = function(text, category) {
+        let flashes = document.querySelector('.flashes');
+        if (!flashes) {
+            flashes = document.createElement('ul');
+            flashes.className = 'flashes';
+            document.querySelector('main').prepend(flashes);
+        }
+        const message = document.createElement('li');
+        message.className = category;
+        message.textContent = text;
+        flashes.appendChild(message);
+        setTimeout(function() { message.remove(); }, 5000);
+    };
+
+    // Concluir, reabrir e excluir na lista sem recarregar a página: a rota responde em JSON só com
+    // a linha afetada. Se algo der errado, o formulário é enviado do jeito normal (com redirect)
+    document.addEventListener('submit', function(event) {
+        const form = event.target;
+        const listEl = document.getElementById('task-list');
+        if (event.defaultPrevented || !listEl || !listEl.contains(form)
+                || !/\/(complete|uncomplete|delete)$/.test(form.getAttribute('action'))) {
+            return;
+        }
+        event.preventDefault();
+        const row = form.closest('.task-item');
+        fetch(form.action, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: {'Accept': 'application/json'},
+            credentials: 'same-origin'
+        })
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error(response.status);
+                }
+                return response.json();
+            })
+            .then(function(data) {
+                const statusFilter = listEl.dataset.statusFilter;
+                const hidden = statusFilter && statusFilter !== 'all' && statusFilter !== data.status;
+                if (data.deleted || hidden) {
+                    row.remove();
+                } else {
+                    row.outerHTML = data.html;
+                }
+                showMessage(data.message, data.deleted ? 'info' : 'success');
+            })
+            .catch(function() {
+                form.submit();
+            });
+    });
+
+    // Atualizações ao vivo (Server-Sent Events, live.py): mudanças feitas em outra aba ou por
+    // outro dispositivo aparecem na lista sem recarregar a página
+    const taskList = document.getElementById('task-list');
+    if (taskList && window.EventSource) {
+        const statusFilter = taskList.dataset.statusFilter;
+        const firstPage = taskList.dataset.firstPage === 'true';
+        let connected = false;
+        let refreshing = null;
+
+        // Busca a página de novo e troca só o conteúdo da lista
+        const refreshList = function() {
+            if (refreshing) {
+                return refreshing;
+            }
+            refreshing = fetch(window.location.href, {credentials: 'same-origin'})
+                .then(function(response) { return response.ok ? response.text() : null; })
+                .then(function(html) {
+                    if (!html) {
+                        return;
+                    }
+                    const fresh = new DOMParser().parseFromString(html, 'text/html').getElementById('task-list');
+                    if (fresh) {
+                        taskList.innerHTML = fresh.innerHTML;
+                        taskList.dataset.version = fresh.dataset.version;
+                    }
+                })
+                .finally(function() { refreshing = null; });
+            return refreshing;
+        };
+
+        const showsStatus = function(status) {
+            return !statusFilter || statusFilter === 'all' || statusFilter === status;
+        };
+
+        const source = new EventSource(taskList.dataset.streamUrl);
+        source.addEventListener('hello', function(event) {
+            const data = JSON.parse(event.data);
+            // Na primeira conexão, só recarrega se algo mudou desde que a página foi gerada;
+            // numa reconexão, eventos podem ter se perdido enquanto ela estava fora
+            if (connected || String(data.version) !== taskList.dataset.version) {
+                refreshList();
+            }
+            connected = true;
+        });
+        source.addEventListener('upsert', function(event) {
+            const data = JSON.parse(event.data);
+            if (statusFilter === 'archived') {
+                return refreshList();
+            }
+            const row = document.getElementById('task-' + data.task_id);
+            if (row) {
+                if (showsStatus(data.status)) {
+                    row.outerHTML = data.html;
+                } else {
+                    row.remove();
+                }
+                return;
+            }
+            if (!firstPage || !showsStatus(data.status)) {
+                return; // A tarefa não entra nesta página
+            }
+            const list = taskList.querySelector('.task-list');
+            if (data.created && list) {
+                list.insertAdjacentHTML('afterbegin', data.html); // A mais recente vem primeiro
+            } else {
+                refreshList();
+            }
+        });
+        source.addEventListener('delete', function(event) {
+            const row = document.getElementById('task-' + JSON.parse(event.data).task_id);
+            if (row) {
+                row.remove();
+            }
+        });
+        source.addEventListener('refresh', refreshList);
+    }
+
     // Opcional: Adicionar funcionalidade para esconder mensagens flash após alguns segundos
     const flashMessages = document.querySelectorAll('.flashes li');
     flashMessages.forEach(function(message) {
@@ -0,0 +1,157 @@
+# stats.py
+# Painel de estatísticas por usuário (página inicial): tarefas por status, arquivadas, taxa de
+# conclusão, atrasadas e a vencer.
+#
+# * Contagens por status: ficam prontas na tabela task_stats. Escritas pelo ORM (criar, editar,
+#   concluir, reabrir, excluir, restaurar) são contadas por um gancho before_flush, que soma as
+#   diferenças no mesmo flush; escritas em lote (ações em lote, API em lote, importação,
+#   arquivamento) chamam add_to_stats() com as diferenças exatas. Tudo na transação da escrita.
+# * Atrasadas e a vencer dependem do relógio e não podem ser mantidas assim: saem de uma única
+#   contagem por faixa de due_date no índice (user_id, status, due_date), sem ler a tabela task.
+# * 'flask reconcile-stats' recalcula os contadores do zero, mostra as divergências e as corrige.
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import event, false, func, inspect, select, update
+from extensions import db
+from models import ArchivedTask, Task, TaskStats
+from sharding import each_shard
+from versioning import upsert_insert
+
+STATUS_COUNTERS = {'pendente': 'pending', 'concluida': 'completed'}
+COUNTERS = ('pending', 'completed', 'archived')
+
+
+def status_deltas(statuses, sign=1):
+    """Diferenças dos contadores para tarefas com esses status entrando (+1) ou saindo (-1)."""
+    deltas = Counter()
+    for status in statuses:
+        deltas[STATUS_COUNTERS[status]] += sign
+    return deltas
+
+
+def add_to_stats(user_id, deltas, session=None):
+    """Soma as diferenças aos contadores do usuário numa única instrução (cria a linha se preciso)."""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    session = session or db.session
+    table = TaskStats.__table__
+    now = datetime.utcnow()
+    dialect_insert = upsert_insert(session.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).values(user_id=user_id, updated_at=now,
+                                            **{name: deltas.get(name, 0) for name in COUNTERS})
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_=dict({name: table.c[name] + value for name, value in deltas.items()}, updated_at=now)))
+        return
+    updated = session.execute(update(table).where(table.c.user_id == user_id).values(
+        updated_at=now, **{name: table.c[name] + value for name, value in deltas.items()})).rowcount
+    if not updated:
+        session.execute(table.insert().values(user_id=user_id, updated_at=now,
+                                              **{name: deltas.get(name, 0) for name in COUNTERS}))
+
+
+def _committed_status(task):
+    history = inspect(task).attrs.status.history
+    return (history.deleted or history.unchanged or [task.status])[0]
+
+
+def _before_flush(session, flush_context, instances):
+    deltas = defaultdict(Counter)
+    for obj in session.new:
+        if isinstance(obj, Task):
+            deltas[obj.user_id].update(status_deltas([obj.status or 'pendente']))
+        elif isinstance(obj, ArchivedTask):
+            deltas[obj.user_id]['archived'] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            deltas[obj.user_id].update(status_deltas([_committed_status(obj)], -1))
+        elif isinstance(obj, ArchivedTask):
+            deltas[obj.user_id]['archived'] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Task) and obj not in session.deleted:
+            history = inspect(obj).attrs.status.history
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                deltas[obj.user_id].update(status_deltas(history.deleted, -1))
+                deltas[obj.user_id].update(status_deltas(history.added))
+    # update() em vez de '+=': o Counter descartaria as diferenças negativas
+    for user_id in sorted(deltas):
+        add_to_stats(user_id, deltas[user_id], session)
+
+
+def get_dashboard(user_id, config, now=None):
+    """Números do painel: uma leitura de task_stats e uma contagem por faixa no índice."""
+    today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    soon = today + timedelta(days=config['STATS_DUE_SOON_DAYS'] + 1)
+    row = db.session.get(TaskStats, user_id)
+    counts = {name: getattr(row, name) if row else 0 for name in COUNTERS}
+    overdue, due_soon = db.session.execute(
+        select(func.count().filter(Task.due_date < today), func.count().filter(Task.due_date >= today))
+        .where(Task.user_id == user_id, Task.status == 'pendente', Task.due_date < soon)).one()
+    done = counts['completed'] + counts['archived']
+    total = counts['pending'] + done
+    return dict(counts, total=total, overdue=overdue, due_soon=due_soon,
+                completion_rate=round(100 * done / total) if total else None)
+
+
+def actual_counts(conn):
+    """Contadores recalculados do zero a partir de task e task_archive: {user_id: {contador: valor}}."""
+    counts = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    rows = conn.execute(select(Task.user_id, Task.status, func.count()).group_by(Task.user_id, Task.status))
+    for user_id, status, count in rows:
+        counts[user_id][STATUS_COUNTERS[status]] += count
+    rows = conn.execute(select(ArchivedTask.user_id, func.count()).group_by(ArchivedTask.user_id))
+    for user_id, count in rows:
+        counts[user_id]['archived'] = count
+    return counts
+
+
+def reconcile(conn, fix=True):
+    """
+    Compara os contadores gravados com os recalculados e, com fix=True, corrige as divergências.
+    Retorna [(user_id, gravado, real)]. No SQLite a trava de escrita é tomada antes das contagens,
+    então nenhuma escrita concorrente cai entre contar e corrigir.
+    """
+    table = TaskStats.__table__
+    if fix and conn.dialect.name == 'sqlite':
+        conn.execute(update(table).where(false()).values(pending=table.c.pending))
+    actual = actual_counts(conn)
+    stored = {row.user_id: {name: row[name] for name in COUNTERS}
+              for row in conn.execute(select(table)).mappings()}
+    empty = dict.fromkeys(COUNTERS, 0)
+    drift = []
+    for user_id in sorted(set(actual) | set(stored)):
+        real, saved = actual.get(user_id, empty), stored.get(user_id, empty)
+        if real != saved:
+            drift.append((user_id, saved, real))
+    if fix:
+        now = datetime.utcnow()
+        for user_id, saved, real in drift:
+            if user_id in stored:
+                conn.execute(update(table).where(table.c.user_id == user_id).values(updated_at=now, **real))
+            else:
+                conn.execute(table.insert().values(user_id=user_id, updated_at=now, **real))
+    return drift
+
+
+def init_app(app):
+    if not event.contains(db.session.session_factory, 'before_flush', _before_flush): # Uma vez por processo
+        event.listen(db.session.session_factory, 'before_flush', _before_flush)
+
+    @app.cli.command('reconcile-stats')
+    @click.option('--dry-run', is_flag=True, help='Só mostra as divergências, sem corrigir.')
+    def reconcile_stats_command(dry_run):
+        """Recalcula os contadores do painel a partir das tarefas e corrige as divergências."""
+        total = 0
+        for _ in each_shard(): # Cada usuário está num shard só: as contagens não se misturam
+            drift = reconcile(db.session.connection(), fix=not dry_run)
+            for user_id, saved, real in drift:
+                changes = ', '.join(f'{name} {saved[name]} -> {real[name]}' for name in COUNTERS if saved[name] != real[name])
+                click.echo(f'Usuário {user_id}: {changes}')
+            if not dry_run:
+                db.session.commit()
+            total += len(drift)
+        verb = 'encontrada(s)' if dry_run else 'corrigida(s)'
+        click.echo(f'{total} divergência(s) {verb}.')
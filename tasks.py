@@ -1,25 +1,140 @@
 # tasks.py
-from flask import Blueprint, render_template, redirect, url_for, flash, abort, request
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, request, current_app, make_response, jsonify
+from markupsafe import Markup
+from sqlalchemy import delete, select, update
 from flask_login import login_required, current_user
 from extensions import db # Importa a instância do SQLAlchemy
-from models import Task # Importa o modelo Task
-from forms import TaskForm # Importa o formulário de tarefa
+from models import ArchivedTask, Task, completed_at_for # Importa os modelos de tarefa
+from forms import TaskForm, BulkTaskForm, SearchForm # Importa os formulários de tarefa
+from pagination import keyset_paginate, offset_paginate, InvalidCursor, Page
+from versioning import bump_data_version, conditional_page, get_data_version
+from fragment_cache import fragment_key, get_cache as get_fragment_cache
+from search import search_query
+from archive import restore_task
+from stats import STATUS_COUNTERS, add_to_stats, status_deltas
+from replicas import replica_reads
+from reminders import delete_reminders
 
 tasks_bp = Blueprint('tasks', __name__, template_folder='templates', static_folder='static')
 
+TASK_STATUSES = ('pendente', 'concluida')
+ARCHIVED_FILTER = 'archived' # ?status=archived lista as tarefas movidas para task_archive (archive.py)
+
+def build_task_list_query(user_id, status_filter=None):
+    """Consulta base da listagem: sempre restrita ao usuário e, opcionalmente, ao status."""
+    query = Task.query.filter(Task.user_id == user_id)
+    if status_filter in TASK_STATUSES:
+        query = query.filter(Task.status == status_filter)
+    return query
+
+def build_archived_list_query(user_id):
+    return ArchivedTask.query.filter(ArchivedTask.user_id == user_id)
+
+def get_user_task_or_404(task_id):
+    """
+    Busca a tarefa pelo id E pelo dono numa única consulta, sem carregar o autor (User).
+    Só quando não encontra é que uma segunda consulta distingue 404 (não existe) de 403 (é de outro usuário).
+    """
+    task = Task.query.filter_by(id=task_id, user_id=current_user.id).first()
+    if task is None:
+        exists = db.session.query(db.exists().where(Task.id == task_id)).scalar()
+        abort(403 if exists else 404) # Proíbe acesso se a tarefa não pertence ao usuário
+    return task
+
+def get_user_archived_task_or_404(archive_id):
+    """Mesma regra de get_user_task_or_404, na tabela de arquivo."""
+    archived = ArchivedTask.query.filter_by(id=archive_id, user_id=current_user.id).first()
+    if archived is None:
+        exists = db.session.query(db.exists().where(ArchivedTask.id == archive_id)).scalar()
+        abort(403 if exists else 404)
+    return archived
+
+def wants_json():
+    """O fetch do main.js pede JSON; o envio normal do formulário (sem JavaScript) prefere HTML."""
+    return request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+def finish_row_action(task, message, category, deleted=False):
+    """
+    Confirma a escrita de uma ação da linha (concluir, reabrir, excluir). Sem JavaScript, segue o
+    fluxo de sempre: mensagem flash e redirect para a lista. Para o fetch, responde só com a linha
+    afetada (_task_row.html), sem consultar nem renderizar a lista. O corpo é montado antes do
+    commit, que expira a tarefa e obrigaria a lê-la de novo.
+    """
+    payload = None
+    if wants_json():
+        payload = {'task_id': task.id, 'status': task.status, 'deleted': deleted, 'message': message}
+        if not deleted:
+            payload['html'] = render_template('_task_row.html', task=task)
+    bump_data_version(current_user.id)
+    db.session.commit()
+    if payload is not None:
+        return jsonify(payload)
+    flash(message, category)
+    return redirect(url_for('tasks.list_tasks'))
+
+def get_per_page():
+    per_page = request.args.get('per_page', type=int) or current_app.config['TASKS_PER_PAGE']
+    return max(1, min(per_page, current_app.config['TASKS_MAX_PER_PAGE']))
+
+def per_page_link_arg(per_page):
+    # Os links de paginação levam o valor normalizado (omitido quando é o padrão), nunca o
+    # ?per_page= cru: requisições com a mesma chave de fragmento renderizam os mesmos links
+    return per_page if per_page != current_app.config['TASKS_PER_PAGE'] else None
+
 @tasks_bp.route('/tasks')
+@replica_reads # Só leitura: pode ler de uma réplica
 @login_required # Garante que apenas usuários logados possam ver as tarefas
+@conditional_page # 304 sem consultar tarefas quando nada mudou desde a última visita
 def list_tasks():
-    # Filtra as tarefas pelo usuário logado
-    tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.created_at.desc()).all()
-    # Adicionando funcionalidade de filtro por status
+    # Filtra as tarefas pelo usuário logado e, opcionalmente, por status
     status_filter = request.args.get('status')
-    if status_filter in ['pendente', 'concluida']:
-        tasks = Task.query.filter_by(user_id=current_user.id, status=status_filter).order_by(Task.created_at.desc()).all()
+    per_page, cursor = get_per_page(), request.args.get('cursor')
+    version, _ = get_data_version(current_user.id)
+
+    # O fragmento da lista é guardado já renderizado; a versão na chave o invalida a cada escrita
+    cache = get_fragment_cache()
+    key = fragment_key(current_user.id, version, status_filter, per_page, cursor)
+    fragment = cache.get(current_user.id, key)
+    if fragment is None:
+        archived = status_filter == ARCHIVED_FILTER
+        # As arquivadas só são lidas quando pedidas; as demais listagens percorrem apenas a tabela ativa
+        if archived:
+            model, query = ArchivedTask, build_archived_list_query(current_user.id)
+        else:
+            model, query = Task, build_task_list_query(current_user.id, status_filter)
+        try:
+            # Uma única consulta por requisição, limitada ao tamanho da página
+            page = keyset_paginate(query, model, per_page, cursor)
+        except InvalidCursor:
+            abort(400)
+        html = render_template('_task_list.html', tasks=page.items, page=page, status_filter=status_filter,
+                               per_page_arg=per_page_link_arg(per_page), archived=archived)
+        fragment = {'html': html, 'has_tasks': bool(page.items)}
+        cache.set(current_user.id, key, fragment)
+        cache_status = 'miss'
     else:
-        tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.created_at.desc()).all()
+        cache_status = 'hit'
 
-    return render_template('list_tasks.html', title='Minhas Tarefas', tasks=tasks, status_filter=status_filter)
+    response = make_response(render_template(
+        'list_tasks.html', title='Minhas Tarefas', task_list_html=Markup(fragment['html']),
+        has_tasks=fragment['has_tasks'], status_filter=status_filter, bulk_form=BulkTaskForm(),
+        data_version=version, cursor=cursor))
+    response.headers['X-Fragment-Cache'] = cache_status
+    return response
+
+@tasks_bp.route('/tasks/search')
+@replica_reads
+@login_required
+@conditional_page
+def search_tasks():
+    # Busca no título e na descrição pelo índice FTS5 (search.py), ordenada por relevância
+    form = SearchForm(request.args)
+    page = None
+    if 'q' in request.args and form.validate():
+        query = search_query(current_user.id, form.q.data)
+        page = Page([]) if query is None else offset_paginate(query, get_per_page(), request.args.get('page', 1, type=int))
+    return render_template('search_tasks.html', title='Buscar Tarefas', form=form, page=page,
+                           per_page_arg=per_page_link_arg(get_per_page()))
 
 @tasks_bp.route('/tasks/new', methods=['GET', 'POST'])
 @login_required
@@ -31,29 +146,45 @@ def create_task():
             description=form.description.data,
             due_date=form.due_date.data,
             status=form.status.data,
-            author=current_user # Associa a tarefa ao usuário logado
+            user_id=current_user.id # Associa a tarefa ao usuário logado
         )
         db.session.add(task)
+        bump_data_version(current_user.id)
         db.session.commit()
         flash('Tarefa criada com sucesso!', 'success')
         return redirect(url_for('tasks.list_tasks'))
     return render_template('create_task.html', title='Nova Tarefa', form=form)
 
 @tasks_bp.route('/tasks/<int:task_id>')
+@replica_reads
 @login_required
+@conditional_page
 def view_task(task_id):
     # Garante que o usuário só possa ver suas próprias tarefas
-    task = Task.query.get_or_404(task_id)
-    if task.author != current_user:
-        abort(403) # Proíbe acesso se a tarefa não pertence ao usuário
+    task = get_user_task_or_404(task_id)
     return render_template('view_task.html', title=task.title, task=task)
 
+@tasks_bp.route('/tasks/archived/<int:archive_id>')
+@replica_reads
+@login_required
+@conditional_page
+def view_archived_task(archive_id):
+    archived = get_user_archived_task_or_404(archive_id)
+    return render_template('view_task.html', title=archived.title, task=archived, archived=True)
+
+@tasks_bp.route('/tasks/archived/<int:archive_id>/restore', methods=['POST']) # Devolve a tarefa à lista ativa
+@login_required
+def restore_archived_task(archive_id):
+    task = restore_task(get_user_archived_task_or_404(archive_id))
+    bump_data_version(current_user.id)
+    db.session.commit()
+    flash('Tarefa restaurada do arquivo!', 'success')
+    return redirect(url_for('tasks.view_task', task_id=task.id))
+
 @tasks_bp.route('/tasks/<int:task_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_task(task_id):
-    task = Task.query.get_or_404(task_id)
-    if task.author != current_user:
-        abort(403)
+    task = get_user_task_or_404(task_id)
 
     form = TaskForm()
     if form.validate_on_submit():
@@ -61,9 +192,10 @@ def edit_task(task_id):
         task.description = form.description.data
         task.due_date = form.due_date.data
         task.status = form.status.data
+        bump_data_version(current_user.id)
         db.session.commit()
         flash('Tarefa atualizada com sucesso!', 'success')
-        return redirect(url_for('tasks.view_task', task_id=task.id))
+        return redirect(url_for('tasks.view_task', task_id=task_id))
     elif request.method == 'GET':
         form.title.data = task.title
         form.description.data = task.description
@@ -74,32 +206,57 @@ def edit_task(task_id):
 @tasks_bp.route('/tasks/<int:task_id>/delete', methods=['POST']) # Usamos POST para exclusão por segurança
 @login_required
 def delete_task(task_id):
-    task = Task.query.get_or_404(task_id)
-    if task.author != current_user:
-        abort(403)
+    task = get_user_task_or_404(task_id)
+    delete_reminders([task.id])
     db.session.delete(task)
-    db.session.commit()
-    flash('Tarefa excluída com sucesso!', 'info')
-    return redirect(url_for('tasks.list_tasks'))
+    return finish_row_action(task, 'Tarefa excluída com sucesso!', 'info', deleted=True)
 
 @tasks_bp.route('/tasks/<int:task_id>/complete', methods=['POST']) # Rota específica para marcar como concluída
 @login_required
 def complete_task(task_id):
-    task = Task.query.get_or_404(task_id)
-    if task.author != current_user:
-        abort(403)
+    task = get_user_task_or_404(task_id)
     task.status = 'concluida'
-    db.session.commit()
-    flash('Tarefa marcada como concluída!', 'success')
-    return redirect(url_for('tasks.list_tasks'))
+    return finish_row_action(task, 'Tarefa marcada como concluída!', 'success')
 
 @tasks_bp.route('/tasks/<int:task_id>/uncomplete', methods=['POST']) # Opcional: para reverter para pendente
 @login_required
 def uncomplete_task(task_id):
-    task = Task.query.get_or_404(task_id)
-    if task.author != current_user:
-        abort(403)
+    task = get_user_task_or_404(task_id)
     task.status = 'pendente'
+    return finish_row_action(task, 'Tarefa marcada como pendente novamente!', 'info')
+
+@tasks_bp.route('/tasks/bulk', methods=['POST']) # Conclui, reabre ou exclui várias tarefas de uma vez
+@login_required
+def bulk_tasks():
+    form = BulkTaskForm()
+    task_ids = request.form.getlist('task_ids', type=int)
+    if not form.validate_on_submit() or not task_ids:
+        flash('Selecione ao menos uma tarefa e uma ação.', 'danger')
+        return redirect(url_for('tasks.list_tasks'))
+    if len(task_ids) > current_app.config['BULK_MAX_TASKS']:
+        flash(f"Selecione no máximo {current_app.config['BULK_MAX_TASKS']} tarefas por vez.", 'danger')
+        return redirect(url_for('tasks.list_tasks'))
+
+    # Um único UPDATE/DELETE restrito ao usuário logado: ids de outros usuários são simplesmente ignorados
+    selected = (Task.user_id == current_user.id) & Task.id.in_(task_ids)
+    if form.action.data == 'delete':
+        # RETURNING devolve o status de cada tarefa excluída, para descontá-las do painel (stats.py)
+        delete_reminders(select(Task.id).where(selected))
+        statuses = db.session.scalars(delete(Task).where(selected).returning(Task.status)).all()
+        add_to_stats(current_user.id, status_deltas(statuses, -1))
+        message = f'{len(statuses)} tarefa(s) excluída(s) com sucesso!'
+    else:
+        status = 'concluida' if form.action.data == 'complete' else 'pendente'
+        # Só as tarefas que mudam de status são tocadas: as que já estavam no status pedido mantêm a
+        # data de conclusão, e o número de linhas alteradas é exatamente o que o painel precisa somar
+        count = db.session.execute(
+            update(Task).where(selected, Task.status != status)
+            .values(status=status, completed_at=completed_at_for(status))
+            .execution_options(synchronize_session=False)).rowcount
+        previous = 'pendente' if status == 'concluida' else 'concluida'
+        add_to_stats(current_user.id, {STATUS_COUNTERS[status]: count, STATUS_COUNTERS[previous]: -count})
+        message = f'{count} tarefa(s) marcada(s) como {status}!'
+    bump_data_version(current_user.id)
     db.session.commit()
-    flash('Tarefa marcada como pendente novamente!', 'info')
-    return redirect(url_for('tasks.list_tasks'))
\ No newline at end of file
+    flash(message, 'success')
+    return redirect(url_for('tasks.list_tasks', status=request.args.get('status')))
@@ -1,29 +1,101 @@
 # tests/conftest.py
+from collections import namedtuple
 import pytest
-from app import app
+from flask import request_started, request_finished
+from sqlalchemy import event
+from app import create_app
 from extensions import db
 from models import User, Task
 from flask_login import current_user # Importar aqui para usar no contexto do fixture
 
 @pytest.fixture(scope='function')
-def client():
+def app():
     """
-    Cria um cliente de teste do Flask e configura um banco de dados SQLite em memória
-    que é recriado para CADA FUNÇÃO DE TESTE.
+    Cria uma aplicação nova, com o perfil de testes e seu próprio banco SQLite em memória,
+    para CADA FUNÇÃO DE TESTE. Caches, broker e configuração não vazam de um teste para outro.
     """
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['WTF_CSRF_ENABLED'] = False # Desativa CSRF para facilitar os testes de formulário
-
-    with app.app_context(): # Um único contexto de aplicação para setup/teardown do DB
+    flask_app = create_app('testing')
+    with flask_app.app_context():
         db.create_all()
-        # O cliente de teste é gerado dentro deste contexto, mas opera em seu próprio contexto de requisição
-        yield app.test_client() # Retorna o cliente de teste para os testes
+
+    yield flask_app
+
+    with flask_app.app_context():
         db.session.remove()
         db.drop_all()
+        db.engine.dispose()
+
+@pytest.fixture(autouse=True)
+def _push_request_context():
+    """
+    Sobrescreve o fixture do pytest-flask que mantém um contexto de requisição aberto
+    durante todo o teste. Cada requisição do cliente de teste deve ter seu próprio
+    contexto (e sua própria sessão do SQLAlchemy), como acontece em produção.
+    """
+    yield
+
+RequestQueries = namedtuple('RequestQueries', 'path count statements')
+
+class QueryCounter:
+    """Conta as consultas SQL emitidas em cada requisição feita pelo cliente de teste."""
+
+    def __init__(self):
+        self.requests = [] # RequestQueries de cada requisição, na ordem em que foram feitas
+        self._current = None
+
+    def _on_request_started(self, sender, **extra):
+        from flask import request
+        self._current = (request.path, [])
+
+    def _on_request_finished(self, sender, response, **extra):
+        if self._current is not None:
+            path, statements = self._current
+            self.requests.append(RequestQueries(path, len(statements), statements))
+            self._current = None
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        if self._current is not None:
+            self._current[1].append(statement)
+
+    @property
+    def last(self):
+        """Número de consultas da última requisição concluída."""
+        return self.requests[-1].count
+
+    @property
+    def last_statements(self):
+        """SQL emitido pela última requisição concluída."""
+        return self.requests[-1].statements
+
+    def reset(self):
+        self.requests.clear()
+
+    def assert_budget(self, budget):
+        """Falha se alguma requisição registrada passou do orçamento de consultas."""
+        over = [(item.path, item.count) for item in self.requests if item.count > budget]
+        assert not over, f'Requisições acima do orçamento de {budget} consultas: {over}'
+
+@pytest.fixture(scope='function')
+def query_counter(app):
+    """Registra quantas consultas SQL cada requisição executa (apenas durante a requisição)."""
+    counter = QueryCounter()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', counter._on_execute)
+    request_started.connect(counter._on_request_started, app)
+    request_finished.connect(counter._on_request_finished, app)
+    yield counter
+    request_finished.disconnect(counter._on_request_finished, app)
+    request_started.disconnect(counter._on_request_started, app)
+    event.remove(engine, 'before_cursor_execute', counter._on_execute)
+
+@pytest.fixture(scope='function')
+def client(app):
+    """Cria um cliente de teste do Flask sobre o banco recriado pelo fixture 'app'."""
+    return app.test_client()
 
 @pytest.fixture(scope='function')
-def logged_in_user_id(client):
+def logged_in_user_id(app, client):
     """
     Registra um usuário, faz login e retorna seu ID.
     O login é persistido na sessão do cliente de teste para o ciclo de vida do teste.
@@ -44,4 +116,4 @@ def logged_in_user_id(client):
     assert "Login bem-sucedido!" in login_response.data.decode('utf-8')
 
     # Retorna o ID do usuário. O 'client' (que está logado) é passado implicitamente para o teste.
-    return user_id # Não 'yield', pois o login deve persistir durante o teste.
\ No newline at end of file
+    return user_id # Não 'yield', pois o login deve persistir durante o teste.
@@ -0,0 +1,160 @@
+# tests/test_api.py
+from extensions import db
+from models import User, Task
+
+def create_task_via_api(client, **fields):
+    return client.post('/api/v1/tasks', json=fields)
+
+def test_api_requires_login(client):
+    """Sem sessão a API responde 401 em JSON, em vez de redirecionar para o login."""
+    response = client.get('/api/v1/tasks')
+    assert response.status_code == 401
+    assert response.is_json
+
+def test_api_create_and_get_task(client, logged_in_user_id):
+    """Cria uma tarefa via JSON e a lê de volta."""
+    response = create_task_via_api(client, title='Tarefa da API', description='via JSON', due_date='2025-06-30')
+    assert response.status_code == 201
+    created = response.get_json()
+    assert created['status'] == 'pendente'
+    assert created['due_date'] == '2025-06-30'
+    assert response.headers['Location'].endswith(f"/api/v1/tasks/{created['id']}")
+
+    response = client.get(f"/api/v1/tasks/{created['id']}")
+    assert response.status_code == 200
+    assert response.get_json() == created
+
+def test_api_validation_reuses_task_form_rules(client, logged_in_user_id):
+    """As regras do TaskForm (título com 5+ caracteres, status válido) valem para a API."""
+    response = create_task_via_api(client, title='abc', status='talvez')
+    assert response.status_code == 422
+    errors = response.get_json()['errors']
+    assert set(errors) == {'title', 'status'}
+
+    response = client.post('/api/v1/tasks', data='title=Tarefa de formulario')
+    assert response.status_code == 415
+
+def test_api_list_is_paginated(client, logged_in_user_id):
+    """A listagem JSON usa os mesmos cursores da página HTML."""
+    for i in range(5):
+        create_task_via_api(client, title=f'Tarefa paginada {i}')
+
+    first = client.get('/api/v1/tasks?per_page=3').get_json()
+    assert [task['title'] for task in first['tasks']] == [f'Tarefa paginada {i}' for i in (4, 3, 2)]
+    assert first['prev_cursor'] is None
+
+    second = client.get(f"/api/v1/tasks?per_page=3&cursor={first['next_cursor']}").get_json()
+    assert [task['title'] for task in second['tasks']] == ['Tarefa paginada 1', 'Tarefa paginada 0']
+    assert second['next_cursor'] is None
+
+def test_api_etag_revalidation(client, logged_in_user_id):
+    """If-None-Match com o ETag atual devolve 304; depois de uma alteração, o ETag muda."""
+    task_id = create_task_via_api(client, title='Tarefa com ETag').get_json()['id']
+
+    response = client.get(f'/api/v1/tasks/{task_id}')
+    etag = response.headers['ETag']
+    response = client.get(f'/api/v1/tasks/{task_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    list_etag = client.get('/api/v1/tasks').headers['ETag']
+    assert client.get('/api/v1/tasks', headers={'If-None-Match': list_etag}).status_code == 304
+
+    client.patch(f'/api/v1/tasks/{task_id}', json={'status': 'concluida'})
+    assert client.get(f'/api/v1/tasks/{task_id}', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/api/v1/tasks', headers={'If-None-Match': list_etag}).status_code == 200
+
+def test_api_patch_and_if_match(client, logged_in_user_id):
+    """PATCH parcial mantém os demais campos; If-Match desatualizado resulta em 412."""
+    created = create_task_via_api(client, title='Tarefa original', description='manter').get_json()
+    etag = client.get(f"/api/v1/tasks/{created['id']}").headers['ETag']
+
+    response = client.patch(f"/api/v1/tasks/{created['id']}", json={'title': 'Tarefa renomeada'},
+                            headers={'If-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['description'] == 'manter'
+
+    response = client.patch(f"/api/v1/tasks/{created['id']}", json={'status': 'concluida'},
+                            headers={'If-Match': etag})
+    assert response.status_code == 412
+
+def test_api_delete_task(client, logged_in_user_id):
+    task_id = create_task_via_api(client, title='Tarefa para excluir').get_json()['id']
+    assert client.delete(f'/api/v1/tasks/{task_id}').status_code == 204
+    assert client.get(f'/api/v1/tasks/{task_id}').status_code == 404
+
+def test_api_cannot_touch_foreign_tasks(app, client, logged_in_user_id):
+    with app.app_context():
+        other = User(username='outroapi', email='outroapi@example.com')
+        other.set_password('x')
+        db.session.add(other)
+        db.session.flush()
+        task = Task(title='Tarefa de outro', user_id=other.id)
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+
+    assert client.get(f'/api/v1/tasks/{task_id}').status_code == 403
+    assert client.patch(f'/api/v1/tasks/{task_id}', json={'status': 'concluida'}).status_code == 403
+    assert client.delete(f'/api/v1/tasks/{task_id}').status_code == 403
+
+def test_api_batch_create_is_all_or_nothing(app, client, logged_in_user_id, query_counter):
+    """O lote inteiro é rejeitado se um item for inválido; senão é gravado num único commit."""
+    response = client.post('/api/v1/tasks/batch', json={'tasks': [{'title': 'Tarefa válida'}, {'title': 'x'}]})
+    assert response.status_code == 422
+    assert response.get_json()['errors'][0]['index'] == 1
+    with app.app_context():
+        assert Task.query.count() == 0
+
+    query_counter.reset()
+    response = client.post('/api/v1/tasks/batch',
+                           json={'tasks': [{'title': f'Tarefa em lote {i}'} for i in range(50)]})
+    assert response.status_code == 201
+    created = response.get_json()['tasks']
+    assert [task['title'] for task in created] == [f'Tarefa em lote {i}' for i in range(50)]
+    with app.app_context():
+        assert {task['id']: task['title'] for task in created} == dict(db.session.query(Task.id, Task.title))
+    # O número de consultas não cresce com o tamanho do lote
+    query_counter.assert_budget(5)
+    # A resposta do lote tem o mesmo formato da leitura de cada tarefa
+    assert created[7] == client.get(f"/api/v1/tasks/{created[7]['id']}").get_json()
+
+def test_api_rejects_values_of_the_wrong_type(client, logged_in_user_id):
+    response = client.post('/api/v1/tasks', json={'title': 12345, 'status': True})
+    assert response.status_code == 422
+    assert set(response.get_json()['errors']) == {'title', 'status'}
+    response = client.post('/api/v1/tasks/batch', json={'tasks': [{'title': 'Tarefa válida', 'due_date': 20250301}]})
+    assert response.status_code == 422
+
+def test_api_batch_update(app, client, logged_in_user_id):
+    ids = [task['id'] for task in client.post('/api/v1/tasks/batch', json={
+        'tasks': [{'title': f'Tarefa em lote {i}'} for i in range(3)]}).get_json()['tasks']]
+
+    response = client.patch('/api/v1/tasks/batch', json={'tasks': [
+        {'id': ids[0], 'status': 'concluida'},
+        {'id': ids[1], 'title': 'Tarefa renomeada'},
+    ]})
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(Task, ids[0]).status == 'concluida'
+        assert db.session.get(Task, ids[1]).title == 'Tarefa renomeada'
+
+    response = client.patch('/api/v1/tasks/batch', json={'tasks': [{'id': 999999, 'status': 'concluida'}]})
+    assert response.status_code == 422
+
+def test_api_batch_update_rejects_bad_and_repeated_ids(app, client, logged_in_user_id):
+    task_id = create_task_via_api(client, title='Tarefa um').get_json()['id']
+
+    for bad_id in ([task_id], {'x': task_id}, True, None):
+        response = client.patch('/api/v1/tasks/batch', json={'tasks': [{'id': bad_id, 'status': 'concluida'}]})
+        assert response.status_code == 422
+        assert response.get_json()['errors'][0]['errors'] == {'id': ['Informe o id numérico da tarefa.']}
+
+    # O mesmo id duas vezes: o segundo item apagaria as mudanças do primeiro
+    response = client.patch('/api/v1/tasks/batch', json={'tasks': [
+        {'id': task_id, 'title': 'Outra tarefa'}, {'id': task_id, 'status': 'concluida'}]})
+    assert response.status_code == 422
+    assert [error['index'] for error in response.get_json()['errors']] == [1]
+    with app.app_context():
+        task = db.session.get(Task, task_id)
+        assert (task.title, task.status) == ('Tarefa um', 'pendente')
@@ -0,0 +1,37 @@
+# tests/test_app.py
+import os
+import subprocess
+import sys
+from app import create_app
+from extensions import db
+from models import User
+
+def test_apps_are_isolated(app):
+    """Cada create_app() tem sua configuração, seu banco e seus caches."""
+    other = create_app('testing', TASKS_PER_PAGE=7)
+    assert other.config['TASKS_PER_PAGE'] == 7 and app.config['TASKS_PER_PAGE'] != 7
+    assert other.extensions['fragment_cache'] is not app.extensions['fragment_cache']
+    with app.app_context():
+        db.session.add(User(username='so_no_primeiro', email='primeiro@example.com'))
+        db.session.commit()
+    with other.app_context():
+        db.create_all()
+        assert User.query.count() == 0
+
+def test_importing_app_defers_feature_modules():
+    """Importar app.py (o processo mestre do gunicorn, o Flask CLI) não carrega blueprints nem extensões."""
+    code = 'import sys, app; print(sorted(m for m in ("tasks", "api", "live", "reminders") if m in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert output.stdout.strip() == '[]'
+
+def test_preload_warms_up_and_starts_worker_on_first_request():
+    app = create_app('testing', preload=True, TESTING=False, REMINDER_SCHEDULER_ENABLED=True, REMINDER_INTERVAL=3600)
+    try:
+        assert 'list_tasks.html' in {name for _, name in app.jinja_env.cache.keys()} # Templates já compilados
+        scheduler = app.extensions['reminder_scheduler']
+        assert not scheduler._thread.is_alive() # Nada de threads antes do fork
+        app.test_client().get('/auth/login')
+        assert scheduler._thread.is_alive() and app.extensions['worker_pid'] == os.getpid()
+    finally:
+        app.extensions['reminder_scheduler'].stop(timeout=1)
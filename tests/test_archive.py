@@ -0,0 +1,115 @@
+# tests/test_archive.py
+from datetime import datetime, timedelta
+from extensions import db
+from models import ArchivedTask, Task, TaskReminder
+from tests.test_auth import register_user, login_user
+import archive
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+def add_task(app, user_id, title, status='pendente', completed_days_ago=None):
+    with app.app_context():
+        task = Task(title=title, status=status, user_id=user_id, created_at=NOW - timedelta(days=400))
+        db.session.add(task)
+        db.session.flush()
+        if completed_days_ago is not None:
+            task.completed_at = NOW - timedelta(days=completed_days_ago)
+        db.session.commit()
+        return task.id
+
+def run_archive(app, older_than_days=30):
+    with app.app_context():
+        return archive.archive_completed(app.config, older_than_days, now=NOW)
+
+def archived_ids(app):
+    with app.app_context():
+        return {row.task_id: row.id for row in ArchivedTask.query}
+
+def test_completed_at_follows_status_changes(app, client, logged_in_user_id):
+    task_id = add_task(app, logged_in_user_id, 'Tarefa de conclusão')
+    client.post(f'/tasks/{task_id}/complete')
+    with app.app_context():
+        completed_at = db.session.get(Task, task_id).completed_at
+    assert completed_at is not None
+
+    client.post(f'/tasks/{task_id}/edit', data={'title': 'Título novo', 'status': 'concluida'})
+    with app.app_context():
+        assert db.session.get(Task, task_id).completed_at == completed_at # Editar não reinicia a data
+
+    client.post('/tasks/bulk', data={'action': 'uncomplete', 'task_ids': [task_id]})
+    with app.app_context():
+        assert db.session.get(Task, task_id).completed_at is None
+
+def test_archives_only_old_completed_tasks(app, client, logged_in_user_id):
+    old = add_task(app, logged_in_user_id, 'Concluída há muito tempo', 'concluida', completed_days_ago=100)
+    recent = add_task(app, logged_in_user_id, 'Concluída ontem', 'concluida', completed_days_ago=1)
+    pending = add_task(app, logged_in_user_id, 'Ainda pendente')
+    with app.app_context():
+        db.session.add(TaskReminder(task_id=old, user_id=logged_in_user_id, kind='overdue', due_date=NOW))
+        db.session.commit()
+
+    etag = client.get('/tasks').headers['ETag']
+    assert run_archive(app) == 1
+    assert run_archive(app) == 0 # Repetir não move mais nada
+    assert set(archived_ids(app)) == {old}
+    with app.app_context():
+        assert {task.id for task in Task.query} == {recent, pending}
+        assert TaskReminder.query.count() == 0
+
+    response = client.get('/tasks', headers={'If-None-Match': etag})
+    assert response.status_code == 200 # A versão de dados mudou com o arquivamento
+    assert 'Concluída há muito tempo' not in response.get_data(as_text=True)
+    assert 'Concluída ontem' in response.get_data(as_text=True)
+
+def test_archive_runs_in_batches(app, logged_in_user_id, monkeypatch):
+    monkeypatch.setitem(app.config, 'ARCHIVE_BATCH_SIZE', 3)
+    for day in range(10):
+        add_task(app, logged_in_user_id, f'Antiga {day}', 'concluida', completed_days_ago=40 + day)
+    assert run_archive(app) == 10
+    with app.app_context():
+        assert Task.query.count() == 0 and ArchivedTask.query.count() == 10
+
+def test_archived_filter_view_and_restore(app, client, logged_in_user_id):
+    old = add_task(app, logged_in_user_id, 'Relatório de 2023', 'concluida', completed_days_ago=365)
+    run_archive(app)
+    archive_id = archived_ids(app)[old]
+
+    listing = client.get('/tasks?status=archived').get_data(as_text=True)
+    assert 'Relatório de 2023' in listing
+    assert f'/tasks/archived/{archive_id}' in listing
+    assert client.get(f'/tasks/{old}').status_code == 404
+    view = client.get(f'/tasks/archived/{archive_id}')
+    assert view.status_code == 200 and 'Arquivada em' in view.get_data(as_text=True)
+
+    response = client.post(f'/tasks/archived/{archive_id}/restore', follow_redirects=True)
+    assert 'Tarefa restaurada do arquivo!' in response.get_data(as_text=True)
+    assert archived_ids(app) == {}
+    with app.app_context():
+        restored = Task.query.filter_by(title='Relatório de 2023').one()
+        assert restored.status == 'concluida' and restored.completed_at > NOW
+    assert run_archive(app) == 0 # A data de conclusão recomeçou
+
+def test_archived_task_of_other_user_is_forbidden(app, client, logged_in_user_id):
+    old = add_task(app, logged_in_user_id, 'Arquivada do primeiro', 'concluida', completed_days_ago=365)
+    run_archive(app)
+    archive_id = archived_ids(app)[old]
+    client.get('/auth/logout')
+    register_user(client, 'outro', 'outro@example.com', 'outrasenha')
+    login_user(client, 'outro@example.com', 'outrasenha')
+
+    assert client.get(f'/tasks/archived/{archive_id}').status_code == 403
+    assert client.post(f'/tasks/archived/{archive_id}/restore').status_code == 403
+    assert client.get('/tasks/archived/999').status_code == 404
+    assert 'Arquivada do primeiro' not in client.get('/tasks?status=archived').get_data(as_text=True)
+
+def test_cli(app, logged_in_user_id):
+    add_task(app, logged_in_user_id, 'Antiga', 'concluida', completed_days_ago=1000)
+    result = app.test_cli_runner().invoke(args=['archive-tasks', '--older-than', '30'])
+    assert '1 tarefas arquivadas.' in result.output
+
+def test_archive_scan_uses_index(app):
+    with app.app_context():
+        plan = [row[-1] for row in db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT id, user_id FROM task WHERE status = 'concluida' AND completed_at < :cutoff "
+            "ORDER BY completed_at, id LIMIT 500"), {'cutoff': NOW})]
+    assert any('USING INDEX ix_task_status_completed' in step for step in plan), plan
@@ -0,0 +1,206 @@
+# tests/test_asgi.py
+# Modo ASGI (async_app.py): as mesmas views, com tarefas e autenticação no engine assíncrono.
+import asyncio
+import gc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+import pytest
+from sqlalchemy import event, select
+from werkzeug.security import generate_password_hash
+from extensions import db
+from models import DataVersion, Task, TaskStats, User
+import login_guard
+import migrations
+
+pytest.importorskip('aiosqlite')
+pytest.importorskip('greenlet')
+from async_app import create_asgi_app
+
+
+class AsgiClient:
+    """Cliente mínimo para chamar a aplicação ASGI direto, guardando os cookies como um navegador."""
+
+    def __init__(self, asgi_app):
+        self.asgi_app = asgi_app
+        self.cookies = {}
+
+    def scope(self, method, path, data, body):
+        url = urlsplit(path)
+        headers = [(b'host', b'localhost')]
+        if self.cookies:
+            headers.append((b'cookie', '; '.join(f'{k}={v}' for k, v in self.cookies.items()).encode()))
+        if data is not None:
+            headers += [(b'content-type', b'application/x-www-form-urlencoded'),
+                        (b'content-length', str(len(body)).encode())]
+        return {'type': 'http', 'method': method, 'path': url.path, 'root_path': '',
+                'query_string': url.query.encode(), 'headers': headers, 'http_version': '1.1',
+                'scheme': 'http', 'server': ('localhost', 80), 'client': ('127.0.0.1', 50000)}
+
+    def open_stream(self, path):
+        """Abre uma resposta em streaming: (tarefa, mensagens enviadas, evento que desconecta o cliente)."""
+        messages, sent, disconnect = [{'type': 'http.request', 'body': b'', 'more_body': False}], [], asyncio.Event()
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        return asyncio.ensure_future(self.asgi_app(self.scope('GET', path, None, b''), receive, send)), sent, disconnect
+
+    async def request(self, method, path, data=None):
+        body = urlencode(data or {}).encode()
+        scope = self.scope(method, path, data, body)
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait() # Cliente conectado até o fim da resposta
+
+        async def send(message):
+            sent.append(message)
+
+        await self.asgi_app(scope, receive, send)
+        start = sent[0]
+        response_headers = [(name.decode(), value.decode()) for name, value in start['headers']]
+        for name, value in response_headers:
+            if name == 'set-cookie':
+                for key, morsel in SimpleCookie(value).items():
+                    self.cookies[key] = morsel.value
+        return start['status'], dict(response_headers), b''.join(m.get('body', b'') for m in sent[1:]).decode()
+
+
+@pytest.fixture
+def asgi(tmp_path):
+    asgi_app = create_asgi_app('testing', SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'asgi.db'}")
+    with asgi_app.app.app_context():
+        migrations.upgrade()
+    loop = asyncio.new_event_loop()
+    yield asgi_app, loop
+    loop.run_until_complete(asgi_app.engine.dispose())
+    loop.close()
+    asgi_app.executor.shutdown()
+    with asgi_app.app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    gc.collect() # Loop, greenlets e conexões do aiosqlite formam ciclos: não deixa a coleta para o próximo teste
+
+
+@pytest.fixture
+def statements(asgi):
+    """Instruções SQL executadas em cada engine: {'async': [...], 'sync': [...]}."""
+    asgi_app, _ = asgi
+    with asgi_app.app.app_context():
+        engines = {'async': asgi_app.engine.sync_engine, 'sync': db.engine}
+    seen = {name: [] for name in engines}
+    listeners = []
+    for name, engine in engines.items():
+        listener = lambda conn, cursor, statement, *args, name=name: seen[name].append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        listeners.append((engine, listener))
+    yield seen
+    for engine, listener in listeners:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+def sign_up(loop, client, name):
+    email = f'{name}@example.com'
+    status, headers, _ = loop.run_until_complete(client.request('POST', '/auth/register', {
+        'username': name, 'email': email, 'password': 'senha123', 'confirm_password': 'senha123'}))
+    assert status == 302 and headers['location'].endswith('/auth/login')
+    status, _, _ = loop.run_until_complete(client.request('POST', '/auth/login', {'email': email, 'password': 'senha123'}))
+    assert status == 302
+
+
+def test_task_and_auth_views_use_the_async_engine(asgi, statements):
+    asgi_app, loop = asgi
+    client = AsgiClient(asgi_app)
+    sign_up(loop, client, 'assincrono')
+    status, _, _ = loop.run_until_complete(client.request(
+        'POST', '/tasks/new', {'title': 'Tarefa no loop', 'status': 'pendente'}))
+    assert status == 302
+    status, _, body = loop.run_until_complete(client.request('GET', '/tasks'))
+    assert status == 200 and 'Tarefa no loop' in body
+    assert statements['async'] and not statements['sync']
+
+    # Os eventos da Session continuam valendo: contadores do painel e versão de dados
+    with asgi_app.app.app_context():
+        task = db.session.scalars(select(Task)).one()
+        assert db.session.get(TaskStats, task.user_id).pending == 1
+        assert db.session.get(DataVersion, task.user_id).version >= 1
+
+
+def test_other_routes_run_as_wsgi_on_the_sync_engine(asgi, statements):
+    asgi_app, loop = asgi
+    client = AsgiClient(asgi_app)
+    sign_up(loop, client, 'sincrono')
+    for seen in statements.values():
+        seen.clear()
+    status, headers, body = loop.run_until_complete(client.request('GET', '/api/v1/tasks'))
+    assert status == 200 and headers['content-type'] == 'application/json'
+    assert statements['sync'] and not statements['async']
+    status, _, _ = loop.run_until_complete(client.request('GET', '/nao-existe'))
+    assert status == 404
+
+
+def test_password_hash_does_not_block_the_event_loop(asgi, monkeypatch):
+    asgi_app, loop = asgi
+    page_served = threading.Event()
+
+    def slow_hash(password, method):
+        # Só termina depois que outra requisição foi atendida: com o loop bloqueado, esperaria o timeout
+        served = page_served.wait(timeout=5)
+        return generate_password_hash(password, method) if served else 'loop-bloqueado'
+
+    monkeypatch.setattr(login_guard, 'generate_password_hash', slow_hash)
+
+    async def scenario():
+        signup = asyncio.ensure_future(AsgiClient(asgi_app).request('POST', '/auth/register', {
+            'username': 'lento', 'email': 'lento@example.com', 'password': 'senha123', 'confirm_password': 'senha123'}))
+        await asyncio.sleep(0.05) # O cadastro já está esperando pelo hash
+        status, _, _ = await AsgiClient(asgi_app).request('GET', '/auth/login')
+        page_served.set()
+        return status, (await signup)[0]
+
+    assert loop.run_until_complete(scenario()) == (200, 302)
+    with asgi_app.app.app_context():
+        assert db.session.scalars(select(User.password_hash)).one() != 'loop-bloqueado'
+
+def test_idle_streams_do_not_hold_the_thread_pool(asgi):
+    """Mais conexões SSE abertas que threads no pool: as outras rotas continuam respondendo."""
+    asgi_app, loop = asgi
+    asgi_app.executor.shutdown()
+    asgi_app.executor = ThreadPoolExecutor(2, thread_name_prefix='asgi-wsgi')
+    client = AsgiClient(asgi_app)
+    sign_up(loop, client, 'aovivo')
+
+    async def scenario():
+        streams = [client.open_stream('/tasks/stream') for _ in range(6)]
+        while not all(len(sent) >= 2 for _, sent, _ in streams): # Cabeçalhos e o evento 'hello'
+            await asyncio.sleep(0.01)
+        api_status, _, _ = await asyncio.wait_for(client.request('GET', '/api/v1/tasks'), 5)
+        create_status, _, _ = await asyncio.wait_for(client.request(
+            'POST', '/tasks/new', {'title': 'Pelo loop', 'status': 'pendente'}), 5)
+        await asyncio.sleep(0.05)
+        delivered = [b'Pelo loop' in b''.join(m.get('body', b'') for m in sent) for _, sent, _ in streams]
+        for _, _, disconnect in streams:
+            disconnect.set()
+        await asyncio.wait_for(asyncio.gather(*(task for task, _, _ in streams)), 5)
+        return api_status, create_status, delivered
+
+    assert loop.run_until_complete(scenario()) == (200, 302, [True] * 6)
+    assert asgi_app.app.extensions['live_broker'].subscriber_count() == 0
+
+def test_unsupported_setups(tmp_path):
+    with pytest.raises(ValueError):
+        create_asgi_app('testing') # SQLite em memória
+    with pytest.raises(ValueError):
+        create_asgi_app('testing', SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'catalog.db'}", SHARD_COUNT=2,
+                        SHARD_DATABASE_URL=f"sqlite:///{tmp_path / 'shard-{shard}.db'}")
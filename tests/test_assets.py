@@ -0,0 +1,55 @@
+# tests/test_assets.py
+import gzip
+import json
+import pytest
+from app import create_app
+
+@pytest.fixture
+def built_app(tmp_path):
+    """Aplicação com o build dos assets num diretório temporário."""
+    flask_app = create_app('testing', ASSETS_DIR=str(tmp_path))
+    result = flask_app.test_cli_runner().invoke(args=['build-assets'])
+    assert result.exit_code == 0, result.output
+    return flask_app
+
+def test_build_writes_fingerprinted_files_and_manifest(built_app, tmp_path):
+    """Cada arquivo ganha o hash do conteúdo no nome, uma versão .gz e uma entrada no manifesto."""
+    manifest = json.loads((tmp_path / 'manifest.json').read_text())
+    target = manifest['css/style.css']
+    assert target.startswith('css/style.') and target.endswith('.css') and target != 'css/style.css'
+    with open(built_app.static_folder + '/css/style.css', 'rb') as f:
+        original = f.read()
+    assert (tmp_path / target).read_bytes() == original
+    assert gzip.decompress((tmp_path / (target + '.gz')).read_bytes()) == original
+
+    html = built_app.test_client().get('/auth/login').data.decode('utf-8')
+    assert f'/assets/{target}' in html
+    assert f"/assets/{manifest['js/main.js']}" in html
+
+def test_assets_are_immutable_and_precompressed(built_app):
+    """A rota /assets/ escolhe a versão pré-comprimida aceita e manda guardar por um ano."""
+    client = built_app.test_client()
+    with built_app.test_request_context():
+        url = built_app.jinja_env.globals['asset_url']('css/style.css')
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'immutable' in response.headers['Cache-Control'] and 'max-age=31536000' in response.headers['Cache-Control']
+    assert 'Accept-Encoding' in response.headers['Vary']
+    compressed = response.data
+    response.close()
+
+    response = client.get(url)
+    assert 'Content-Encoding' not in response.headers
+    assert gzip.decompress(compressed) == response.data
+    response.close()
+
+    assert client.get('/assets/manifest.json').status_code == 404
+    assert client.get('/assets/css/nao-existe.css').status_code == 404
+
+def test_without_manifest_falls_back_to_static(tmp_path):
+    """Sem build (ou em desenvolvimento), as páginas usam o /static/ de sempre."""
+    flask_app = create_app('testing', ASSETS_DIR=str(tmp_path))
+    html = flask_app.test_client().get('/auth/login').data.decode('utf-8')
+    assert '/static/css/style.css' in html and '/assets/' not in html
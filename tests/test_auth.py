@@ -63,6 +63,17 @@ def test_register_existing_email(client):
     with client.application.app_context():
         assert User.query.filter_by(email='existing@example.com').count() == 1
 
+def test_register_relies_on_unique_constraints(client, query_counter):
+    """O cadastro não consulta o nome e o email antes: só o INSERT, barrado pelas restrições UNIQUE."""
+    register_user(client, 'unico', 'unico@example.com', 'password123')
+    register = query_counter.requests[0]
+    assert register.path == '/auth/register'
+    assert [sql.split()[0] for sql in register.statements] == ['INSERT']
+
+    response = register_user(client, 'unico', 'unico@example.com', 'password123')
+    assert "Esse nome de usuário já está em uso." in response.data.decode('utf-8')
+    assert "Esse email já está registrado." in response.data.decode('utf-8')
+
 def test_login_user_success(client):
     """Testa o login bem-sucedido de um usuário."""
     register_user(client, 'loginuser', 'login@example.com', 'loginpass')
@@ -0,0 +1,44 @@
+# tests/test_benchmarks.py
+# Partes do benchmark de carga que decidem se uma execução falha: o gerador de dados e a comparação.
+from extensions import db
+from models import Task
+from benchmarks import datagen, report
+
+def generated_tasks(app):
+    with app.app_context():
+        return [(t.user_id, t.title, t.status, t.due_date) for t in Task.query.order_by(Task.id)]
+
+def test_datagen_is_deterministic(app):
+    user_ids = datagen.generate(app, users=3, tasks_per_user=50, seed=7)
+    first = generated_tasks(app)
+    assert len(user_ids) == 3 and len(first) == 150
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    datagen.generate(app, users=3, tasks_per_user=50, seed=7)
+    assert generated_tasks(app) == first
+
+    statuses = [status for _, _, status, _ in first]
+    assert 0.2 < statuses.count('concluida') / len(statuses) < 0.6
+    assert any(due is None for *_, due in first) and any(due is not None for *_, due in first)
+
+def test_summarize_percentiles():
+    summary = report.summarize([i / 1000 for i in range(1, 101)], wall_seconds=2.0, queries=300)
+    assert summary['requests'] == 100
+    assert summary['p50_ms'] == 50.5
+    assert summary['p99_ms'] == 99.01
+    assert summary['rps'] == 50.0
+    assert summary['queries_per_request'] == 3.0
+
+def run(p95, queries=1.0, errors=0):
+    return {'routes': {'list': {'p95_ms': p95, 'queries_per_request': queries, 'errors': errors}}}
+
+def test_compare_flags_regressions():
+    baseline = run(10.0)
+    assert report.compare(baseline, run(12.0)) == []
+    assert len(report.compare(baseline, run(13.0))) == 1 # Mais de 25% acima
+    assert len(report.compare(baseline, run(10.0, queries=2.0))) == 1
+    assert len(report.compare(baseline, run(10.0, errors=3))) == 1
+    # Variações abaixo de MIN_LATENCY_DELTA_MS são ruído, mesmo em porcentagem grande
+    assert report.compare(run(0.5), run(1.0)) == []
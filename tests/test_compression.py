@@ -0,0 +1,49 @@
+# tests/test_compression.py
+import gzip
+from extensions import db
+from models import Task
+from versioning import bump_data_version
+
+def seed_tasks(app, user_id, count):
+    with app.app_context():
+        db.session.execute(Task.__table__.insert(), [
+            {'title': f'Tarefa comprimida {i:04d}', 'description': 'Descrição repetida ' * 5, 'user_id': user_id}
+            for i in range(count)
+        ])
+        bump_data_version(user_id)
+        db.session.commit()
+
+def test_large_page_is_gzipped_and_revalidates(app, client, logged_in_user_id):
+    """A listagem grande sai comprimida, com ETag fraco que ainda vale para o 304."""
+    seed_tasks(app, logged_in_user_id, 20)
+    plain = client.get('/tasks')
+    assert 'Content-Encoding' not in plain.headers # Sem Accept-Encoding, nada muda
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    response = client.get('/tasks', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == plain.data
+    assert len(response.data) < len(plain.data) / 3
+    assert response.headers['ETag'] == 'W/' + plain.headers['ETag']
+
+    again = client.get('/tasks', headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+def test_small_and_streamed_responses_are_not_compressed(app, client, logged_in_user_id):
+    """Respostas pequenas ou em streaming (exportação) passam sem compressão."""
+    seed_tasks(app, logged_in_user_id, 20)
+    headers = {'Accept-Encoding': 'gzip'}
+    assert 'Content-Encoding' not in client.get('/api/v1/tasks/1', headers=headers).headers
+    assert 'Content-Encoding' not in client.get('/tasks/export?format=csv', headers=headers).headers
+    app.config['COMPRESS_ENABLED'] = False
+    assert 'Content-Encoding' not in client.get('/tasks', headers=headers).headers
+
+def test_api_if_match_accepts_weak_etag_from_compressed_response(app, client, logged_in_user_id):
+    """O ETag W/ de uma leitura comprimida serve para o If-Match de uma escrita."""
+    seed_tasks(app, logged_in_user_id, 1)
+    app.config['COMPRESS_MIN_SIZE'] = 0
+    response = client.get('/api/v1/tasks/1', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'].startswith('W/')
+    response = client.patch('/api/v1/tasks/1', json={'status': 'concluida'}, headers={'If-Match': response.headers['ETag']})
+    assert response.status_code == 200
@@ -0,0 +1,72 @@
+# tests/test_config.py
+import threading
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from config import get_config, ProductionConfig, TestingConfig, engine_options
+from extensions import apply_sqlite_pragmas
+
+def test_profiles_by_name(monkeypatch):
+    assert get_config('testing') is TestingConfig
+    monkeypatch.setenv('APP_ENV', 'production')
+    assert get_config() is ProductionConfig
+    with pytest.raises(ValueError):
+        get_config('staging')
+
+def test_pool_options_only_for_server_databases():
+    assert engine_options('sqlite:///site.db') == {}
+    options = engine_options('postgresql://app@localhost/tarefas')
+    assert options['pool_pre_ping'] is True
+    assert options['pool_recycle'] > 0 and options['pool_size'] > 0
+
+def make_file_engine(path, pragmas):
+    engine = create_engine(f'sqlite:///{path}', pool_size=16, max_overflow=0)
+    apply_sqlite_pragmas(engine, pragmas)
+    return engine
+
+def test_production_pragmas_are_applied_on_connect(tmp_path):
+    engine = make_file_engine(tmp_path / 'pragmas.db', ProductionConfig.SQLITE_PRAGMAS)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1 # NORMAL
+        assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+        assert conn.exec_driver_sql('PRAGMA cache_size').scalar() < 0
+        assert conn.exec_driver_sql('PRAGMA temp_store').scalar() == 2 # MEMORY
+    engine.dispose()
+
+def test_parallel_writers_do_not_hit_lock_errors(tmp_path):
+    """Vários escritores simultâneos no mesmo arquivo, com o perfil de produção: nenhum 'database is locked'."""
+    engine = make_file_engine(tmp_path / 'stress.db', ProductionConfig.SQLITE_PRAGMAS)
+    with engine.begin() as conn:
+        conn.exec_driver_sql('CREATE TABLE task (id INTEGER PRIMARY KEY, title TEXT, status TEXT)')
+
+    writers, writes_per_writer = 12, 40
+    errors = []
+    start = threading.Barrier(writers)
+
+    def writer(number):
+        start.wait()
+        try:
+            for i in range(writes_per_writer):
+                # Ler e depois escrever, como as rotas fazem (busca a tarefa, depois grava)
+                with engine.begin() as conn:
+                    conn.execute(text('SELECT COUNT(*) FROM task')).scalar()
+                    conn.execute(text('INSERT INTO task (title, status) VALUES (:t, :s)'),
+                                 {'t': f'writer {number} #{i}', 's': 'pendente'})
+                with engine.begin() as conn:
+                    conn.execute(text("UPDATE task SET status = 'concluida' WHERE title = :t"),
+                                 {'t': f'writer {number} #{i}'})
+        except OperationalError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM task WHERE status = 'concluida'")).scalar() \
+            == writers * writes_per_writer
+    engine.dispose()
@@ -0,0 +1,87 @@
+# tests/test_fragment_cache.py
+import re
+from fragment_cache import MemoryBackend, FileSystemBackend, FragmentCache
+
+TASK_SQL = re.compile(r'\btask\b')
+
+def test_second_visit_is_served_from_cache(client, logged_in_user_id, query_counter):
+    """A segunda visita reaproveita o fragmento renderizado, sem consultar tarefas."""
+    client.post('/tasks/new', data={'title': 'Tarefa em cache', 'status': 'pendente'})
+
+    first = client.get('/tasks')
+    assert first.headers['X-Fragment-Cache'] == 'miss'
+    second = client.get('/tasks')
+    assert second.headers['X-Fragment-Cache'] == 'hit'
+    assert 'Tarefa em cache' in second.data.decode('utf-8')
+    assert not [sql for sql in query_counter.last_statements if TASK_SQL.search(sql)]
+
+def test_write_invalidates_user_fragments(app, client, logged_in_user_id):
+    """Uma escrita descarta os fragmentos do usuário e a próxima visita mostra o dado novo."""
+    client.post('/tasks/new', data={'title': 'Primeira tarefa', 'status': 'pendente'}, follow_redirects=True)
+    client.get('/tasks')
+    client.get('/tasks?status=pendente')
+    backend = app.extensions['fragment_cache'].backend
+    assert len(backend) == 2
+
+    client.post('/tasks/new', data={'title': 'Segunda tarefa', 'status': 'pendente'})
+    assert len(backend) == 0
+
+    response = client.get('/tasks', follow_redirects=True)
+    assert 'Segunda tarefa' in response.data.decode('utf-8')
+
+def test_pagination_links_match_the_fragment_key(app, client, logged_in_user_id):
+    """Pedidos com a mesma chave (per_page inválido ou acima do limite) recebem os mesmos links."""
+    for i in range(3):
+        client.post('/tasks/new', data={'title': f'Tarefa {i}', 'status': 'pendente'})
+    app.config['TASKS_PER_PAGE'], app.config['TASKS_MAX_PER_PAGE'] = 1, 2
+
+    client.get('/tasks?per_page=abc')
+    response = client.get('/tasks')
+    assert response.headers['X-Fragment-Cache'] == 'hit'
+    assert 'per_page' not in response.data.decode('utf-8')
+
+    client.get('/tasks?per_page=500')
+    response = client.get('/tasks?per_page=2')
+    assert response.headers['X-Fragment-Cache'] == 'hit'
+    assert 'per_page=2&amp;' in response.data.decode('utf-8')
+
+def test_stats_endpoint(client, logged_in_user_id):
+    client.get('/tasks')
+    client.get('/tasks')
+    stats = client.get('/_stats/fragment-cache').get_json()
+    assert stats['backend'] == 'memory'
+    assert stats['hits'] >= 1 and stats['misses'] >= 1
+
+def test_memory_backend_lru_eviction():
+    cache = FragmentCache(MemoryBackend(max_entries=2))
+    cache.set(1, 'a', {'html': 'A'})
+    cache.set(1, 'b', {'html': 'B'})
+    assert cache.get(1, 'a') == {'html': 'A'} # 'a' passa a ser o mais recente
+    cache.set(2, 'c', {'html': 'C'})
+
+    assert cache.get(1, 'b') is None
+    assert cache.get(1, 'a') is not None and cache.get(2, 'c') is not None
+    assert cache.stats.evictions == 1
+
+    cache.invalidate_user(1)
+    assert cache.get(1, 'a') is None
+    assert cache.get(2, 'c') == {'html': 'C'}
+
+def test_filesystem_backend_is_shared_between_workers(tmp_path):
+    """Dois processos (aqui, duas instâncias) no mesmo diretório enxergam as mesmas entradas."""
+    worker_a = FragmentCache(FileSystemBackend(str(tmp_path)))
+    worker_b = FragmentCache(FileSystemBackend(str(tmp_path)))
+
+    worker_a.set(7, 'tasks:7:1', {'html': '<ul></ul>', 'has_tasks': False})
+    assert worker_b.get(7, 'tasks:7:1') == {'html': '<ul></ul>', 'has_tasks': False}
+
+    worker_b.invalidate_user(7)
+    assert worker_a.get(7, 'tasks:7:1') is None
+
+def test_filesystem_backend_evicts_oldest(tmp_path):
+    backend = FileSystemBackend(str(tmp_path), max_entries=50)
+    for i in range(100):
+        backend.set(i % 3, f'chave-{i}', {'html': str(i)})
+    remaining = sum(1 for _ in tmp_path.rglob('*.json'))
+    assert remaining == 50
+    assert backend.get(99 % 3, 'chave-99') == {'html': '99'}
@@ -0,0 +1,142 @@
+# tests/test_live.py
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from extensions import db
+from models import Task
+from live import MemoryBroker, SQLiteBroker
+
+def subscribe(app, user_id):
+    return app.extensions['live_broker'].subscribe(user_id)
+
+def drain(subscription):
+    events = []
+    while True:
+        item = subscription.get(timeout=0)
+        if item is None:
+            return events
+        events.append(item)
+
+def test_task_writes_publish_row_events(app, client, logged_in_user_id):
+    subscription = subscribe(app, logged_in_user_id)
+    try:
+        client.post('/tasks/new', data={'title': 'Tarefa ao vivo', 'status': 'pendente'})
+        [created] = drain(subscription)
+        assert created['type'] == 'upsert' and created['created'] is True
+        assert f'id="task-{created["task_id"]}"' in created['html'] and 'Tarefa ao vivo' in created['html']
+
+        task_id = created['task_id']
+        client.post(f'/tasks/{task_id}/complete')
+        [completed] = drain(subscription)
+        assert (completed['type'], completed['status'], completed['created']) == ('upsert', 'concluida', False)
+        assert 'Marcar como Pendente' in completed['html']
+
+        client.post('/tasks/bulk', data={'action': 'uncomplete', 'task_ids': [task_id]})
+        assert drain(subscription) == [{'type': 'refresh'}] # UPDATE em lote: a lista é recarregada
+
+        client.post(f'/tasks/{task_id}/delete')
+        assert drain(subscription) == [{'type': 'delete', 'task_id': task_id}]
+    finally:
+        subscription.close()
+
+def test_rollback_and_other_users_publish_nothing(app, client, logged_in_user_id):
+    subscription = subscribe(app, logged_in_user_id)
+    other = subscribe(app, logged_in_user_id + 1)
+    try:
+        with app.app_context():
+            db.session.add(Task(title='Nunca gravada', user_id=logged_in_user_id))
+            db.session.flush()
+            db.session.rollback()
+        client.post('/tasks/new', data={'title': 'Só minha', 'status': 'pendente'})
+        assert [item['type'] for item in drain(subscription)] == ['upsert']
+        assert drain(other) == []
+    finally:
+        subscription.close()
+        other.close()
+
+def test_full_queue_collapses_into_refresh():
+    broker = MemoryBroker(queue_size=3)
+    subscription = broker.subscribe(1)
+    broker.publish(1, [{'type': 'delete', 'task_id': n} for n in range(5)])
+    assert drain(subscription) == [{'type': 'refresh'}, {'type': 'delete', 'task_id': 4}]
+    subscription.close()
+    assert broker.subscriber_count() == 0 and not broker.wants(1)
+
+def test_sqlite_broker_delivers_across_processes(tmp_path):
+    """Dois brokers no mesmo arquivo fazem o papel de dois workers."""
+    path = str(tmp_path / 'eventos.db')
+    publisher = SQLiteBroker(path, poll_interval=0.01)
+    listener = SQLiteBroker(path, poll_interval=0.01)
+    subscription = listener.subscribe(7)
+    time.sleep(0.05) # A thread de leitura começa a partir dos eventos já existentes
+    publisher.publish(7, [{'type': 'delete', 'task_id': 1}])
+    publisher.publish(8, [{'type': 'delete', 'task_id': 2}])
+    assert subscription.get(timeout=5) == {'type': 'delete', 'task_id': 1}
+    assert subscription.get(timeout=0.1) is None
+    subscription.close()
+
+def test_sqlite_broker_only_publishes_for_users_someone_listens_to(tmp_path):
+    """A tabela de assinantes é compartilhada: um worker sabe quem ouve nos outros, até o prazo vencer."""
+    path = str(tmp_path / 'eventos.db')
+    publisher = SQLiteBroker(path, poll_interval=0.01, subscriber_ttl=0.2)
+    listener = SQLiteBroker(path, poll_interval=0.01, subscriber_ttl=0.2)
+    assert not publisher.wants(7)
+    subscription = listener.subscribe(7)
+    assert publisher.wants(7) and not publisher.wants(8)
+    time.sleep(0.5) # A thread de leitura renova o prazo enquanto a conexão durar
+    assert publisher.wants(7)
+    subscription.close()
+    assert not publisher.wants(7)
+
+    # Um worker que morreu sem avisar sai quando o prazo vence
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("INSERT INTO live_subscriber (token, user_id, expires_at) VALUES ('morto', 9, ?)",
+                     (time.time() + 0.05,))
+    conn.close()
+    assert publisher.wants(9)
+    time.sleep(0.1)
+    assert not publisher.wants(9)
+
+def test_sqlite_broker_deletes_old_events(tmp_path):
+    path = str(tmp_path / 'eventos.db')
+    broker = SQLiteBroker(path, retention=0.05)
+    broker.publish(7, [{'type': 'refresh'}])
+    time.sleep(0.1)
+    broker.publish(7, [{'type': 'delete', 'task_id': 1}]) # Quem publica também limpa
+    conn = sqlite3.connect(path)
+    assert [json.loads(row[0]) for row in conn.execute('SELECT payload FROM live_event')] == [
+        {'type': 'delete', 'task_id': 1}]
+    conn.close()
+
+def test_async_wait_is_woken_by_other_threads():
+    broker = MemoryBroker()
+    subscription = broker.subscribe(1)
+
+    async def wait():
+        assert await subscription.get_async(timeout=0.01) is None # Nada chegou: None, como get()
+        threading.Timer(0.05, broker.publish, (1, [{'type': 'refresh'}])).start()
+        return await subscription.get_async(timeout=5)
+
+    assert asyncio.run(wait()) == {'type': 'refresh'}
+    subscription.close()
+
+def test_stream_endpoint(app, client, logged_in_user_id):
+    assert client.get('/tasks').status_code == 200
+    response = client.get('/tasks/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    body = response.response
+    hello = next(body).decode('utf-8')
+    assert 'event: hello' in hello and json.loads(hello.split('data: ')[1])['version'] == 0
+    assert app.extensions['live_broker'].subscriber_count() == 1
+
+    client.post('/tasks/new', data={'title': 'Pelo stream', 'status': 'pendente'})
+    message = next(body).decode('utf-8')
+    assert message.startswith('event: upsert') and 'Pelo stream' in message
+    response.close() # O navegador desconectou: o assinante é removido
+    assert app.extensions['live_broker'].subscriber_count() == 0
+
+def test_stream_requires_login(client):
+    assert client.get('/tasks/stream').status_code == 302
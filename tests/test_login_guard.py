@@ -0,0 +1,123 @@
+# tests/test_login_guard.py
+import threading
+import pytest
+from werkzeug.security import generate_password_hash
+from extensions import db
+from models import User
+from tests.test_auth import register_user, login_user
+import login_guard
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return login_guard.MemoryLimitStore()
+    return login_guard.SQLiteLimitStore(str(tmp_path / 'limits.db'))
+
+def test_sliding_window(store):
+    for second in range(3):
+        assert store.hit('ip:1', 3, 60, 1000 + second) == 0
+    assert store.hit('ip:1', 3, 60, 1010) == 50 # A mais antiga sai da janela em 1060
+    assert store.retry_after('ip:1', 3, 60, 1059) == 1
+    assert store.hit('ip:2', 3, 60, 1010) == 0 # Outras chaves não são afetadas
+    assert store.hit('ip:1', 3, 60, 1060) == 0 # Janela deslizante: só a primeira saiu
+    assert store.hit('ip:1', 3, 60, 1060) == 1
+    store.reset('ip:1')
+    assert store.retry_after('ip:1', 3, 60, 1060) == 0
+
+def test_sqlite_store_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'limits.db')
+    first, second = login_guard.SQLiteLimitStore(path), login_guard.SQLiteLimitStore(path)
+    assert first.hit('account:a@example.com', 2, 60, 1000) == 0
+    assert second.hit('account:a@example.com', 2, 60, 1001) == 0
+    assert first.retry_after('account:a@example.com', 2, 60, 1002) == 58
+
+def test_memory_store_is_bounded():
+    store = login_guard.MemoryLimitStore(max_keys=2)
+    for key in ('ip:1', 'ip:2', 'ip:3'):
+        store.hit(key, 1, 60, 1000)
+    assert store.retry_after('ip:1', 1, 60, 1000) == 0 # A chave mais antiga foi descartada
+    assert store.retry_after('ip:3', 1, 60, 1000) == 60
+
+def test_account_locked_after_failures(client):
+    register_user(client, 'alvo', 'alvo@example.com', 'senha-certa')
+    for _ in range(5):
+        assert 'Login falhou' in login_user(client, 'alvo@example.com', 'errada').get_data(as_text=True)
+
+    response = client.post('/auth/login', data={'email': 'alvo@example.com', 'password': 'senha-certa'})
+    assert response.status_code == 429
+    assert 0 < int(response.headers['Retry-After']) <= 300
+    assert 'Muitas tentativas de login' in response.get_data(as_text=True)
+
+    register_user(client, 'outra', 'outra@example.com', 'senha-dela')
+    assert 'Login bem-sucedido!' in login_user(client, 'outra@example.com', 'senha-dela').get_data(as_text=True)
+
+def test_success_resets_account_failures(client):
+    register_user(client, 'distraido', 'distraido@example.com', 'senha-certa')
+    for _ in range(3):
+        for _ in range(4):
+            login_user(client, 'distraido@example.com', 'errada')
+        assert 'Login bem-sucedido!' in login_user(client, 'distraido@example.com', 'senha-certa').get_data(as_text=True)
+        client.get('/auth/logout')
+
+def test_ip_limit_rejects_before_database_and_hash(app, client, query_counter):
+    app.config['LOGIN_LIMIT_PER_IP'] = 3
+    for attempt in range(3):
+        client.post('/auth/login', data={'email': f'ninguem{attempt}@example.com', 'password': 'x'})
+    response = client.post('/auth/login', data={'email': 'mais.um@example.com', 'password': 'x'})
+    assert response.status_code == 429
+    assert query_counter.last == 0
+
+def test_rehash_when_method_changes(app, client):
+    with app.app_context():
+        user = User(username='antigo', email='antigo@example.com',
+                    password_hash=generate_password_hash('senha', 'pbkdf2:sha256:600'))
+        db.session.add(user)
+        db.session.commit()
+
+    assert 'Login bem-sucedido!' in login_user(client, 'antigo@example.com', 'senha').get_data(as_text=True)
+    with app.app_context():
+        stored = User.query.filter_by(email='antigo@example.com').one().password_hash
+    assert stored.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+
+    client.get('/auth/logout')
+    assert 'Login bem-sucedido!' in login_user(client, 'antigo@example.com', 'senha').get_data(as_text=True)
+    with app.app_context():
+        assert User.query.filter_by(email='antigo@example.com').one().password_hash == stored # Sem refazer
+
+@pytest.mark.parametrize('method, stored, expected', [
+    ('scrypt', 'scrypt:32768:8:1', False),
+    ('scrypt:32768:8:1', 'scrypt', False),
+    ('pbkdf2:sha256', 'pbkdf2:sha256:1000000', False),
+    ('pbkdf2', 'pbkdf2:sha256:1000000', False),
+    ('scrypt', 'scrypt:16384:8:1', True),
+    ('pbkdf2:sha256:1000', 'pbkdf2:sha256:600', True),
+    ('scrypt', 'pbkdf2:sha256:1000000', True),
+])
+def test_needs_rehash_compares_parameters_with_werkzeug_defaults(method, stored, expected):
+    assert login_guard.needs_rehash(f'{stored}$salt$hash', method) is expected
+
+def test_hashing_keeps_pending_changes_of_the_caller(app):
+    with app.app_context():
+        user = User(username='pendente', email='pendente@example.com', password_hash='x')
+        db.session.add(user)
+        login_guard.hash_password('senha') # Pendente: nada de rollback
+        db.session.flush()
+        login_guard.verify_password(user, 'senha') # Já no banco, mas sem commit
+        db.session.commit()
+    with app.app_context():
+        assert User.query.filter_by(email='pendente@example.com').count() == 1
+
+def test_saturated_hash_pool_answers_503(app, client):
+    register_user(client, 'ocupado', 'ocupado@example.com', 'senha')
+    pool = app.extensions['hash_pool'] = login_guard.HashPool(workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+    blocker = threading.Thread(target=pool.run, args=(lambda: (started.set(), release.wait()),))
+    blocker.start()
+    try:
+        started.wait(5)
+        response = client.post('/auth/login', data={'email': 'ocupado@example.com', 'password': 'senha'})
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+    finally:
+        release.set()
+        blocker.join()
+    assert 'Login bem-sucedido!' in login_user(client, 'ocupado@example.com', 'senha').get_data(as_text=True)
@@ -0,0 +1,82 @@
+# tests/test_migrations.py
+import sqlite3
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+from extensions import db
+import migrations
+from pagination import encode_cursor, NEXT, PREV
+
+# Esquema original (anterior aos índices), como criado pelo db.create_all() da primeira versão
+LEGACY_SCHEMA = """
+CREATE TABLE user (
+    id INTEGER NOT NULL, username VARCHAR(20) NOT NULL, email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(128), PRIMARY KEY (id), UNIQUE (username), UNIQUE (email)
+);
+CREATE TABLE task (
+    id INTEGER NOT NULL, title VARCHAR(100) NOT NULL, description TEXT, status VARCHAR(20) NOT NULL,
+    created_at DATETIME NOT NULL, due_date DATETIME, user_id INTEGER NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user (id)
+);
+INSERT INTO user (id, username, email, password_hash) VALUES (1, 'antigo', 'antigo@example.com', 'x');
+INSERT INTO task (title, status, created_at, user_id) VALUES ('Tarefa antiga', 'pendente', '2024-01-01 10:00:00', 1);
+"""
+
+def capture_list_queries(client, url):
+    """Captura o SQL (e os parâmetros) emitido pela rota de listagem."""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM task' in statement:
+            statements.append((statement, parameters))
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+    return engine, statements
+
+@pytest.mark.parametrize('status', ['all', 'pendente', 'concluida'])
+def test_list_query_uses_index(client, logged_in_user_id, status):
+    """EXPLAIN QUERY PLAN da listagem não pode ter varredura completa nem ordenação em B-tree temporário."""
+    client.post('/tasks/new', data={'title': 'Tarefa indexada', 'status': 'pendente'})
+    edge = datetime(2025, 1, 1)
+    urls = [
+        f'/tasks?status={status}',
+        f'/tasks?status={status}&cursor={encode_cursor(edge, 10, NEXT)}',
+        f'/tasks?status={status}&cursor={encode_cursor(edge, 10, PREV)}',
+    ]
+
+    for url in urls:
+        engine, statements = capture_list_queries(client, url)
+        assert len(statements) == 1
+        statement, parameters = statements[0]
+        with engine.connect() as conn:
+            plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+        assert any('USING INDEX ix_task_user' in step for step in plan), plan
+        assert not any(step.startswith('SCAN task') for step in plan), plan
+        assert not any('TEMP B-TREE' in step for step in plan), plan
+
+def test_upgrade_legacy_database_keeps_data(app, tmp_path):
+    """A migração cria os índices num banco antigo sem perder linhas e pode ser repetida."""
+    path = tmp_path / 'legacy.db'
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+
+    engine = create_engine(f'sqlite:///{path}')
+    with app.app_context():
+        applied = migrations.upgrade(engine)
+        assert [m.version for m in applied] == [m.version for m in migrations.MIGRATIONS]
+        assert migrations.upgrade(engine) == []
+
+    index_names = {index['name'] for index in inspect(engine).get_indexes('task')}
+    assert {'ix_task_user_status_created', 'ix_task_user_created', 'ix_task_user_due'} <= index_names
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT title FROM task')).scalars().all() == ['Tarefa antiga']
+        assert conn.execute(text('SELECT username FROM user')).scalars().all() == ['antigo']
+        # Os contadores do painel são preenchidos a partir das tarefas que já existiam
+        assert conn.execute(text('SELECT user_id, pending, completed, archived FROM task_stats')).all() == [(1, 1, 0, 0)]
+    engine.dispose()
@@ -0,0 +1,91 @@
+# tests/test_profiling.py
+import json
+import logging
+import pstats
+import re
+import pytest
+from extensions import db
+from app import create_app
+import profiling
+from profiling import aggregate, read_log
+
+TIMING_RE = re.compile(r'(\w+);dur=([\d.]+)')
+
+@pytest.fixture
+def profiling_enabled(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'PROFILING_ENABLED', True)
+
+def timings(response):
+    return {name: float(value) for name, value in TIMING_RE.findall(response.headers['Server-Timing'])}
+
+def test_disabled_by_default(client, logged_in_user_id):
+    assert 'Server-Timing' not in client.get('/tasks').headers
+
+def test_server_timing_reports_sql_and_templates(client, logged_in_user_id, profiling_enabled, query_counter):
+    client.post('/tasks/new', data={'title': 'Tarefa medida', 'status': 'pendente'})
+    response = client.get('/tasks')
+    header = response.headers['Server-Timing']
+    assert f'desc="{query_counter.last} consultas"' in header
+    values = timings(response)
+    assert values['tpl'] > 0
+    assert values['total'] >= values['db'] + values['tpl']
+
+def test_login_measures_password_hash(client, profiling_enabled):
+    client.post('/auth/register', data={'username': 'medido', 'email': 'medido@example.com',
+                                        'password': 'senha', 'confirm_password': 'senha'})
+    response = client.post('/auth/login', data={'email': 'medido@example.com', 'password': 'senha'})
+    assert response.status_code == 302
+    assert timings(response)['hash'] > 0
+
+def test_structured_log_line(client, logged_in_user_id, profiling_enabled, caplog):
+    with caplog.at_level(logging.INFO, logger='profiling'):
+        client.get('/tasks?status=pendente')
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record['endpoint'] == 'tasks.list_tasks'
+    assert record['status'] == 200
+    # Qual consulta é a mais lenta varia de uma execução para outra; basta que seja uma delas
+    assert record['db_count'] >= 1 and record['db_slowest_sql'].startswith('SELECT')
+
+def test_log_lines_are_emitted_once_with_or_without_a_file(monkeypatch, tmp_path):
+    """Sem PROFILING_LOG_FILE as linhas não somem; várias chamadas a create_app não duplicam handlers."""
+    monkeypatch.setattr(profiling.logger, 'handlers', [])
+    monkeypatch.setattr(profiling.logger, 'level', logging.NOTSET)
+    create_app('testing')
+    assert profiling.logger.isEnabledFor(logging.INFO) and len(profiling.logger.handlers) == 1
+
+    monkeypatch.setattr(profiling.logger, 'handlers', [])
+    log = tmp_path / 'profiling.log'
+    apps = [create_app('testing', PROFILING_ENABLED=True, PROFILING_LOG_FILE=str(log)) for _ in range(2)]
+    with apps[1].app_context():
+        db.create_all()
+    apps[1].test_client().get('/auth/login')
+    for handler in profiling.logger.handlers:
+        handler.close()
+    assert len(profiling.logger.handlers) == 1
+    assert [record['endpoint'] for record in read_log(log.read_text(encoding='utf-8').splitlines())] == ['auth.login']
+
+def test_slow_sampled_requests_dump_profiles(app, client, logged_in_user_id, profiling_enabled, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'PROFILING_SAMPLE_RATE', 1.0)
+    monkeypatch.setitem(app.config, 'PROFILING_SLOW_MS', 0)
+    monkeypatch.setitem(app.config, 'PROFILING_DIR', str(tmp_path))
+    client.get('/tasks')
+    dumps = list(tmp_path.glob('*-tasks.list_tasks-*ms.prof'))
+    assert len(dumps) == 1
+    assert pstats.Stats(str(dumps[0])).total_calls > 0
+
+    monkeypatch.setitem(app.config, 'PROFILING_SLOW_MS', 60000) # Abaixo do limite: nada é gravado
+    client.get('/tasks')
+    assert len(list(tmp_path.glob('*.prof'))) == 1
+
+def test_profile_report_aggregates_slowest_routes(app, tmp_path):
+    lines = [json.dumps({'endpoint': endpoint, 'path': '/', 'total_ms': total, 'db_ms': 1.0, 'db_count': 2,
+                         'db_slowest_ms': 0.5, 'db_slowest_sql': 'SELECT 1', 'tpl_ms': 0.2})
+             for endpoint, total in [('tasks.list_tasks', 5.0), ('auth.login', 90.0), ('tasks.list_tasks', 7.0)]]
+    log = tmp_path / 'profiling.log'
+    log.write_text('INFO profiling ' + '\nlinha sem json\n'.join(lines) + '\n', encoding='utf-8')
+
+    rows = aggregate(read_log(log.read_text(encoding='utf-8').splitlines()))
+    assert [(row['endpoint'], row['requests']) for row in rows] == [('auth.login', 1), ('tasks.list_tasks', 2)]
+
+    result = app.test_cli_runner().invoke(args=['profile-report', str(log), '--top', '1'])
+    assert 'auth.login' in result.output and 'tasks.list_tasks' not in result.output
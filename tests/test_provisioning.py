@@ -0,0 +1,117 @@
+# tests/test_provisioning.py
+import json
+import pytest
+from sqlalchemy import select
+from extensions import db
+from models import User
+from tests.test_auth import login_user
+import migrations
+import provisioning
+import sharding
+
+CSV = '''username,email,password
+ana,ana@example.com,senha-ana
+bruno,bruno@example.com,senha-bruno
+x,email-invalido,senha
+ana,outra-ana@example.com,senha
+carla,carla@example.com,senha-carla
+existente,existente@example.com,senha
+'''
+
+@pytest.fixture
+def users_csv(app, tmp_path):
+    with app.app_context():
+        user = User(username='existente', email='existente@example.com')
+        user.set_password('original')
+        db.session.add(user)
+        db.session.commit()
+    path = tmp_path / 'usuarios.csv'
+    path.write_text(CSV, encoding='utf-8')
+    return path
+
+def provision(app, path, *args):
+    return app.test_cli_runner().invoke(args=['provision-users', str(path), '--workers', '1', *args])
+
+def report_lines(path):
+    with open(f'{path}.errors.ndjson', encoding='utf-8') as report:
+        return [json.loads(line) for line in report]
+
+def usernames(app):
+    with app.app_context():
+        return sorted(db.session.scalars(select(User.username)))
+
+def test_provision_users_from_csv(app, client, users_csv):
+    result = provision(app, users_csv, '--batch-size', '10')
+    assert result.exit_code == 0, result.output
+    assert '3 usuários cadastrados, 3 linhas com erro.' in result.output
+    assert usernames(app) == ['ana', 'bruno', 'carla', 'existente']
+
+    errors = {entry['line']: entry['errors'] for entry in report_lines(users_csv)}
+    assert set(errors) == {4, 5, 7}
+    assert 'email' in errors[4] and 'username' in errors[4]
+    assert errors[5] == {'username': [provisioning.USERNAME_TAKEN]} # Repetido no próprio arquivo
+    assert errors[7] == {'username': [provisioning.USERNAME_TAKEN], 'email': [provisioning.EMAIL_TAKEN]}
+    assert not (users_csv.parent / 'usuarios.csv.progress.json').exists()
+
+    assert 'Login bem-sucedido!' in login_user(client, 'bruno@example.com', 'senha-bruno').get_data(as_text=True)
+
+    # Rodar de novo não duplica ninguém
+    result = provision(app, users_csv)
+    assert '0 usuários cadastrados, 6 linhas com erro.' in result.output
+    assert usernames(app) == ['ana', 'bruno', 'carla', 'existente']
+
+def test_resumes_from_the_checkpoint(app, users_csv, monkeypatch):
+    inserted = []
+    original_insert = provisioning.Provisioner.insert
+
+    def insert_then_crash(self, batch, rows):
+        if inserted:
+            raise KeyboardInterrupt() # Interrompido no segundo lote
+        original_insert(self, batch, rows)
+        inserted.append(len(rows))
+
+    monkeypatch.setattr(provisioning.Provisioner, 'insert', insert_then_crash)
+    assert provision(app, users_csv, '--batch-size', '2').exit_code != 0
+    assert usernames(app) == ['ana', 'bruno', 'existente']
+    with open(f'{users_csv}.progress.json', encoding='utf-8') as checkpoint:
+        assert json.load(checkpoint)['line'] == 3
+
+    monkeypatch.setattr(provisioning.Provisioner, 'insert', original_insert)
+    result = provision(app, users_csv, '--batch-size', '2')
+    assert '3 usuários cadastrados, 3 linhas com erro.' in result.output
+    assert usernames(app) == ['ana', 'bruno', 'carla', 'existente']
+    assert sorted(entry['line'] for entry in report_lines(users_csv)) == [4, 5, 7]
+
+def test_conflict_after_the_check_falls_back_to_one_row_at_a_time(app, users_csv, monkeypatch):
+    monkeypatch.setattr(provisioning, 'taken', lambda usernames, emails: (set(), set()))
+    result = provision(app, users_csv, '--batch-size', '10')
+    assert '3 usuários cadastrados' in result.output
+    assert usernames(app) == ['ana', 'bruno', 'carla', 'existente']
+
+def test_hashes_in_a_process_pool(app, tmp_path):
+    path = tmp_path / 'usuarios.ndjson'
+    path.write_text(''.join(json.dumps({'username': f'pool{i}', 'email': f'pool{i}@example.com', 'password': f'senha{i}'})
+                            + '\n' for i in range(6)), encoding='utf-8')
+    result = app.test_cli_runner().invoke(args=['provision-users', str(path), '--workers', '2'])
+    assert '6 usuários cadastrados, 0 linhas com erro.' in result.output
+    with app.app_context():
+        user = db.session.scalars(select(User).filter_by(username='pool4')).one()
+        assert user.check_password('senha4')
+
+def test_places_users_in_their_shards(tmp_path):
+    from app import create_app
+    sharded = create_app('testing', SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'catalog.db'}", SHARD_COUNT=2,
+                         SHARD_DATABASE_URL=f"sqlite:///{tmp_path / 'shard-{shard}.db'}")
+    with sharded.app_context():
+        migrations.upgrade_all()
+    path = tmp_path / 'usuarios.ndjson'
+    path.write_text(''.join(json.dumps({'username': f'shard{i}', 'email': f'shard{i}@example.com', 'password': 'senha'})
+                            + '\n' for i in range(8)), encoding='utf-8')
+    assert provision(sharded, path).exit_code == 0
+    with sharded.app_context():
+        placed = db.session.execute(select(User.id, User.shard)).all()
+        assert len(placed) == 8 and {shard for _, shard in placed} == {0, 1}
+        assert all(shard == sharding.home_shard(user_id, 2) for user_id, shard in placed)
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
@@ -0,0 +1,165 @@
+# tests/test_reminders.py
+import json
+import time
+from datetime import datetime, timedelta
+import pytest
+from extensions import db
+from models import Task, TaskReminder
+import reminders
+
+NOW = datetime(2025, 3, 10, 9, 30)
+TODAY = datetime(2025, 3, 10)
+
+class ListSink:
+    def __init__(self, fail_ids=()):
+        self.sent = []
+        self.fail_ids = set(fail_ids)
+
+    def send(self, reminder):
+        if reminder['id'] in self.fail_ids:
+            raise RuntimeError('destino indisponível')
+        self.sent.append(reminder)
+
+def add_task(app, user_id, title, due_date, status='pendente'):
+    with app.app_context():
+        task = Task(title=title, user_id=user_id, due_date=due_date, status=status)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+def reminder_states(app):
+    with app.app_context():
+        return sorted((r.task_id, r.kind, r.state) for r in TaskReminder.query)
+
+def run(app, sink, now=NOW, worker='w1'):
+    with app.app_context():
+        reminders.scan(app.config, now)
+        return reminders.dispatch(sink, app.config, worker=worker, now=now)
+
+def test_scan_finds_overdue_and_due_soon_pending_tasks(app, logged_in_user_id):
+    overdue = add_task(app, logged_in_user_id, 'Venceu ontem', TODAY - timedelta(days=1))
+    today = add_task(app, logged_in_user_id, 'Vence hoje', TODAY)
+    tomorrow = add_task(app, logged_in_user_id, 'Vence amanhã', TODAY + timedelta(days=1))
+    add_task(app, logged_in_user_id, 'Vence semana que vem', TODAY + timedelta(days=7))
+    add_task(app, logged_in_user_id, 'Venceu há muito tempo', TODAY - timedelta(days=30))
+    add_task(app, logged_in_user_id, 'Já concluída', TODAY - timedelta(days=1), status='concluida')
+    add_task(app, logged_in_user_id, 'Sem prazo', None)
+
+    sink = ListSink()
+    assert run(app, sink) == (3, 0)
+    assert sorted((r['task_id'], r['kind']) for r in sink.sent) == [
+        (overdue, 'overdue'), (today, 'due_soon'), (tomorrow, 'due_soon')]
+    assert sink.sent[0]['due_date'] in ('2025-03-09', '2025-03-10', '2025-03-11')
+
+def test_runs_are_idempotent(app, logged_in_user_id):
+    add_task(app, logged_in_user_id, 'Venceu ontem', TODAY - timedelta(days=1))
+    sink = ListSink()
+    run(app, sink)
+    run(app, sink)
+    run(app, sink, now=NOW + timedelta(hours=5))
+    assert len(sink.sent) == 1
+    with app.app_context():
+        assert TaskReminder.query.count() == 1
+
+def test_overdue_follows_due_soon_and_rescheduling_creates_new_reminder(app, logged_in_user_id):
+    task_id = add_task(app, logged_in_user_id, 'Vence amanhã', TODAY + timedelta(days=1))
+    sink = ListSink()
+    run(app, sink)
+    run(app, sink, now=NOW + timedelta(days=2)) # Passou do prazo
+    assert [r['kind'] for r in sink.sent] == ['due_soon', 'overdue']
+
+    with app.app_context():
+        db.session.get(Task, task_id).due_date = TODAY + timedelta(days=3)
+        db.session.commit()
+    run(app, sink, now=NOW + timedelta(days=3))
+    assert [r['kind'] for r in sink.sent] == ['due_soon', 'overdue', 'due_soon']
+
+def test_completed_after_scan_is_skipped(app, logged_in_user_id):
+    task_id = add_task(app, logged_in_user_id, 'Vence hoje', TODAY)
+    with app.app_context():
+        reminders.scan(app.config, NOW)
+        db.session.get(Task, task_id).status = 'concluida'
+        db.session.commit()
+        sink = ListSink()
+        assert reminders.dispatch(sink, app.config, worker='w1', now=NOW) == (0, 1)
+    assert sink.sent == []
+    assert reminder_states(app) == [(task_id, 'due_soon', 'skipped')]
+
+def test_deleting_tasks_deletes_their_reminders(app, client, logged_in_user_id):
+    """Sem PRAGMA foreign_keys o CASCADE não age: cada exclusão apaga os lembretes explicitamente."""
+    ids = [add_task(app, logged_in_user_id, f'Vence hoje {i}', TODAY) for i in range(4)]
+    kept = add_task(app, logged_in_user_id, 'Continua', TODAY)
+    with app.app_context():
+        reminders.scan(app.config, NOW)
+    client.post(f'/tasks/{ids[0]}/delete')
+    client.delete(f'/api/v1/tasks/{ids[1]}')
+    client.post('/tasks/bulk', data={'action': 'delete', 'task_ids': ids[2:]})
+    assert reminder_states(app) == [(kept, 'due_soon', 'queued')]
+
+def test_workers_never_claim_the_same_reminders(app, logged_in_user_id, monkeypatch):
+    monkeypatch.setitem(app.config, 'REMINDER_BATCH_SIZE', 2)
+    for day in range(5):
+        add_task(app, logged_in_user_id, f'Vencida {day}', TODAY - timedelta(days=day + 1))
+    with app.app_context():
+        reminders.scan(app.config, NOW)
+        first = reminders.claim('w1', NOW, app.config)
+        second = reminders.claim('w2', NOW, app.config)
+        third = reminders.claim('w3', NOW, app.config)
+        claimed = [row[0].id for row in first + second + third]
+    assert len(first) == len(second) == 2 and len(third) == 1
+    assert len(set(claimed)) == 5
+
+def test_crashed_worker_claims_expire_and_are_resumed(app, logged_in_user_id):
+    add_task(app, logged_in_user_id, 'Vence hoje', TODAY)
+    with app.app_context():
+        reminders.scan(app.config, NOW)
+        assert len(reminders.claim('caiu', NOW, app.config)) == 1 # Reservou e "caiu" sem enviar
+
+        sink = ListSink()
+        assert reminders.dispatch(sink, app.config, worker='w2', now=NOW + timedelta(seconds=10)) == (0, 0)
+        later = NOW + timedelta(seconds=app.config['REMINDER_CLAIM_TIMEOUT'] + 1)
+        assert reminders.dispatch(sink, app.config, worker='w2', now=later) == (1, 0)
+    assert len(sink.sent) == 1
+
+def test_failed_send_stays_queued(app, logged_in_user_id):
+    add_task(app, logged_in_user_id, 'Vence hoje', TODAY)
+    add_task(app, logged_in_user_id, 'Vence amanhã', TODAY + timedelta(days=1))
+    with app.app_context():
+        reminders.scan(app.config, NOW)
+        first_id = min(r.id for r in TaskReminder.query)
+    assert run(app, ListSink(fail_ids={first_id})) == (1, 0)
+    assert sorted(state for *_, state in reminder_states(app)) == ['queued', 'sent']
+
+def test_file_sink_and_cli(app, logged_in_user_id, tmp_path, monkeypatch):
+    path = tmp_path / 'lembretes.ndjson'
+    monkeypatch.setitem(app.extensions, 'reminder_sink', reminders.FileSink(str(path)))
+    add_task(app, logged_in_user_id, 'Vence hoje', datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0))
+
+    result = app.test_cli_runner().invoke(args=['send-reminders'])
+    assert '1 lembretes enviados' in result.output
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [(line['kind'], line['title']) for line in lines] == [('due_soon', 'Vence hoje')]
+
+def test_background_scheduler(app, logged_in_user_id, monkeypatch):
+    sink = ListSink()
+    monkeypatch.setitem(app.extensions, 'reminder_sink', sink)
+    add_task(app, logged_in_user_id, 'Venceu ontem', datetime.utcnow() - timedelta(days=1))
+
+    scheduler = reminders.ReminderScheduler(app, interval=0.01).start()
+    try:
+        deadline = time.monotonic() + 5
+        while not sink.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        scheduler.stop(timeout=5)
+    assert [r['kind'] for r in sink.sent] == ['overdue']
+
+@pytest.mark.parametrize('kind', [reminders.OVERDUE, reminders.DUE_SOON])
+def test_scan_uses_due_date_index(app, kind):
+    _, start, end = next(w for w in reminders.scan_windows(app.config, NOW) if w[0] == kind)
+    with app.app_context():
+        plan = [row[-1] for row in db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT id, user_id, due_date FROM task WHERE status = 'pendente' "
+            "AND due_date >= :start AND due_date < :end ORDER BY due_date, id LIMIT 500"),
+            {'start': start, 'end': end})]
+    assert any('USING INDEX ix_task_status_due' in step for step in plan), plan
@@ -0,0 +1,118 @@
+# tests/test_replicas.py
+import pytest
+from flask import request
+from sqlalchemy import event, select
+from app import create_app
+from extensions import db
+from models import DataVersion
+from tests.test_auth import register_user, login_user
+import migrations
+import replicas
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """Banco principal e uma réplica em arquivos SQLite; a réplica só muda com sync_replicas()."""
+    flask_app = create_app('testing', SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+                           REPLICA_DATABASE_URLS=[f"sqlite:///{tmp_path / 'replica.db'}"])
+    with flask_app.app_context():
+        migrations.upgrade()
+    client = flask_app.test_client()
+    register_user(client, 'replicado', 'replicado@example.com', 'senha123')
+    login_user(client, 'replicado@example.com', 'senha123')
+    sync(flask_app)
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+@pytest.fixture
+def statements(replica_app):
+    """Instruções SQL executadas em cada engine: {'primary': [...], 'replica': [...]}."""
+    seen = {'primary': [], 'replica': []}
+    with replica_app.app_context():
+        engines = {'primary': db.engine, 'replica': db.engines[replicas.bind_key(0)]}
+    listeners = []
+    for name, engine in engines.items():
+        listener = lambda conn, cursor, statement, *args, name=name: seen[name].append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        listeners.append((engine, listener))
+    yield seen
+    for engine, listener in listeners:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+def sync(app):
+    with app.app_context():
+        replicas.sync_replicas()
+
+def expire_stickiness(client):
+    with client.session_transaction() as flask_session:
+        flask_session.pop(replicas.STICKY_KEY, None)
+
+def clear(statements):
+    for seen in statements.values():
+        seen.clear()
+
+def test_no_replicas_configured(app):
+    assert 'replica_router' not in app.extensions
+    result = app.test_cli_runner().invoke(args=['sync-replicas'])
+    assert result.exit_code != 0
+
+def test_read_only_views_read_from_the_replica(replica_app, statements):
+    client = replica_app.test_client()
+    login_user(client, 'replicado@example.com', 'senha123')
+    expire_stickiness(client)
+    clear(statements)
+    for url in ('/', '/tasks', '/tasks/search?q=nada', '/api/v1/tasks', '/tasks/export'):
+        assert client.get(url).status_code == 200, url
+    assert statements['replica'] and not statements['primary']
+
+def test_writes_and_other_views_use_the_primary(replica_app, statements):
+    client = replica_app.test_client()
+    login_user(client, 'replicado@example.com', 'senha123')
+    expire_stickiness(client)
+    clear(statements)
+    client.get('/tasks/new') # GET sem @replica_reads
+    client.post('/tasks/new', data={'title': 'Tarefa nova', 'status': 'pendente'})
+    assert statements['primary'] and not statements['replica']
+
+def test_reads_after_a_write_stick_to_the_primary(replica_app, statements):
+    client = replica_app.test_client()
+    login_user(client, 'replicado@example.com', 'senha123')
+    expire_stickiness(client)
+    client.post('/tasks/new', data={'title': 'Escrita agora', 'status': 'pendente'})
+    clear(statements)
+    # A réplica ainda não tem a tarefa, mas quem escreveu a vê na hora
+    assert 'Escrita agora' in client.get('/tasks').data.decode('utf-8')
+    assert statements['primary'] and not statements['replica']
+
+    # Passado o prazo, a leitura volta para a réplica, atrasada até a próxima cópia
+    expire_stickiness(client)
+    assert 'Escrita agora' not in client.get('/tasks').data.decode('utf-8')
+    sync(replica_app)
+    assert 'Escrita agora' in client.get('/tasks').data.decode('utf-8')
+
+def test_other_clients_are_not_sticky(replica_app, statements):
+    writer, reader = replica_app.test_client(), replica_app.test_client()
+    for client in (writer, reader):
+        login_user(client, 'replicado@example.com', 'senha123')
+        expire_stickiness(client)
+    writer.post('/tasks/new', data={'title': 'Do outro navegador', 'status': 'pendente'})
+    clear(statements)
+    reader.get('/tasks')
+    assert statements['replica'] and not statements['primary']
+
+def test_write_inside_a_read_only_request_goes_to_the_primary(replica_app):
+    with replica_app.test_request_context('/tasks'):
+        request.endpoint # Força o roteamento da URL
+        replica_app.preprocess_request()
+        assert db.session.get(DataVersion, 1) is None
+        assert db.session.info['replica'] is not None
+        db.session.add(DataVersion(user_id=1, version=42))
+        db.session.commit()
+        # Depois da escrita, a própria requisição lê do primário
+        assert db.session.get(DataVersion, 1).version == 42
+        assert db.session.info.get('wrote')
+        assert 'flushing' not in db.session.info # Marcado só enquanto o flush roda
+    with replica_app.app_context(), db.engines[replicas.bind_key(0)].connect() as conn:
+        assert conn.execute(select(DataVersion.version)).all() == []
@@ -0,0 +1,82 @@
+# tests/test_search.py
+import re
+from extensions import db
+from models import User, Task
+from search import build_match_query
+
+def create_task(client, title, description=''):
+    response = client.post('/tasks/new', data={'title': title, 'description': description, 'status': 'pendente'})
+    assert response.status_code == 302
+
+def found_titles(response):
+    assert response.status_code == 200
+    return re.findall(r'<h3><a href="/tasks/\d+">([^<]+)</a></h3>', response.data.decode('utf-8'))
+
+def test_search_matches_title_and_description(client, logged_in_user_id):
+    create_task(client, 'Relatório mensal', 'Enviar para a diretoria')
+    create_task(client, 'Comprar café', 'Passar no mercado e levar o relatório')
+    create_task(client, 'Revisar código', 'Pull request do backend')
+
+    # Sem acento e por prefixo; o acerto no título vem antes do acerto na descrição
+    assert found_titles(client.get('/tasks/search?q=relatorio')) == ['Relatório mensal', 'Comprar café']
+    assert found_titles(client.get('/tasks/search?q=merc')) == ['Comprar café']
+    assert found_titles(client.get('/tasks/search?q=relatorio diretoria')) == ['Relatório mensal']
+
+def test_search_is_scoped_to_current_user(app, client, logged_in_user_id):
+    with app.app_context():
+        other = User(username='outro', email='outro@example.com')
+        other.set_password('senha')
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(Task(title='Planejar viagem', user_id=other.id))
+        db.session.commit()
+    create_task(client, 'Planejar reunião')
+
+    assert found_titles(client.get('/tasks/search?q=planejar')) == ['Planejar reunião']
+
+def test_index_follows_edits_and_deletes(app, client, logged_in_user_id):
+    create_task(client, 'Pagar boleto')
+    with app.app_context():
+        task_id = Task.query.filter_by(title='Pagar boleto').one().id
+
+    client.post(f'/tasks/{task_id}/edit', data={'title': 'Pagar aluguel', 'status': 'pendente'})
+    assert found_titles(client.get('/tasks/search?q=boleto')) == []
+    assert found_titles(client.get('/tasks/search?q=aluguel')) == ['Pagar aluguel']
+
+    client.post('/tasks/bulk', data={'action': 'delete', 'task_ids': [task_id]})
+    assert found_titles(client.get('/tasks/search?q=aluguel')) == []
+
+def test_search_pagination(client, logged_in_user_id):
+    for i in range(5):
+        create_task(client, f'Estudar capítulo {i}')
+
+    first = client.get('/tasks/search?q=estudar&per_page=2')
+    assert len(found_titles(first)) == 2
+    assert 'page=2' in first.data.decode('utf-8')
+    last = client.get('/tasks/search?q=estudar&per_page=2&page=3')
+    assert len(found_titles(last)) == 1
+    assert 'Próximas' not in last.data.decode('utf-8')
+
+def test_operators_and_symbols_are_not_passed_to_fts(client, logged_in_user_id):
+    create_task(client, 'Tarefa qualquer')
+    for q in ['"', 'NEAR(', 'a OR b*', '***', '-tarefa']:
+        assert client.get('/tasks/search', query_string={'q': q}).status_code == 200
+    assert build_match_query('a OR "b" (c*)') == '"a"* "OR"* "b"* "c"*'
+    assert build_match_query('!!!') is None
+
+def test_rebuild_command_indexes_existing_rows(app, client, logged_in_user_id):
+    create_task(client, 'Tarefa importada')
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO task_fts(task_fts) VALUES ('delete-all')")
+    assert found_titles(client.get('/tasks/search?q=importada')) == []
+
+    result = app.test_cli_runner().invoke(args=['rebuild-search'])
+    assert 'reconstruído: 1 tarefas' in result.output
+    assert found_titles(client.get('/tasks/search?q=importada')) == ['Tarefa importada']
+
+def test_search_query_uses_fts_index(client, logged_in_user_id, query_counter):
+    create_task(client, 'Tarefa indexada')
+    client.get('/tasks/search?q=indexada')
+    statement = next(sql for sql in query_counter.last_statements if 'task_fts' in sql)
+    assert 'MATCH' in statement and 'LIKE' not in statement
@@ -0,0 +1,159 @@
+# tests/test_sharding.py
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func, select
+from app import create_app
+from extensions import db
+from models import ArchivedTask, DataVersion, Task, TaskReminder, User
+from tests.test_auth import register_user, login_user
+import archive
+import migrations
+import reminders
+import sharding
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+@pytest.fixture
+def sharded_app():
+    """Aplicação com 3 shards, cada um num banco SQLite em memória próprio."""
+    flask_app = create_app('testing', SHARD_COUNT=3, SHARD_DATABASE_URL='sqlite://')
+    with flask_app.app_context():
+        migrations.upgrade_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+def add_user(app, n):
+    with app.app_context():
+        user = User(username=f'usuario{n}', email=f'usuario{n}@example.com')
+        user.set_password('senha123')
+        db.session.add(user)
+        db.session.commit()
+        return user.id, user.shard
+
+def add_task(app, user_id, shard, title, **values):
+    with app.app_context(), sharding.use_shard(shard):
+        task = Task(title=title, user_id=user_id, **values)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+def count_rows(app, model, shard, user_id):
+    with app.app_context():
+        engine = sharding.get_router().engine(shard)
+        with engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(model.__table__)
+                                .where(model.__table__.c.user_id == user_id)).scalar()
+
+def test_home_shard_is_stable_and_spreads_users():
+    assert [sharding.home_shard(user_id, 3) for user_id in (1, 2, 7, 8)] == [2, 1, 0, 2]
+    assert {sharding.home_shard(user_id, 4) for user_id in range(1, 100)} == {0, 1, 2, 3}
+
+def test_single_shard_keeps_one_database(app):
+    assert 'shard_router' not in app.extensions
+    with app.app_context():
+        assert sharding.shard_engines() == [(0, db.engine)]
+    result = app.test_cli_runner().invoke(args=['rebalance-shards'])
+    assert result.exit_code != 0
+    assert 'SHARD_COUNT=1' in result.output
+
+def test_requests_write_to_the_users_shard(sharded_app):
+    client = sharded_app.test_client()
+    register_user(client, 'usuario1', 'usuario1@example.com', 'senha123')
+    with sharded_app.app_context():
+        user = User.query.filter_by(username='usuario1').one()
+        assert user.shard == sharding.home_shard(user.id, 3)
+        user_id, shard = user.id, user.shard
+
+    login_user(client, 'usuario1@example.com', 'senha123')
+    client.post('/tasks/new', data={'title': 'Tarefa no shard', 'status': 'pendente'})
+    assert 'Tarefa no shard' in client.get('/tasks').data.decode('utf-8')
+    assert count_rows(sharded_app, Task, shard, user_id) == 1
+    assert count_rows(sharded_app, DataVersion, shard, user_id) == 1
+    for other in {0, 1, 2} - {shard}:
+        assert count_rows(sharded_app, Task, other, user_id) == 0
+
+def test_task_queries_need_a_shard_outside_requests(sharded_app):
+    user_id, shard = add_user(sharded_app, 1)
+    add_task(sharded_app, user_id, shard, 'Tarefa')
+    with sharded_app.app_context():
+        with pytest.raises(sharding.ShardNotSelected):
+            Task.query.all()
+        db.session.rollback()
+        assert db.session.get(User, user_id).username == 'usuario1' # O catálogo não depende do shard
+        counts = {}
+        for current in sharding.each_shard():
+            counts[current] = Task.query.count()
+    assert counts == {0: 0, 1: 0, 2: 0, shard: 1}
+
+def test_rebalance_moves_rows_and_renumbers_tasks(sharded_app):
+    user_id, source = add_user(sharded_app, 1)
+    other_id, _ = add_user(sharded_app, 7) # Ocupa os ids baixos do destino
+    target = (source + 1) % 3
+    add_task(sharded_app, other_id, target, 'Tarefa de outro usuário')
+    task_id = add_task(sharded_app, user_id, source, 'Com lembrete', due_date=NOW)
+    add_task(sharded_app, user_id, source, 'Concluída', status='concluida')
+    with sharded_app.app_context(), sharding.use_shard(source):
+        db.session.add(TaskReminder(task_id=task_id, user_id=user_id, kind='overdue', due_date=NOW))
+        db.session.add(ArchivedTask(task_id=99, user_id=user_id, title='Antiga', status='concluida', created_at=NOW))
+        db.session.add(DataVersion(user_id=user_id, version=5))
+        db.session.commit()
+
+    result = sharded_app.test_cli_runner().invoke(
+        args=['rebalance-shards', '--user', str(user_id), '--to', str(target), '--no-wait'])
+    assert result.exit_code == 0, result.output
+    assert f'shard {source} -> {target} (2 tarefas, 1 arquivadas)' in result.output
+
+    with sharded_app.app_context():
+        assert db.session.get(User, user_id).shard == target
+        with sharding.use_shard(target):
+            moved = Task.query.filter_by(user_id=user_id, title='Com lembrete').one()
+            assert moved.id != task_id
+            assert TaskReminder.query.filter_by(user_id=user_id).one().task_id == moved.id
+            assert db.session.get(DataVersion, user_id).version == 6 # Ids novos: ETags antigos deixam de valer
+    for model in (Task, ArchivedTask, TaskReminder, DataVersion):
+        assert count_rows(sharded_app, model, source, user_id) == 0
+
+    client = sharded_app.test_client()
+    login_user(client, 'usuario1@example.com', 'senha123')
+    assert 'Com lembrete' in client.get('/tasks').data.decode('utf-8')
+
+def test_rebalance_keeps_source_rows_written_during_the_move(sharded_app):
+    user_id, source = add_user(sharded_app, 1)
+    add_task(sharded_app, user_id, source, 'Tarefa')
+    target = (source + 1) % 3
+    with sharded_app.app_context():
+        router = sharding.get_router()
+        _, _, version = sharding.move_user(router, user_id, source, target)
+        with sharding.use_shard(source): # Um worker com o shard antigo ainda em cache
+            db.session.add(Task(title='Escrita atrasada', user_id=user_id))
+            db.session.add(DataVersion(user_id=user_id, version=1))
+            db.session.commit()
+        assert sharding.drop_moved_rows(router, user_id, source, version) is False
+    assert count_rows(sharded_app, Task, source, user_id) == 2
+
+def test_rebalance_dry_run_lists_users_off_their_home_shard(sharded_app):
+    user_id, shard = add_user(sharded_app, 1)
+    with sharded_app.app_context():
+        with db.engine.begin() as conn:
+            sharding.set_user_shard(conn, user_id, 0)
+    result = sharded_app.test_cli_runner().invoke(args=['rebalance-shards', '--dry-run'])
+    assert f'Usuário {user_id}: shard 0 -> {shard}' in result.output
+    assert '1 usuário(s) a mover.' in result.output
+
+def test_background_jobs_visit_every_shard(sharded_app):
+    first_id, first_shard = add_user(sharded_app, 1)
+    second_id, second_shard = add_user(sharded_app, 2)
+    assert first_shard != second_shard
+    for user_id, shard in ((first_id, first_shard), (second_id, second_shard)):
+        add_task(sharded_app, user_id, shard, 'Vencida', due_date=NOW - timedelta(days=1))
+        add_task(sharded_app, user_id, shard, 'Concluída', status='concluida', completed_at=NOW - timedelta(days=60))
+
+    sent = []
+    sharded_app.extensions['reminder_sink'] = type('ListSink', (), {'send': staticmethod(sent.append)})()
+    assert reminders.run_once(sharded_app, now=NOW) == (2, 2, 0)
+    assert sorted(item['shard'] for item in sent) == sorted([first_shard, second_shard])
+    with sharded_app.app_context():
+        assert archive.archive_completed(sharded_app.config, 30, now=NOW) == 2
@@ -0,0 +1,116 @@
+# tests/test_stats.py
+import io
+from datetime import datetime, timedelta
+from extensions import db
+from models import ArchivedTask, Task, TaskStats
+import archive
+import stats
+
+def counters(app, user_id):
+    with app.app_context():
+        row = db.session.get(TaskStats, user_id)
+        return (row.pending, row.completed, row.archived) if row else (0, 0, 0)
+
+def assert_exact(app, user_id, expected):
+    """Os contadores mantidos a cada escrita batem com o esperado e com a contagem do zero."""
+    assert counters(app, user_id) == expected
+    with app.app_context():
+        assert stats.reconcile(db.session.connection(), fix=False) == []
+
+def create(app, client, title, status='pendente', due_date=''):
+    client.post('/tasks/new', data={'title': title, 'status': status, 'due_date': due_date})
+    with app.app_context():
+        return db.session.query(Task.id).filter_by(title=title).scalar()
+
+def test_counters_follow_route_writes(app, client, logged_in_user_id):
+    user_id = logged_in_user_id
+    first = create(app, client, 'Primeira tarefa')
+    second = create(app, client, 'Segunda tarefa', 'concluida')
+    third = create(app, client, 'Terceira tarefa')
+    assert_exact(app, user_id, (2, 1, 0))
+
+    client.post(f'/tasks/{first}/complete')
+    client.post(f'/tasks/{first}/complete') # Repetir não conta duas vezes
+    assert_exact(app, user_id, (1, 2, 0))
+    client.post(f'/tasks/{second}/uncomplete')
+    assert_exact(app, user_id, (2, 1, 0))
+    client.post(f'/tasks/{third}/edit', data={'title': 'Terceira editada', 'status': 'concluida'})
+    client.post(f'/tasks/{third}/edit', data={'title': 'Terceira de novo', 'status': 'concluida'})
+    assert_exact(app, user_id, (1, 2, 0))
+    client.post(f'/tasks/{first}/delete')
+    assert_exact(app, user_id, (1, 1, 0))
+
+    client.post('/tasks/bulk', data={'action': 'complete', 'task_ids': [second, third]})
+    assert_exact(app, user_id, (0, 2, 0))
+    client.post('/tasks/bulk', data={'action': 'uncomplete', 'task_ids': [second]})
+    assert_exact(app, user_id, (1, 1, 0))
+    client.post('/tasks/bulk', data={'action': 'delete', 'task_ids': [second, third]})
+    assert_exact(app, user_id, (0, 0, 0))
+
+def test_counters_follow_api_import_and_archive(app, client, logged_in_user_id):
+    user_id = logged_in_user_id
+    created = client.post('/api/v1/tasks/batch', json={'tasks': [
+        {'title': 'Tarefa da API 1'}, {'title': 'Tarefa da API 2', 'status': 'concluida'}]}).get_json()['tasks']
+    client.patch(f"/api/v1/tasks/{created[0]['id']}", json={'status': 'concluida'})
+    client.delete(f"/api/v1/tasks/{created[1]['id']}")
+    assert_exact(app, user_id, (0, 1, 0))
+
+    content = 'title,description,status,due_date\nImportada 1,,pendente,\nImportada 2,,concluida,\n'
+    client.post('/tasks/import', data={'file': (io.BytesIO(content.encode('utf-8')), 'tarefas.csv')},
+                content_type='multipart/form-data')
+    assert_exact(app, user_id, (1, 2, 0))
+
+    with app.app_context():
+        assert archive.archive_completed(app.config, 0, now=datetime.utcnow() + timedelta(days=1)) == 2
+    assert_exact(app, user_id, (1, 0, 2))
+    with app.app_context():
+        archive_id = db.session.query(ArchivedTask.id).filter_by(title='Importada 2').scalar()
+    client.post(f'/tasks/archived/{archive_id}/restore')
+    assert_exact(app, user_id, (1, 1, 1))
+
+def test_rollback_discards_counter_changes(app, client, logged_in_user_id):
+    with app.app_context():
+        db.session.add(Task(title='Nunca gravada', user_id=logged_in_user_id))
+        db.session.flush()
+        db.session.rollback()
+    assert_exact(app, logged_in_user_id, (0, 0, 0))
+
+def test_reconcile_reports_and_fixes_drift(app, client, logged_in_user_id):
+    create(app, client, 'Tarefa contada')
+    with app.app_context():
+        db.session.get(TaskStats, logged_in_user_id).pending = 7
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['reconcile-stats', '--dry-run'])
+    assert f'Usuário {logged_in_user_id}: pending 7 -> 1' in result.output
+    assert '1 divergência(s) encontrada(s).' in result.output
+    assert counters(app, logged_in_user_id) == (7, 0, 0)
+
+    result = app.test_cli_runner().invoke(args=['reconcile-stats'])
+    assert '1 divergência(s) corrigida(s).' in result.output
+    assert_exact(app, logged_in_user_id, (1, 0, 0))
+
+def test_home_dashboard(app, client, logged_in_user_id, query_counter):
+    today = datetime.utcnow().date()
+    create(app, client, 'Atrasada', due_date=(today - timedelta(days=2)).isoformat())
+    create(app, client, 'Vence amanhã', due_date=(today + timedelta(days=1)).isoformat())
+    create(app, client, 'Vence daqui a um mês', due_date=(today + timedelta(days=30)).isoformat())
+    create(app, client, 'Já feita', 'concluida', due_date=(today - timedelta(days=5)).isoformat())
+
+    query_counter.reset()
+    html = client.get('/').get_data(as_text=True)
+    assert '<strong>3</strong> pendentes' in html
+    assert '<strong>1</strong> concluídas' in html
+    assert '<strong>1</strong> atrasadas' in html
+    assert '<strong>1</strong> vencem em 7 dias' in html
+    assert '<strong>25%</strong> concluídas no total' in html
+    # Nenhuma contagem sobre a tabela task inteira: a linha de contadores + a contagem por faixa de prazo
+    query_counter.assert_budget(2)
+
+def test_due_date_counts_use_index(app):
+    with app.app_context():
+        plan = [row[-1] for row in db.session.execute(db.text(
+            "EXPLAIN QUERY PLAN SELECT count(*) FILTER (WHERE due_date < :today), count(*) FROM task "
+            "WHERE user_id = 1 AND status = 'pendente' AND due_date < :soon"),
+            {'today': datetime(2025, 6, 1), 'soon': datetime(2025, 6, 9)})]
+    assert any('USING COVERING INDEX ix_task_user_status_due' in step for step in plan), plan
@@ -1,9 +1,11 @@
 # tests/test_tasks.py
+import re
 import pytest
-from app import app  # Importe app para poder acessar o app_context e current_user
+from sqlalchemy import event
 from extensions import db  # Ou from app import db
 from models import User, Task
-from datetime import datetime
+from versioning import bump_data_version
+from datetime import datetime, timedelta
 from flask_login import current_user
 
 # Importa as funções auxiliares de auth
@@ -27,7 +29,7 @@ def test_list_tasks_page_loads(client, logged_in_user_id):  # Usar a nova fixtur
     assert response.status_code == 200
     assert "Minhas Tarefas" in response.data.decode('utf-8')
 
-def test_create_task_success(client, logged_in_user_id):  # Usar a nova fixture
+def test_create_task_success(app, client, logged_in_user_id):  # Usar a nova fixture
     """Testa a criação bem-sucedida de uma tarefa."""
     response = create_task_via_form(client, 'Tarefa de Teste', 'Descricao da tarefa', '2025-12-31', 'pendente')
     assert "Tarefa criada com sucesso!" in response.data.decode('utf-8')
@@ -40,7 +42,7 @@ def test_create_task_success(client, logged_in_user_id):  # Usar a nova fixture
         assert task.status == 'pendente'
         assert task.author.id == logged_in_user_id  # Comparar com o ID do usuário
 
-def test_view_task_details(client, logged_in_user_id):  # Usar a nova fixture
+def test_view_task_details(app, client, logged_in_user_id):  # Usar a nova fixture
     """Testa a visualização dos detalhes de uma tarefa."""
     with app.app_context():  # Usar app.app_context() para interagir com o DB
         user = User.query.get(logged_in_user_id)  # Obter o user pelo ID
@@ -60,7 +62,7 @@ def test_view_non_existent_task(client, logged_in_user_id):  # Usar a nova fixtu
     response = client.get('/tasks/99999')
     assert response.status_code == 404
 
-def test_edit_task_success(client, logged_in_user_id):  # Usar a nova fixture
+def test_edit_task_success(app, client, logged_in_user_id):  # Usar a nova fixture
     """Testa a edição bem-sucedida de uma tarefa."""
     with app.app_context():  # Usar app.app_context() para interagir com o DB
         user = User.query.get(logged_in_user_id)  # Obter o user pelo ID
@@ -88,7 +90,7 @@ def test_edit_task_success(client, logged_in_user_id):  # Usar a nova fixture
         # Corrigido: converter para .date() para comparar data sem tempo
         assert updated_task.due_date.date() == datetime(2025, 2, 1).date()
 
-def test_delete_task_success(client, logged_in_user_id):  # Usar a nova fixture
+def test_delete_task_success(app, client, logged_in_user_id):  # Usar a nova fixture
     """Testa a exclusão bem-sucedida de uma tarefa."""
     with app.app_context():  # Usar app.app_context() para interagir com o DB
         user = User.query.get(logged_in_user_id)  # Obter o user pelo ID
@@ -105,7 +107,7 @@ def test_delete_task_success(client, logged_in_user_id):  # Usar a nova fixture
     with app.app_context():  # Usar app.app_context() para interagir com o DB
         assert Task.query.get(task_id) is None
 
-def test_complete_task_success(client, logged_in_user_id):  # Usar a nova fixture
+def test_complete_task_success(app, client, logged_in_user_id):  # Usar a nova fixture
     """Testa a marcação de uma tarefa como concluída."""
     with app.app_context():  # Usar app.app_context() para interagir com o DB
         user = User.query.get(logged_in_user_id)  # Obter o user pelo ID
@@ -123,7 +125,7 @@ def test_complete_task_success(client, logged_in_user_id):  # Usar a nova fixtur
         completed_task = Task.query.get(task_id)
         assert completed_task.status == 'concluida'
 
-def test_uncomplete_task_success(client, logged_in_user_id):  # Usar a nova fixture
+def test_uncomplete_task_success(app, client, logged_in_user_id):  # Usar a nova fixture
     """Testa a marcação de uma tarefa como pendente novamente."""
     with app.app_context():  # Usar app.app_context() para interagir com o DB
         user = User.query.get(logged_in_user_id)  # Obter o user pelo ID
@@ -200,3 +202,166 @@ def test_task_authorization(client, app):
         assert unchanged_task is not None
         assert unchanged_task.title == 'Tarefa do User A'
         assert unchanged_task.user_id == user_a_id
+
+
+def seed_tasks(app, user_id, count, status='pendente'):
+    """Insere 'count' tarefas em lote, com created_at crescente."""
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        db.session.execute(Task.__table__.insert(), [
+            {'title': f'Tarefa {i:05d}', 'status': status, 'user_id': user_id,
+             'created_at': base + timedelta(seconds=i)}
+            for i in range(count)
+        ])
+        bump_data_version(user_id) # Como toda escrita em tarefas
+        db.session.commit()
+
+def count_loaded_tasks(client, url):
+    """Executa um GET contando quantas tarefas o ORM carregou."""
+    loaded = []
+
+    def on_load(target, context):
+        loaded.append(target)
+
+    event.listen(Task, 'load', on_load)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(Task, 'load', on_load)
+    return response, len(loaded)
+
+def test_list_tasks_query_count_is_constant(app, client, logged_in_user_id, query_counter):
+    """A listagem faz o mesmo número de consultas e carrega no máximo uma página, qualquer que seja o volume."""
+    app.config['TASKS_PER_PAGE'] = 10
+    try:
+        seed_tasks(app, logged_in_user_id, 15)
+        _, small_loaded = count_loaded_tasks(client, '/tasks')
+        small_queries = query_counter.last
+        seed_tasks(app, logged_in_user_id, 2000)
+        response, large_loaded = count_loaded_tasks(client, '/tasks')
+        large_queries = query_counter.last
+    finally:
+        app.config['TASKS_PER_PAGE'] = 20
+
+    assert response.status_code == 200
+    assert small_queries == large_queries
+    # per_page + 1 linhas: a extra indica se existe próxima página
+    assert small_loaded <= 11
+    assert large_loaded <= 11
+
+def test_list_tasks_keyset_navigation(app, client, logged_in_user_id):
+    """Os cursores avançam e voltam sem repetir nem pular tarefas."""
+    seed_tasks(app, logged_in_user_id, 7)
+
+    first = client.get('/tasks?per_page=3').data.decode('utf-8')
+    assert 'Tarefa 00006' in first and 'Tarefa 00004' in first
+    assert 'Tarefa 00003' not in first
+    assert 'Anteriores' not in first
+
+    next_cursor = re.search(r'cursor=([\w-]+)"[^>]*>Próximas', first).group(1)
+    second = client.get(f'/tasks?per_page=3&cursor={next_cursor}').data.decode('utf-8')
+    assert 'Tarefa 00003' in second and 'Tarefa 00001' in second
+    assert 'Tarefa 00004' not in second
+
+    prev_cursor = re.search(r'cursor=([\w-]+)"[^>]*>&laquo; Anteriores', second).group(1)
+    back = client.get(f'/tasks?per_page=3&cursor={prev_cursor}').data.decode('utf-8')
+    assert 'Tarefa 00006' in back and 'Tarefa 00004' in back
+    assert 'Tarefa 00003' not in back
+
+def test_list_tasks_invalid_cursor(client, logged_in_user_id):
+    """Um cursor adulterado resulta em 400, não em erro interno."""
+    response = client.get('/tasks?cursor=nao-e-um-cursor')
+    assert response.status_code == 400
+
+def make_task(app, user_id, title='Tarefa com orçamento', status='pendente'):
+    with app.app_context():
+        task = Task(title=title, description='Orçamento de consultas', status=status, user_id=user_id)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+# Carregar o usuário da sessão (1, normalmente do cache) + ler a versão dos dados, nas páginas
+# condicionais, ou incrementá-la, nas escritas (1) + buscar a tarefa pelo id e dono (1) + a escrita,
+# quando houver (1) + os contadores do painel, quando o status muda ou a tarefa entra/sai (1);
+# a exclusão apaga também os lembretes da tarefa (1)
+@pytest.mark.parametrize('method, path, data, budget', [
+    ('get', '/tasks', None, 3),
+    ('get', '/tasks/{id}', None, 3),
+    ('get', '/tasks/{id}/edit', None, 2),
+    ('post', '/tasks/{id}/edit', {'title': 'Tarefa editada', 'status': 'concluida'}, 4),
+    ('post', '/tasks/{id}/complete', None, 4),
+    ('post', '/tasks/{id}/uncomplete', None, 4),
+    ('post', '/tasks/{id}/delete', None, 5),
+    ('post', '/tasks/new', {'title': 'Tarefa nova', 'status': 'pendente'}, 3),
+])
+def test_task_route_query_budget(app, client, logged_in_user_id, query_counter, method, path, data, budget):
+    """Nenhuma rota de tarefas pode passar do seu orçamento de consultas SQL."""
+    task_id = make_task(app, logged_in_user_id)
+    response = getattr(client, method)(path.format(id=task_id), data=data)
+    assert response.status_code in (200, 302)
+    query_counter.assert_budget(budget)
+
+@pytest.mark.parametrize('action, status', [('complete', 'concluida'), ('uncomplete', 'pendente'), ('delete', None)])
+def test_row_action_fragment_skips_list(app, client, logged_in_user_id, query_counter, action, status):
+    """Pelo fetch (Accept: application/json), a ação devolve só a linha afetada e nunca consulta a lista."""
+    task_id = make_task(app, logged_in_user_id, status='pendente' if action == 'complete' else 'concluida')
+    response = client.post(f'/tasks/{task_id}/{action}', headers={'Accept': 'application/json'})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['task_id'] == task_id and data['deleted'] == (action == 'delete')
+    if status:
+        assert data['status'] == status
+        assert f'id="task-{task_id}"' in data['html'] and 'Tarefa com orçamento' in data['html']
+    assert not [sql for sql in query_counter.last_statements if 'ORDER BY task.created_at' in sql]
+    query_counter.assert_budget(5 if action == 'delete' else 4) # A exclusão também apaga os lembretes
+    # Sem flash pendente: a mensagem já foi entregue na resposta JSON
+    assert data['message'] not in client.get('/tasks').get_data(as_text=True)
+
+def test_foreign_task_lookup_does_not_load_author(app, client, logged_in_user_id, query_counter):
+    """Acesso à tarefa de outro usuário continua 403 sem carregar o autor."""
+    with app.app_context():
+        other = User(username='outro', email='outro@example.com')
+        other.set_password('outro')
+        db.session.add(other)
+        db.session.commit()
+        other_id = other.id
+    task_id = make_task(app, other_id)
+
+    assert client.get(f'/tasks/{task_id}').status_code == 403
+    assert client.get('/tasks/999999').status_code == 404
+    # Usuário da sessão + versão dos dados + consulta por id e dono + checagem de existência
+    query_counter.assert_budget(4)
+
+def test_bulk_complete_and_delete(app, client, logged_in_user_id, query_counter):
+    """A ação em lote altera várias tarefas numa única instrução e ignora tarefas de outros usuários."""
+    ids = [make_task(app, logged_in_user_id, title=f'Tarefa em lote {i}') for i in range(5)]
+    with app.app_context():
+        other = User(username='outrolote', email='outrolote@example.com')
+        other.set_password('x')
+        db.session.add(other)
+        db.session.commit()
+        other_id = other.id
+    foreign_id = make_task(app, other_id)
+
+    response = client.post('/tasks/bulk', data={'action': 'complete', 'task_ids': ids[:3] + [foreign_id]})
+    assert response.status_code == 302
+    # Um único UPDATE + os contadores do painel + a versão, independentemente da quantidade de tarefas
+    query_counter.assert_budget(3)
+
+    with app.app_context():
+        statuses = dict(db.session.query(Task.id, Task.status).all())
+    assert [statuses[i] for i in ids] == ['concluida'] * 3 + ['pendente'] * 2
+    assert statuses[foreign_id] == 'pendente'
+
+    response = client.post('/tasks/bulk', data={'action': 'delete', 'task_ids': ids[:2] + [foreign_id]},
+                           follow_redirects=True)
+    assert '2 tarefa(s) excluída(s) com sucesso!' in response.data.decode('utf-8')
+    with app.app_context():
+        remaining = {task_id for (task_id,) in db.session.query(Task.id)}
+    assert remaining == set(ids[2:]) | {foreign_id}
+
+def test_bulk_requires_selection(client, logged_in_user_id):
+    """Sem tarefas selecionadas nada é alterado."""
+    response = client.post('/tasks/bulk', data={'action': 'delete'}, follow_redirects=True)
+    assert 'Selecione ao menos uma tarefa e uma ação.' in response.data.decode('utf-8')
@@ -0,0 +1,123 @@
+# tests/test_transfer.py
+import csv
+import io
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+from extensions import db
+from models import Task
+from transfer import import_tasks
+
+# Pico de memória alocada pelo Python com 100 mil tarefas; o CSV exportado inteiro tem ~9 MiB
+MEMORY_CEILING = 4 * 1024 * 1024
+LARGE = 100_000
+
+def seed(app, user_id, count):
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        for start in range(0, count, 10000):
+            db.session.execute(Task.__table__.insert(), [
+                {'title': f'Tarefa exportada {i}', 'description': 'Descrição, com "aspas" e vírgula',
+                 'status': 'pendente', 'user_id': user_id, 'created_at': base + timedelta(seconds=i)}
+                for i in range(start, min(start + 10000, count))
+            ])
+        db.session.commit()
+
+def upload(client, content, filename):
+    return client.post('/tasks/import', data={'file': (io.BytesIO(content.encode('utf-8')), filename)},
+                       content_type='multipart/form-data')
+
+def test_export_csv_and_ndjson(client, logged_in_user_id):
+    client.post('/tasks/new', data={'title': 'Primeira, com vírgula', 'description': 'linha 1\nlinha 2',
+                                    'status': 'pendente', 'due_date': '2025-03-01'})
+    client.post('/tasks/new', data={'title': 'Segunda tarefa', 'status': 'concluida'})
+
+    response = client.get('/tasks/export?format=csv')
+    assert response.mimetype == 'text/csv'
+    assert 'attachment; filename=tarefas.csv' == response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.data.decode('utf-8'))))
+    assert [row['title'] for row in rows] == ['Primeira, com vírgula', 'Segunda tarefa']
+    assert rows[0]['description'] == 'linha 1\nlinha 2' and rows[0]['due_date'] == '2025-03-01'
+
+    lines = client.get('/tasks/export?format=ndjson').data.decode('utf-8').splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [r['status'] for r in records] == ['pendente', 'concluida']
+    assert records[1]['due_date'] is None
+
+    assert client.get('/tasks/export?format=xml').status_code == 400
+
+def test_export_only_includes_own_tasks(app, client, logged_in_user_id):
+    seed(app, logged_in_user_id + 1, 3) # Tarefas de outro usuário
+    client.post('/tasks/new', data={'title': 'Tarefa minha', 'status': 'pendente'})
+    rows = list(csv.DictReader(io.StringIO(client.get('/tasks/export').data.decode('utf-8'))))
+    assert [row['title'] for row in rows] == ['Tarefa minha']
+
+def test_import_reports_invalid_rows_and_keeps_valid_ones(app, client, logged_in_user_id):
+    content = ('title,description,status,due_date\n'
+               'Tarefa importada 1,,pendente,2025-05-01\n'
+               'abc,,pendente,\n'
+               'Tarefa importada 2,Descrição,concluida,\n'
+               'Tarefa importada 3,,arquivada,2025-13-40\n')
+    response = upload(client, content, 'tarefas.csv')
+    html = response.data.decode('utf-8')
+    assert '2 tarefa(s) importada(s); 2 linha(s) com erro.' in html
+    assert 'Linha 3: title' in html and 'Linha 5: due_date' in html
+
+    with app.app_context():
+        tasks = Task.query.filter_by(user_id=logged_in_user_id).order_by(Task.title).all()
+        assert [(t.title, t.status) for t in tasks] == [('Tarefa importada 1', 'pendente'),
+                                                       ('Tarefa importada 2', 'concluida')]
+        assert tasks[0].due_date == datetime(2025, 5, 1)
+    # A listagem já mostra as tarefas importadas (versão de dados incrementada)
+    assert 'Tarefa importada 2' in client.get('/tasks').data.decode('utf-8')
+
+def test_import_ndjson_and_rejects_unknown_extension(client, logged_in_user_id):
+    content = '{"title": "Tarefa em NDJSON", "status": "pendente"}\n\nnão é json\n'
+    html = upload(client, content, 'tarefas.ndjson').data.decode('utf-8')
+    assert '1 tarefa(s) importada(s); 1 linha(s) com erro.' in html
+    assert 'Envie um arquivo .csv' in upload(client, content, 'tarefas.txt').data.decode('utf-8')
+
+def test_export_then_import_round_trip(app, client, logged_in_user_id, monkeypatch):
+    seed(app, logged_in_user_id, 25)
+    exported = client.get('/tasks/export?format=ndjson').data.decode('utf-8')
+    with app.app_context():
+        Task.query.delete()
+        db.session.commit()
+
+    monkeypatch.setitem(app.config, 'IMPORT_BATCH_SIZE', 10) # Três lotes: 10 + 10 + 5
+    upload(client, exported, 'backup.ndjson')
+    reimported = [json.loads(line) for line in client.get('/tasks/export?format=ndjson').data.decode('utf-8').splitlines()]
+    original = [json.loads(line) for line in exported.splitlines()]
+    assert [(r['title'], r['created_at']) for r in reimported] == [(r['title'], r['created_at']) for r in original]
+
+def test_export_100k_tasks_in_constant_memory(app, client, logged_in_user_id):
+    seed(app, logged_in_user_id, LARGE)
+    tracemalloc.start()
+    try:
+        response = client.get('/tasks/export?format=csv', buffered=False)
+        rows = sum(chunk.count(b'\n') for chunk in response.response)
+        response.close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert rows == LARGE + 1 # Cabeçalho + tarefas
+    assert peak < MEMORY_CEILING, f'pico de {peak / 1024 / 1024:.1f} MiB'
+
+def test_import_100k_tasks_in_constant_memory(app, logged_in_user_id, tmp_path):
+    path = tmp_path / 'grande.csv'
+    with open(path, 'w', encoding='utf-8', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(['title', 'description', 'status', 'due_date'])
+        for i in range(LARGE):
+            writer.writerow([f'Tarefa importada {i}', 'Importada em lote', 'pendente', '2025-06-30'])
+
+    with app.test_request_context(), open(path, 'rb') as stream:
+        tracemalloc.start()
+        try:
+            result = import_tasks(logged_in_user_id, stream, 'csv', batch_size=1000)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert (result.imported, result.error_count) == (LARGE, 0)
+        assert Task.query.filter_by(user_id=logged_in_user_id).count() == LARGE
+    assert peak < MEMORY_CEILING, f'pico de {peak / 1024 / 1024:.1f} MiB'
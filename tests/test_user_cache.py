@@ -0,0 +1,56 @@
+# tests/test_user_cache.py
+import re
+from extensions import db
+from models import User
+from user_cache import TTLCache, CachedUser
+
+USER_SQL = re.compile(r'\bFROM user\b')
+
+def user_queries(statements):
+    return [sql for sql in statements if USER_SQL.search(sql)]
+
+def test_repeated_requests_do_not_query_user_table(client, logged_in_user_id, query_counter):
+    """Depois do primeiro carregamento, o usuário da sessão vem do cache."""
+    client.get('/')
+    for _ in range(3):
+        response = client.get('/')
+        assert 'loggedtestuser' in response.data.decode('utf-8')
+        assert user_queries(query_counter.last_statements) == []
+
+def test_cached_user_is_detached_and_without_password(app, client, logged_in_user_id):
+    client.get('/')
+    cached = app.extensions['user_cache'].get(logged_in_user_id)
+    assert isinstance(cached, CachedUser)
+    assert cached.username == 'loggedtestuser'
+    assert not hasattr(cached, 'password_hash')
+
+def test_user_update_invalidates_cache(app, client, logged_in_user_id, query_counter):
+    """Alterar o registro do usuário descarta a cópia em cache imediatamente."""
+    client.get('/')
+    with app.app_context():
+        user = db.session.get(User, logged_in_user_id)
+        user.username = 'nomenovo'
+        db.session.commit()
+
+    response = client.get('/')
+    assert 'nomenovo' in response.data.decode('utf-8')
+    assert len(user_queries(query_counter.last_statements)) == 1
+
+def test_logout_invalidates_cache(app, client, logged_in_user_id):
+    client.get('/')
+    assert app.extensions['user_cache'].get(logged_in_user_id) is not None
+    client.get('/auth/logout')
+    assert app.extensions['user_cache'].get(logged_in_user_id) is None
+
+def test_ttl_cache_expiry_and_bound():
+    now = [0.0]
+    cache = TTLCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.set(1, 'um')
+    cache.set(2, 'dois')
+    cache.set(3, 'tres') # Excede o limite: descarta a entrada mais antiga
+    assert cache.get(1) is None
+    assert cache.get(2) == 'dois'
+
+    now[0] = 10.0
+    assert cache.get(2) is None # Expirou
+    assert len(cache) == 1
@@ -0,0 +1,82 @@
+# tests/test_versioning.py
+import re
+from extensions import db
+from models import Task, DataVersion
+
+TASK_SQL = re.compile(r'\btask\b')
+
+def make_task(app, user_id, title='Tarefa versionada'):
+    with app.app_context():
+        task = Task(title=title, user_id=user_id)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+def test_list_returns_304_without_task_queries(app, client, logged_in_user_id, query_counter):
+    """Com o ETag atual, /tasks responde 304 sem consultar a tabela task nem renderizar."""
+    make_task(app, logged_in_user_id)
+    first = client.get('/tasks')
+    assert first.status_code == 200
+    assert first.headers['ETag']
+    assert 'private' in first.headers['Cache-Control']
+
+    response = client.get('/tasks', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert not [sql for sql in query_counter.last_statements if TASK_SQL.search(sql)]
+
+def test_write_invalidates_etag(app, client, logged_in_user_id):
+    """Qualquer escrita incrementa a versão do usuário e, com ela, muda o ETag."""
+    task_id = make_task(app, logged_in_user_id)
+    etag = client.get('/tasks').headers['ETag']
+
+    client.post(f'/tasks/{task_id}/complete', follow_redirects=True) # Consome a mensagem flash
+    response = client.get('/tasks', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+    with app.app_context():
+        assert db.session.get(DataVersion, logged_in_user_id).version == 1
+
+def test_every_write_path_bumps_version(app, client, logged_in_user_id):
+    """create, edit, complete, uncomplete, delete e bulk incrementam a versão uma vez cada."""
+    def version():
+        with app.app_context():
+            row = db.session.get(DataVersion, logged_in_user_id)
+            return row.version if row else 0
+
+    client.post('/tasks/new', data={'title': 'Tarefa versionada', 'status': 'pendente'})
+    with app.app_context():
+        task_id = Task.query.filter_by(user_id=logged_in_user_id).one().id
+    client.post(f'/tasks/{task_id}/edit', data={'title': 'Tarefa editada', 'status': 'pendente'})
+    client.post(f'/tasks/{task_id}/complete')
+    client.post(f'/tasks/{task_id}/uncomplete')
+    client.post('/tasks/bulk', data={'action': 'complete', 'task_ids': [task_id]})
+    client.post(f'/tasks/{task_id}/delete')
+    assert version() == 6
+
+def test_view_task_conditional_requests(app, client, logged_in_user_id):
+    """A página de detalhes responde 304 ao If-None-Match; o If-Modified-Since não basta."""
+    client.post('/tasks/new', data={'title': 'Tarefa condicional', 'status': 'pendente'}, follow_redirects=True)
+    with app.app_context():
+        task_id = Task.query.filter_by(user_id=logged_in_user_id).one().id
+
+    response = client.get(f'/tasks/{task_id}')
+    assert response.status_code == 200
+    assert client.get(f'/tasks/{task_id}',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert 'Last-Modified' not in response.headers
+    # A data da versão não muda quando o token CSRF ou o APP_VERSION mudam: um 304 por data
+    # deixaria o navegador com a página antiga
+    assert client.get(f'/tasks/{task_id}',
+                      headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}).status_code == 200
+
+def test_pending_flash_skips_conditional_response(client, logged_in_user_id):
+    """Uma página com mensagem flash nunca é servida do cache do navegador."""
+    etag = client.get('/tasks').headers['ETag']
+    with client.session_transaction() as session:
+        session['_flashes'] = [('info', 'Aviso pendente')]
+    response = client.get('/tasks', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'Aviso pendente' in response.data.decode('utf-8')
+    assert 'ETag' not in response.headers
@@ -0,0 +1,216 @@
+# transfer.py
+# Exportação e importação das tarefas do usuário.
+# * Exportação (CSV ou NDJSON): a resposta é um gerador que busca as tarefas em lotes de
+#   EXPORT_BATCH_SIZE pela chave (created_at, id), como linhas simples e não objetos do ORM,
+#   então a memória não cresce com o número de tarefas.
+# * Importação: o arquivo enviado é lido linha a linha, cada linha é validada com as regras do
+#   TaskForm e as válidas são inseridas em lotes de IMPORT_BATCH_SIZE (um INSERT por lote).
+#   Linhas inválidas não interrompem a importação: voltam no relatório com o número da linha.
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Blueprint, Response, abort, current_app, render_template, request, stream_with_context
+from flask_login import login_required, current_user
+from sqlalchemy import select, tuple_
+from werkzeug.datastructures import MultiDict
+from extensions import db
+from models import Task, completed_at_for
+from forms import ImportTasksForm, TaskForm
+from stats import add_to_stats, status_deltas
+from versioning import bump_data_version
+from replicas import replica_reads
+
+transfer_bp = Blueprint('transfer', __name__)
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+EXPORT_COLUMNS = ('id', 'title', 'description', 'status', 'created_at', 'due_date')
+IMPORT_FIELDS = ('title', 'description', 'status', 'due_date')
+IMPORT_EXTENSIONS = {'csv': 'csv', 'ndjson': 'ndjson', 'jsonl': 'ndjson'}
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_task_batches(user_id, batch_size):
+    """Tarefas do usuário em ordem de criação, lote a lote, pelo índice (user_id, created_at)."""
+    columns = (Task.id, Task.title, Task.description, Task.status, Task.created_at, Task.due_date)
+    query = select(*columns).where(Task.user_id == user_id).order_by(Task.created_at, Task.id).limit(batch_size)
+    last = None
+    while True:
+        batch_query = query if last is None else query.where(tuple_(Task.created_at, Task.id) > last)
+        rows = db.session.execute(batch_query).all()
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        last = (rows[-1].created_at, rows[-1].id)
+
+
+def export_record(row):
+    """Mesmo formato de Task.to_dict (API), a partir de uma linha da consulta."""
+    return {
+        'id': row.id,
+        'title': row.title,
+        'description': row.description,
+        'status': row.status,
+        'created_at': row.created_at.isoformat(),
+        'due_date': row.due_date.date().isoformat() if row.due_date else None,
+    }
+
+
+def generate_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        for row in rows:
+            record = export_record(row)
+            writer.writerow(['' if record[name] is None else record[name] for name in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue() # Só o cabeçalho, se não houver tarefas
+
+
+def generate_ndjson(batches):
+    for rows in batches:
+        yield ''.join(json.dumps(export_record(row), ensure_ascii=False) + '\n' for row in rows)
+
+
+@transfer_bp.route('/tasks/export')
+@replica_reads # Só leitura: pode ler de uma réplica
+@login_required
+def export_tasks():
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
+    batches = iter_task_batches(current_user.id, current_app.config['EXPORT_BATCH_SIZE'])
+    body = generate_csv(batches) if export_format == 'csv' else generate_ndjson(batches)
+    # stream_with_context mantém a requisição (e a sessão do banco) viva enquanto o corpo é gerado.
+    # Cada lote continua de onde o anterior parou: uma tarefa criada durante a exportação pode ou não
+    # aparecer, mas nenhuma sai repetida nem é pulada.
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=tarefas.{export_format}'
+    return response
+
+
+def parse_csv(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for line_number, row in enumerate(reader, start=2): # A linha 1 é o cabeçalho
+        yield line_number, row
+
+
+def parse_ndjson(stream):
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8-sig'), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+class RowValidator:
+    """
+    Valida cada linha com as regras do TaskForm. Uma única instância do formulário é reaproveitada
+    (process + validate), o que custa cerca de um terço de criar um formulário por linha.
+    """
+
+    def __init__(self):
+        self.form = TaskForm(formdata=None, meta={'csrf': False})
+
+    def validate(self, data):
+        """Retorna (valores para o INSERT, erros)."""
+        if not isinstance(data, dict):
+            return None, {'linha': ['Linha ilegível: esperado um objeto JSON ou uma linha CSV.']}
+        values = {name: data.get(name) for name in IMPORT_FIELDS}
+        values['status'] = values['status'] or 'pendente'
+        self.form.process(formdata=MultiDict(
+            {name: '' if value is None else str(value) for name, value in values.items()}))
+        errors = {} if self.form.validate() else dict(self.form.errors)
+
+        created_at = datetime.utcnow()
+        if data.get('created_at'):
+            try:
+                created_at = datetime.fromisoformat(str(data['created_at']))
+            except ValueError:
+                errors['created_at'] = ['Data inválida (use o formato ISO, como na exportação).']
+        if errors:
+            return None, errors
+        due_date = self.form.due_date.data
+        return {
+            'title': self.form.title.data,
+            'description': self.form.description.data or None,
+            'status': self.form.status.data,
+            'due_date': datetime(due_date.year, due_date.month, due_date.day) if due_date else None,
+            'created_at': created_at,
+            'completed_at': completed_at_for(self.form.status.data),
+        }, None
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.error_count = 0
+        self.errors = [] # (linha, {campo: [mensagens]}), limitado a MAX_REPORTED_ERRORS
+
+    def add_error(self, line_number, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, errors))
+
+
+def import_tasks(user_id, stream, import_format, batch_size):
+    """
+    Importa as tarefas de um arquivo (binário) para o usuário. Cada lote é gravado e confirmado
+    separadamente, com a versão de dados incrementada, então a trava de escrita do banco não fica
+    presa durante toda a importação.
+    """
+    rows = parse_csv(stream) if import_format == 'csv' else parse_ndjson(stream)
+    validator = RowValidator()
+    result = ImportResult()
+    batch = []
+
+    def flush():
+        db.session.execute(Task.__table__.insert(), batch)
+        add_to_stats(user_id, status_deltas(values['status'] for values in batch))
+        bump_data_version(user_id)
+        db.session.commit()
+        result.imported += len(batch)
+        batch.clear()
+
+    try:
+        for line_number, data in rows:
+            values, errors = validator.validate(data)
+            if errors:
+                result.add_error(line_number, errors)
+                continue
+            values['user_id'] = user_id
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+    except (UnicodeDecodeError, csv.Error) as exc:
+        result.add_error(None, {'arquivo': [f'Arquivo ilegível: {exc}']})
+    if batch:
+        flush()
+    return result
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return IMPORT_EXTENSIONS.get(extension)
+
+
+@transfer_bp.route('/tasks/import', methods=['GET', 'POST'])
+@login_required
+def import_tasks_view():
+    form = ImportTasksForm()
+    result = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        import_format = detect_format(upload.filename or '')
+        if import_format is None:
+            form.file.errors.append('Envie um arquivo .csv, .ndjson ou .jsonl.')
+        else:
+            result = import_tasks(current_user.id, upload.stream, import_format,
+                                  current_app.config['IMPORT_BATCH_SIZE'])
+    return render_template('import_tasks.html', title='Importar Tarefas', form=form, result=result)
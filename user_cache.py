@@ -0,0 +1,104 @@
+# user_cache.py
+# Cache do usuário carregado pelo Flask-Login a cada requisição autenticada.
+#
+# Garantias de atualização (staleness):
+# * No processo que altera o usuário (UPDATE/DELETE via ORM) ou que faz o logout, a entrada é
+#   descartada na hora: a requisição seguinte já relê o banco.
+# * Nos demais processos/workers, a cópia em cache pode ficar desatualizada por até USER_CACHE_TTL
+#   segundos (ex.: um nome de usuário alterado, ou um usuário excluído que continua logado).
+# * Só identidade, dados de exibição e o shard ficam em cache (id, username, email, shard); o hash
+#   da senha nunca. Por isso 'flask rebalance-shards' espera USER_CACHE_TTL antes de apagar a origem.
+#   Login, troca de senha e qualquer decisão sensível continuam consultando o banco.
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event
+from extensions import db
+from models import User
+
+
+class CachedUser(UserMixin):
+    """Cópia leve e desanexada da sessão do SQLAlchemy de um User, usada como current_user."""
+
+    def __init__(self, id, username, email, shard=0):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.shard = shard
+
+    def __repr__(self):
+        return f"CachedUser('{self.username}', '{self.email}')"
+
+
+class TTLCache:
+    """Dicionário com expiração por tempo e limite de tamanho (descarta o mais antigo)."""
+
+    def __init__(self, max_entries=10000, ttl=60, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict() # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_cache():
+    return current_app.extensions['user_cache']
+
+
+def load_user(user_id):
+    """user_loader do Flask-Login: consulta o banco só quando o usuário não está no cache."""
+    cache = get_cache()
+    user = cache.get(user_id)
+    if user is None:
+        row = db.session.query(User.id, User.username, User.email, User.shard).filter_by(id=user_id).first()
+        if row is None:
+            return None
+        user = CachedUser(row.id, row.username, row.email, row.shard)
+        cache.set(user_id, user)
+    return user
+
+
+def invalidate(user_id):
+    get_cache().delete(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_changed_user(mapper, connection, target):
+    if has_app_context() and 'user_cache' in current_app.extensions:
+        invalidate(target.id)
+
+
+def init_app(app):
+    app.extensions['user_cache'] = TTLCache(app.config['USER_CACHE_MAX_ENTRIES'], app.config['USER_CACHE_TTL'])
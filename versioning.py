@@ -0,0 +1,105 @@
+# versioning.py
+# Versão de dados por usuário e respostas condicionais (ETag / 304)
+# para as páginas HTML de tarefas.
+import hashlib
+import importlib
+from datetime import datetime
+from functools import wraps
+from blinker import Namespace
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from extensions import db
+from models import DataVersion
+
+
+# insert() com ON CONFLICT de cada dialeto. O módulo só é importado no primeiro uso: o do
+# PostgreSQL (que carrega os drivers assíncronos) custaria ~20 ms a cada inicialização no SQLite
+UPSERT_DIALECTS = {'sqlite': 'sqlalchemy.dialects.sqlite', 'postgresql': 'sqlalchemy.dialects.postgresql'}
+
+
+def upsert_insert(dialect_name):
+    """insert() com suporte a ON CONFLICT do dialeto, ou None se ele não tiver UPSERT."""
+    module = UPSERT_DIALECTS.get(dialect_name)
+    return importlib.import_module(module).insert if module else None
+
+signals = Namespace()
+# Enviado a cada incremento de versão; os caches derivados dos dados do usuário escutam este sinal
+data_version_bumped = signals.signal('data-version-bumped')
+
+
+def bump_data_version(user_id):
+    """
+    Incrementa a versão dos dados do usuário. Deve ser chamada ANTES do commit da escrita,
+    para que a versão e a alteração nas tarefas entrem (ou não) juntas no banco.
+    """
+    now = datetime.utcnow()
+    dialect_insert = upsert_insert(db.session.get_bind().dialect.name)
+    if dialect_insert is not None:
+        # Uma única instrução, mesmo na primeira escrita do usuário (INSERT ... ON CONFLICT DO UPDATE)
+        stmt = dialect_insert(DataVersion).values(user_id=user_id, version=1, updated_at=now)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[DataVersion.user_id],
+            set_={'version': DataVersion.version + 1, 'updated_at': now}))
+    else:
+        updated = db.session.query(DataVersion).filter_by(user_id=user_id).update(
+            {DataVersion.version: DataVersion.version + 1, DataVersion.updated_at: now},
+            synchronize_session=False)
+        if not updated:
+            db.session.add(DataVersion(user_id=user_id, version=1, updated_at=now))
+    g.pop('data_version', None)
+    data_version_bumped.send(current_app._get_current_object(), user_id=user_id)
+
+
+def get_data_version(user_id):
+    """
+    Retorna (versão, data da última alteração); (0, None) se o usuário nunca escreveu.
+    O valor fica em g durante a requisição, para não ser consultado de novo.
+    """
+    cached = g.get('data_version')
+    if cached is not None and cached[0] == user_id:
+        return cached[1]
+    row = db.session.query(DataVersion.version, DataVersion.updated_at).filter_by(user_id=user_id).first()
+    result = (row.version, row.updated_at) if row else (0, None)
+    g.data_version = (user_id, result)
+    return result
+
+
+def page_etag(user_id, version):
+    # A página também depende da URL (filtros/cursor), da versão da aplicação e do token CSRF
+    # guardado na sessão, que vai embutido nos formulários da página.
+    seed = '|'.join(str(part) for part in (
+        user_id, version, request.full_path, current_app.config['APP_VERSION'], session.get('csrf_token')))
+    return hashlib.sha1(seed.encode('utf-8')).hexdigest()
+
+
+def conditional_page(view):
+    """
+    Emite um ETag forte baseado na versão de dados do usuário e responde 304 antes de executar a
+    view (nenhuma consulta a tarefas, nenhuma renderização) quando nada mudou. Deve ficar abaixo do
+    @login_required.
+    Não há Last-Modified/If-Modified-Since: a data da versão não cobre o resto do que entra no
+    ETag (APP_VERSION, token CSRF), e depois de um deploy ou de um token novo o navegador
+    receberia 304 e ficaria com um formulário de token morto.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Mensagens flash pendentes fazem parte da página: nunca reaproveitar o cache nesse caso
+        if '_flashes' in session:
+            return view(*args, **kwargs)
+
+        version, _ = get_data_version(current_user.id)
+        # Comparação fraca: a página comprimida sai com o mesmo ETag marcado como W/ (compression.py)
+        not_modified = request.if_none_match.contains_weak(page_etag(current_user.id, version))
+
+        response = make_response('' if not_modified else view(*args, **kwargs))
+        if not_modified:
+            response.status_code = 304
+        elif response.status_code != 200:
+            return response
+        response.set_etag(page_etag(current_user.id, version))
+        # Conteúdo por usuário: o navegador pode guardar, mas precisa revalidar a cada acesso
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response
+    return wrapper
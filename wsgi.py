@@ -0,0 +1,9 @@
+# wsgi.py
+# Ponto de entrada para servidores WSGI. A aplicação é criada em modo preload: com
+# 'gunicorn --preload' ela é montada (e aquecida) uma única vez no processo mestre, e os workers a
+# herdam pelo fork, cada um com as próprias conexões e threads.
+#
+#   APP_ENV=production gunicorn --preload -w 4 wsgi:app
+from app import create_app
+
+app = create_app(preload=True)